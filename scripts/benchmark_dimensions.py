@@ -0,0 +1,54 @@
+# scripts/benchmark_dimensions.py
+"""
+Benchmark: per-row Faker customer generation vs pooled, vectorized sampler
+The per-row reference is timed on a sample and extrapolated for large N
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.generate_data import customers_frame, products_frame, fake
+
+def per_row_customers(num, region_ids):
+    """Reference: one Faker call per attribute per customer (previous generator)"""
+    data = []
+    for i in range(1, num + 1):
+        data.append({
+            'customer_id': f'C{i:05d}',
+            'customer_name': fake.name(),
+            'segment': np.random.choice(['Consumer', 'Corporate', 'Home Office'], p=[0.5, 0.3, 0.2]),
+            'city': fake.city(),
+            'state': fake.state(),
+            'region_id': np.random.choice(region_ids)
+        })
+    return data
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - t0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark dimension generation')
+    parser.add_argument('--customers', type=int, default=1_000_000)
+    parser.add_argument('--products', type=int, default=100_000)
+    parser.add_argument('--sample', type=int, default=5_000, help='Rows used to time the per-row reference')
+    args = parser.parse_args()
+    
+    regions = [1, 2, 3, 4]
+    sample = min(args.sample, args.customers)
+    per_row_rate = sample / timed(per_row_customers, sample, regions)
+    pooled = timed(customers_frame, args.customers, regions)
+    products = timed(products_frame, args.products)
+    
+    print("=" * 60)
+    print("DIMENSION GENERATION BENCHMARK")
+    print("=" * 60)
+    print(f"Per-row customers:  {per_row_rate:,.0f} rows/sec (est. {args.customers / per_row_rate:,.1f}s for {args.customers:,})")
+    print(f"Pooled customers:   {args.customers / pooled:,.0f} rows/sec ({pooled:.2f}s for {args.customers:,})")
+    print(f"Pooled products:    {args.products / products:,.0f} rows/sec ({products:.2f}s for {args.products:,})")
+    print(f"Customer speedup:   {(args.customers / pooled) / per_row_rate:,.1f}x")
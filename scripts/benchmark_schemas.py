@@ -0,0 +1,62 @@
+# scripts/benchmark_schemas.py
+"""
+Benchmark: memory of fact tables as plain frames vs the schema registry types
+Plain = object strings, date strings and int64 counts (how the tables used to be loaded)
+"""
+import argparse
+import os
+import sys
+from datetime import datetime
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.generate_data import simulate_transactions, customers_frame, products_frame
+from src.etl.etl_orders import transform_orders
+from src.utils.schemas import apply_schema
+
+def plain(df):
+    """Legacy in-memory representation: object strings, date strings, 64-bit numbers"""
+    out = {}
+    for col in df.columns:
+        s = df[col]
+        if pd.api.types.is_datetime64_any_dtype(s):
+            out[col] = s.dt.strftime('%Y-%m-%d').astype(object)
+        elif pd.api.types.is_integer_dtype(s):
+            out[col] = s.astype('int64')
+        elif pd.api.types.is_numeric_dtype(s):
+            out[col] = s.astype('float64')
+        else:
+            out[col] = s.astype(object)
+    return pd.DataFrame(out)
+
+def mb(df):
+    return df.memory_usage(index=True, deep=True).sum() / (1024 * 1024)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark fact table memory with the schema registry')
+    parser.add_argument('--customers', type=int, default=20_000)
+    parser.add_argument('--products', type=int, default=200)
+    parser.add_argument('--months', type=int, default=12)
+    args = parser.parse_args()
+
+    customers = customers_frame(args.customers, [1, 2, 3, 4])
+    products = products_frame(args.products)
+    start = datetime(2024, 1, 1)
+    end = (pd.Timestamp(start) + pd.DateOffset(months=args.months)).to_pydatetime()
+    orders, inventory, delivery, _ = simulate_transactions(start, end, customers, products, seed=42)
+    fact_orders = transform_orders(orders, products, customers)
+
+    tables = {
+        'fact_orders': fact_orders,
+        'fact_delivery': delivery.assign(delivery_time_days=1, promise_days=5, sla_met=1),
+        'fact_inventory': inventory,
+    }
+
+    print("=" * 60)
+    print("FACT TABLE MEMORY BENCHMARK")
+    print("=" * 60)
+    for name, df in tables.items():
+        before = mb(plain(df))
+        after = mb(apply_schema(plain(df), name))
+        print(f"{name:<16} {len(df):>10,} rows  {before:8.1f} MB -> {after:7.1f} MB  ({before / after:.1f}x)")
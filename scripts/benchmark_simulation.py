@@ -0,0 +1,63 @@
+# scripts/benchmark_simulation.py
+"""
+Benchmark: legacy per-order loop vs vectorized simulation engine
+Reports rows/sec for the Orders + Inventory + Delivery simulation (no file I/O)
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.generate_data import _simulate_loop, simulate_transactions
+
+def make_dims(num_customers, num_products):
+    customers = pd.DataFrame({'customer_id': [f'C{i:05d}' for i in range(1, num_customers + 1)]})
+    products = pd.DataFrame({'product_id': [f'P{i:05d}' for i in range(1, num_products + 1)]})
+    return customers, products
+
+def run_benchmark(start_date, end_date, num_customers=1200, num_products=50, seed=42, skip_loop=False):
+    customers, products = make_dims(num_customers, num_products)
+    results = []
+    
+    engines = [('vectorized', lambda: simulate_transactions(start_date, end_date, customers, products, seed=seed)[:3])]
+    if not skip_loop:
+        engines.insert(0, ('loop', lambda: _simulate_loop(start_date, end_date, customers, products)))
+    
+    for name, fn in engines:
+        t0 = time.perf_counter()
+        orders, inventory, delivery = fn()
+        elapsed = time.perf_counter() - t0
+        rows = len(orders) + len(inventory) + len(delivery)
+        results.append({
+            'engine': name,
+            'orders': len(orders),
+            'total_rows': rows,
+            'seconds': round(elapsed, 3),
+            'rows_per_sec': round(rows / elapsed) if elapsed > 0 else float('inf')
+        })
+    
+    df = pd.DataFrame(results)
+    if not skip_loop:
+        df['speedup'] = (df['rows_per_sec'] / df.loc[df['engine'] == 'loop', 'rows_per_sec'].iloc[0]).round(1)
+    return df
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark simulation engines')
+    parser.add_argument('--start', default='2023-01-01', help='Start date (YYYY-MM-DD)')
+    parser.add_argument('--end', default='2025-01-01', help='End date (YYYY-MM-DD, exclusive)')
+    parser.add_argument('--customers', type=int, default=1200)
+    parser.add_argument('--products', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--skip-loop', action='store_true', help='Only time the vectorized engine')
+    args = parser.parse_args()
+    
+    report = run_benchmark(datetime.strptime(args.start, '%Y-%m-%d'), datetime.strptime(args.end, '%Y-%m-%d'),
+                           args.customers, args.products, args.seed, args.skip_loop)
+    print("=" * 60)
+    print("SIMULATION ENGINE BENCHMARK")
+    print("=" * 60)
+    print(report.to_string(index=False))
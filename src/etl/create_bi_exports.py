@@ -3,20 +3,24 @@ Create BI-Ready Exports for Power BI/Tableau
 Produces clean, stable schema tables optimized for dashboard consumption
 """
 import pandas as pd
+import numpy as np
 import os
 import sys
 from datetime import datetime
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 from src.utils.common import load_config
+from src.utils.table_cache import load_table
+from src.utils.bi_tables import write_ipc
 
-def create_bi_exports(config_path='config.yaml', output_format='both'):
+def create_bi_exports(config_path='config.yaml', output_format='both', tables=None):
     """
     Create BI-ready exports with canonical schemas
     
     Args:
         config_path: Path to config file
         output_format: 'csv', 'parquet', or 'both'
+        tables: Optional pipeline TableCache (tables already loaded by earlier stages)
     """
     config = load_config(config_path)
     processed_path = config['paths']['processed_data']
@@ -34,19 +38,19 @@ def create_bi_exports(config_path='config.yaml', output_format='both'):
     # ============================================================
     
     print("\n[1/7] Creating dim_date.csv...")
-    dim_date = pd.read_csv(os.path.join(processed_path, 'dim_date.csv'))
+    dim_date = load_table(tables, processed_path, 'dim_date')
     dim_date_bi = dim_date[['date', 'year', 'month', 'quarter', 'day_of_week', 'is_weekend', 'year_month']].copy()
     dim_date_bi['date'] = pd.to_datetime(dim_date_bi['date']).dt.strftime('%Y-%m-%d')
     save_table(dim_date_bi, bi_path, 'dim_date', output_format)
     
     print("[2/7] Creating dim_customer.csv...")
-    dim_customer = pd.read_csv(os.path.join(processed_path, 'dim_customer.csv'))
+    dim_customer = load_table(tables, processed_path, 'dim_customer')
     dim_customer_bi = dim_customer[['customer_id', 'customer_name', 'segment', 'city', 'state', 'region_id', 'signup_date', 'cohort_month']].copy()
     dim_customer_bi['signup_date'] = pd.to_datetime(dim_customer_bi['signup_date']).dt.strftime('%Y-%m-%d')
     save_table(dim_customer_bi, bi_path, 'dim_customer', output_format)
     
     print("[3/7] Creating dim_product.csv...")
-    dim_product = pd.read_csv(os.path.join(processed_path, 'dim_product.csv'))
+    dim_product = load_table(tables, processed_path, 'dim_product')
     dim_product_bi = dim_product[['product_id', 'product_name', 'category', 'subcategory', 'brand', 'unit_cost', 'unit_price']].copy()
     save_table(dim_product_bi, bi_path, 'dim_product', output_format)
     
@@ -55,7 +59,7 @@ def create_bi_exports(config_path='config.yaml', output_format='both'):
     # ============================================================
     
     print("[4/7] Creating fact_transactions.csv (from fact_orders)...")
-    fact_orders = pd.read_csv(os.path.join(processed_path, 'fact_orders.csv'))
+    fact_orders = load_table(tables, processed_path, 'fact_orders')
     
     # Use actual columns from fact_orders
     fact_transactions = fact_orders[['order_id', 'order_date', 'customer_id', 'product_id', 
@@ -74,7 +78,7 @@ def create_bi_exports(config_path='config.yaml', output_format='both'):
     save_table(fact_transactions, bi_path, 'fact_transactions', output_format)
     
     print("[5/7] Creating fact_delivery.csv...")
-    fact_delivery = pd.read_parquet(os.path.join(processed_path, 'fact_delivery.parquet'))
+    fact_delivery = load_table(tables, processed_path, 'fact_delivery')
     fact_delivery_bi = fact_delivery[['order_id', 'dispatch_date', 'delivery_date', 
                                        'carrier', 'delivery_cost', 'delivery_time_days', 
                                        'sla_met', 'return_flag']].copy()
@@ -89,11 +93,11 @@ def create_bi_exports(config_path='config.yaml', output_format='both'):
     # ============================================================
     
     print("[6/7] Creating fact_kpis_daily.csv...")
-    fact_kpis_daily = create_daily_kpis(processed_path)
+    fact_kpis_daily = create_daily_kpis(processed_path, tables)
     save_table(fact_kpis_daily, bi_path, 'fact_kpis_daily', output_format)
     
     print("[7/7] Creating fact_kpis_monthly.csv...")
-    fact_kpis_monthly = create_monthly_kpis(processed_path)
+    fact_kpis_monthly = create_monthly_kpis(processed_path, tables)
     save_table(fact_kpis_monthly, bi_path, 'fact_kpis_monthly', output_format)
     
     # ============================================================
@@ -132,100 +136,128 @@ def create_bi_exports(config_path='config.yaml', output_format='both'):
     
     return manifest
 
-def create_daily_kpis(processed_path):
+# ============================================================
+# KPI REGISTRY
+# ============================================================
+# Each KPI is declared once: its source fact, the date key it is grouped by
+# and either an aggregation (column, func) on the source or a derived
+# expression over other KPIs of the same source. Long tables are built with
+# one groupby().agg() per source; a new KPI only needs a register_kpi call.
+
+DAILY_KPIS = []
+MONTHLY_KPIS = []
+
+def safe_ratio(num, den):
+    """num / den, 0 where den is not positive"""
+    return (num / den.where(den > 0)).where(den > 0, 0)
+
+def register_kpi(registry, name, source, date_key, agg=None, derive=None):
+    """
+    Register a KPI
+    
+    Args:
+        registry: DAILY_KPIS or MONTHLY_KPIS
+        name: kpi_name in the long table
+        source: key of the source fact table
+        date_key: column of the source fact to group by
+        agg: (column, aggregation) applied to the source fact
+        derive: callable(aggregated frame) -> Series, using earlier KPIs of the source
+    """
+    if (agg is None) == (derive is None):
+        raise ValueError(f"KPI {name}: specify exactly one of agg or derive")
+    registry.append({'name': name, 'source': source, 'date_key': date_key, 'agg': agg, 'derive': derive})
+
+# Daily KPIs (row order within a date follows registration order)
+register_kpi(DAILY_KPIS, 'revenue', 'orders', 'order_date', agg=('net_sales', 'sum'))
+register_kpi(DAILY_KPIS, 'gross_margin', 'orders', 'order_date', agg=('profit', 'sum'))
+register_kpi(DAILY_KPIS, 'orders', 'orders', 'order_date', agg=('order_id', 'nunique'))
+register_kpi(DAILY_KPIS, 'active_customers', 'orders', 'order_date', agg=('customer_id', 'nunique'))
+register_kpi(DAILY_KPIS, 'units_sold', 'orders', 'order_date', agg=('units', 'sum'))
+register_kpi(DAILY_KPIS, 'aov', 'orders', 'order_date', derive=lambda k: safe_ratio(k['revenue'], k['orders']))
+register_kpi(DAILY_KPIS, 'marketing_spend', 'marketing', 'date', agg=('spend', 'sum'))
+register_kpi(DAILY_KPIS, 'conversions', 'marketing', 'date', agg=('conversions', 'sum'))
+register_kpi(DAILY_KPIS, 'cac', 'marketing', 'date', derive=lambda k: safe_ratio(k['marketing_spend'], k['conversions']))
+register_kpi(DAILY_KPIS, 'sla_compliance', 'delivery', 'dispatch_date', agg=('sla_met', 'mean'))
+register_kpi(DAILY_KPIS, 'return_rate', 'delivery', 'dispatch_date', agg=('return_flag', 'mean'))
+register_kpi(DAILY_KPIS, 'stockout_rate', 'inventory', 'date', agg=('stockout_flag', 'mean'))
+register_kpi(DAILY_KPIS, 'inventory_value', 'inventory', 'date', agg=('closing_stock', 'sum'))
+
+# Monthly KPIs (monthly snapshot is already one row per month)
+register_kpi(MONTHLY_KPIS, 'revenue', 'monthly', 'year_month', agg=('monthly_revenue', 'first'))
+register_kpi(MONTHLY_KPIS, 'gross_margin', 'monthly', 'year_month', agg=('monthly_gross_margin', 'first'))
+register_kpi(MONTHLY_KPIS, 'orders', 'monthly', 'year_month', agg=('monthly_orders', 'first'))
+register_kpi(MONTHLY_KPIS, 'active_customers', 'monthly', 'year_month', agg=('active_customers', 'first'))
+register_kpi(MONTHLY_KPIS, 'cac', 'monthly', 'year_month', agg=('monthly_cac', 'first'))
+register_kpi(MONTHLY_KPIS, 'sla_compliance', 'monthly', 'year_month', agg=('monthly_sla_perf', 'first'))
+register_kpi(MONTHLY_KPIS, 'return_rate', 'monthly', 'year_month', agg=('monthly_return_rate', 'first'))
+register_kpi(MONTHLY_KPIS, 'stockout_rate', 'monthly', 'year_month', agg=('monthly_stockout_rate', 'first'))
+
+def build_kpi_table(facts, registry, date_col='date', sort=True):
+    """
+    Build a long (date, kpi_name, kpi_value) table from a KPI registry
+    
+    Args:
+        facts: dict of source name -> DataFrame
+        registry: list of registered KPIs
+        date_col: name of the date column in the output
+        sort: sort dates within each source (False keeps source order)
+    """
+    frames = []
+    sources = list(dict.fromkeys(k['source'] for k in registry))
+    
+    for source in sources:
+        kpis = [k for k in registry if k['source'] == source]
+        date_key = kpis[0]['date_key']
+        
+        # One groupby per source
+        named_aggs = {k['name']: k['agg'] for k in kpis if k['agg'] is not None}
+        agg = facts[source].groupby(date_key, sort=sort).agg(**named_aggs)
+        for k in kpis:
+            if k['derive'] is not None:
+                agg[k['name']] = k['derive'](agg)
+        
+        # Reshape dates x KPIs to long, date-major in registration order
+        names = [k['name'] for k in kpis]
+        frames.append(pd.DataFrame({
+            date_col: np.repeat(agg.index.values, len(names)),
+            'kpi_name': np.tile(names, len(agg)),
+            'kpi_value': agg[names].to_numpy(dtype=float).ravel()
+        }))
+    
+    return pd.concat(frames, ignore_index=True)
+
+def create_daily_kpis(processed_path, tables=None):
     """Create daily aggregated KPIs"""
     
     # Load fact tables
-    orders = pd.read_csv(os.path.join(processed_path, 'fact_orders.csv'))
+    orders = load_table(tables, processed_path, 'fact_orders')
     orders['order_date'] = pd.to_datetime(orders['order_date'])
     
-    marketing = pd.read_parquet(os.path.join(processed_path, 'fact_marketing.parquet'))
+    marketing = load_table(tables, processed_path, 'fact_marketing')
     marketing['date'] = pd.to_datetime(marketing['date'])
     
-    delivery = pd.read_parquet(os.path.join(processed_path, 'fact_delivery.parquet'))
+    delivery = load_table(tables, processed_path, 'fact_delivery')
     delivery['dispatch_date'] = pd.to_datetime(delivery['dispatch_date'])
     
-    inventory = pd.read_parquet(os.path.join(processed_path, 'fact_inventory.parquet'))
+    inventory = load_table(tables, processed_path, 'fact_inventory')
     inventory['date'] = pd.to_datetime(inventory['date'])
     
-    kpis = []
-    
-    # Revenue KPIs
-    revenue_daily = orders.groupby('order_date').agg({
-        'net_sales': 'sum',
-        'profit': 'sum',
-        'order_id': 'nunique',
-        'customer_id': 'nunique',
-        'units': 'sum'
-    }).reset_index()
-    
-    for _, row in revenue_daily.iterrows():
-        kpis.append({'date': row['order_date'], 'kpi_name': 'revenue', 'kpi_value': row['net_sales']})
-        kpis.append({'date': row['order_date'], 'kpi_name': 'gross_margin', 'kpi_value': row['profit']})
-        kpis.append({'date': row['order_date'], 'kpi_name': 'orders', 'kpi_value': row['order_id']})
-        kpis.append({'date': row['order_date'], 'kpi_name': 'active_customers', 'kpi_value': row['customer_id']})
-        kpis.append({'date': row['order_date'], 'kpi_name': 'units_sold', 'kpi_value': row['units']})
-        kpis.append({'date': row['order_date'], 'kpi_name': 'aov', 'kpi_value': row['net_sales'] / row['order_id'] if row['order_id'] > 0 else 0})
-    
-    # Marketing KPIs
-    mkt_daily = marketing.groupby('date').agg({
-        'spend': 'sum',
-        'conversions': 'sum',
-        'clicks': 'sum'
-    }).reset_index()
-    
-    for _, row in mkt_daily.iterrows():
-        kpis.append({'date': row['date'], 'kpi_name': 'marketing_spend', 'kpi_value': row['spend']})
-        kpis.append({'date': row['date'], 'kpi_name': 'conversions', 'kpi_value': row['conversions']})
-        kpis.append({'date': row['date'], 'kpi_name': 'cac', 'kpi_value': row['spend'] / row['conversions'] if row['conversions'] > 0 else 0})
-    
-    # Delivery KPIs
-    dlv_daily = delivery.groupby('dispatch_date').agg({
-        'sla_met': 'mean',
-        'return_flag': 'mean'
-    }).reset_index()
-    
-    for _, row in dlv_daily.iterrows():
-        kpis.append({'date': row['dispatch_date'], 'kpi_name': 'sla_compliance', 'kpi_value': row['sla_met']})
-        kpis.append({'date': row['dispatch_date'], 'kpi_name': 'return_rate', 'kpi_value': row['return_flag']})
-    
-    # Inventory KPIs
-    inv_daily = inventory.groupby('date').agg({
-        'stockout_flag': 'mean',
-        'closing_stock': 'sum'
-    }).reset_index()
-    
-    for _, row in inv_daily.iterrows():
-        kpis.append({'date': row['date'], 'kpi_name': 'stockout_rate', 'kpi_value': row['stockout_flag']})
-        kpis.append({'date': row['date'], 'kpi_name': 'inventory_value', 'kpi_value': row['closing_stock']})
-    
-    df_kpis = pd.DataFrame(kpis)
+    facts = {'orders': orders, 'marketing': marketing, 'delivery': delivery, 'inventory': inventory}
+    df_kpis = build_kpi_table(facts, DAILY_KPIS, date_col='date')
     df_kpis['date'] = pd.to_datetime(df_kpis['date']).dt.strftime('%Y-%m-%d')
     
     return df_kpis
 
-def create_monthly_kpis(processed_path):
+def create_monthly_kpis(processed_path, tables=None):
     """Create monthly aggregated KPIs"""
     
     # Load monthly snapshot
-    monthly = pd.read_parquet(os.path.join(processed_path, 'monthly_snapshot.parquet'))
-    
-    kpis = []
+    monthly = load_table(tables, processed_path, 'monthly_snapshot')
     
-    for _, row in monthly.iterrows():
-        kpis.append({'year_month': row['year_month'], 'kpi_name': 'revenue', 'kpi_value': row['monthly_revenue']})
-        kpis.append({'year_month': row['year_month'], 'kpi_name': 'gross_margin', 'kpi_value': row['monthly_gross_margin']})
-        kpis.append({'year_month': row['year_month'], 'kpi_name': 'orders', 'kpi_value': row['monthly_orders']})
-        kpis.append({'year_month': row['year_month'], 'kpi_name': 'active_customers', 'kpi_value': row['active_customers']})
-        kpis.append({'year_month': row['year_month'], 'kpi_name': 'cac', 'kpi_value': row['monthly_cac']})
-        kpis.append({'year_month': row['year_month'], 'kpi_name': 'sla_compliance', 'kpi_value': row['monthly_sla_perf']})
-        kpis.append({'year_month': row['year_month'], 'kpi_name': 'return_rate', 'kpi_value': row['monthly_return_rate']})
-        kpis.append({'year_month': row['year_month'], 'kpi_name': 'stockout_rate', 'kpi_value': row['monthly_stockout_rate']})
-    
-    return pd.DataFrame(kpis)
+    return build_kpi_table({'monthly': monthly}, MONTHLY_KPIS, date_col='year_month', sort=False)
 
 def save_table(df, path, name, format_type):
-    """Save table in specified format(s)"""
+    """Save table in specified format(s), plus the Arrow IPC copy read by reports"""
     if format_type in ['csv', 'both']:
         df.to_csv(os.path.join(path, f'{name}.csv'), index=False)
         print(f"  ✓ Saved {name}.csv ({len(df):,} rows)")
@@ -233,6 +265,10 @@ def save_table(df, path, name, format_type):
     if format_type in ['parquet', 'both']:
         df.to_parquet(os.path.join(path, f'{name}.parquet'), index=False)
         print(f"  ✓ Saved {name}.parquet ({len(df):,} rows)")
+    
+    # Written last so it is never older than the copies above
+    write_ipc(df, os.path.join(path, f'{name}.feather'))
+    print(f"  ✓ Saved {name}.feather ({len(df):,} rows)")
 
 if __name__ == "__main__":
     import argparse
@@ -5,8 +5,11 @@ import sys
 # Add project root to sys.path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 from src.utils.common import load_config
+from src.utils.table_cache import load_table
+from src.utils.storage import write_table
+from src.etl.customer_state import load_customer_state, build_customer_state
 
-def create_snapshots(config_path='config.yaml'):
+def create_snapshots(config_path='config.yaml', tables=None):
     config = load_config(config_path)
     processed_path = config['paths']['processed_data']
     snapshot_path = os.path.join('data', 'snapshots')
@@ -14,17 +17,11 @@ def create_snapshots(config_path='config.yaml'):
     if not os.path.exists(snapshot_path):
         os.makedirs(snapshot_path)
         
-    # Support Parquet
-    fact_path = os.path.join(processed_path, 'fact_orders.parquet')
-    if not os.path.exists(fact_path):
-        fact_path = os.path.join(processed_path, 'fact_orders.csv')
-        if os.path.exists(fact_path):
-             df = pd.read_csv(fact_path)
-        else:
-             print("Fact table not found.")
-             return
-    else:
-        df = pd.read_parquet(fact_path)
+    # Partitioned dataset, Parquet or CSV
+    df = load_table(tables, processed_path, 'fact_orders')
+    if df is None:
+        print("Fact table not found.")
+        return
 
     df['order_date'] = pd.to_datetime(df['order_date'])
     df['year_month'] = df['order_date'].dt.to_period('M')
@@ -46,7 +43,7 @@ def create_snapshots(config_path='config.yaml'):
     orders_agg['year_month'] = orders_agg['year_month'].astype(str)
 
     # 2. Marketing Agg
-    mkt = pd.read_parquet(os.path.join(processed_path, 'fact_marketing.parquet'))
+    mkt = load_table(tables, processed_path, 'fact_marketing')
     mkt['date'] = pd.to_datetime(mkt['date'])
     mkt['year_month'] = mkt['date'].dt.to_period('M').astype(str)
     
@@ -57,7 +54,7 @@ def create_snapshots(config_path='config.yaml'):
     mkt_agg['monthly_cac'] = mkt_agg['spend'] / mkt_agg['conversions']
     
     # 3. Delivery
-    dlv = pd.read_parquet(os.path.join(processed_path, 'fact_delivery.parquet'))
+    dlv = load_table(tables, processed_path, 'fact_delivery')
     dlv['dispatch_date'] = pd.to_datetime(dlv['dispatch_date'])
     dlv['year_month'] = dlv['dispatch_date'].dt.to_period('M').astype(str) # Use dispatch month
     
@@ -68,7 +65,7 @@ def create_snapshots(config_path='config.yaml'):
     dlv_agg.rename(columns={'sla_met': 'monthly_sla_perf', 'return_flag': 'monthly_return_rate'}, inplace=True)
     
     # 4. Inventory
-    inv = pd.read_parquet(os.path.join(processed_path, 'fact_inventory.parquet'))
+    inv = load_table(tables, processed_path, 'fact_inventory')
     inv['date'] = pd.to_datetime(inv['date'])
     inv['year_month'] = inv['date'].dt.to_period('M').astype(str)
     
@@ -89,20 +86,19 @@ def create_snapshots(config_path='config.yaml'):
     
     # Also save as Parquet in processed folder (Requirement)
     parquet_out = os.path.join(processed_path, 'monthly_snapshot.parquet')
-    final_agg.to_parquet(parquet_out, index=False)
+    final_agg = write_table(final_agg, processed_path, 'monthly_snapshot')
+    if tables is not None:
+        tables.put('monthly_snapshot', final_agg)
     print(f"Saved snapshot parquet to {parquet_out}")
     
     print(final_agg.tail())
 
     # LTV Snapshot (Cohort)
     print("\nCreating Customer LTV Snapshot...")
-    ltv_df = df.groupby('customer_id').agg({
-        'net_sales': 'sum',
-        'order_id': 'count',
-        'order_date': ['min', 'max']
-    }).reset_index()
-    
-    # Flatten columns
+    state = load_customer_state(processed_path)
+    if state is None:
+        state = build_customer_state(df)
+    ltv_df = state[['customer_id', 'lifetime_net_sales', 'order_count', 'first_order_date', 'last_order_date']].sort_values('customer_id')
     ltv_df.columns = ['customer_id', 'total_revenue', 'total_orders', 'first_order', 'last_order']
     
     ltv_out = os.path.join(snapshot_path, 'customer_ltv_snapshot.csv')
@@ -0,0 +1,125 @@
+"""
+Persistent per-customer order state
+One row per customer: first order (date, id), last order date, order count and
+lifetime net sales. Updated from each order batch so that repeat flags, cohorts
+and LTV do not rescan the full order history.
+"""
+import os
+
+import pandas as pd
+
+STATE_FILE = 'customer_state.parquet'
+STATE_COLUMNS = ['customer_id', 'first_order_date', 'first_order_id', 'last_order_date',
+                 'order_count', 'lifetime_net_sales']
+
+def empty_customer_state():
+    return pd.DataFrame({
+        'customer_id': pd.Series(dtype=object),
+        'first_order_date': pd.Series(dtype='datetime64[ns]'),
+        # Integer ids or ORD-<n> strings
+        'first_order_id': pd.Series(dtype=object),
+        'last_order_date': pd.Series(dtype='datetime64[ns]'),
+        'order_count': pd.Series(dtype='int64'),
+        'lifetime_net_sales': pd.Series(dtype=float)
+    })
+
+def order_number(order_ids):
+    """Numeric part of order ids (plain integers or ORD-<n>), so ORD-9 orders before ORD-10; NaN if none"""
+    if pd.api.types.is_numeric_dtype(order_ids):
+        return order_ids.astype(float)
+    return pd.to_numeric(order_ids.astype(str).str.extract(r'(\d+)$', expand=False), errors='coerce')
+
+def earlier_order_id(a, b):
+    """Element-wise a before b by order number (ids without one compare as strings)"""
+    na, nb = order_number(a), order_number(b)
+    return (na < nb).where(na.notna() & nb.notna(), a.astype(str) < b.astype(str))
+
+def state_path(processed_path):
+    return os.path.join(processed_path, STATE_FILE)
+
+def load_customer_state(processed_path):
+    """Persisted customer state, or None if it has not been built yet"""
+    path = state_path(processed_path)
+    if os.path.exists(path):
+        return pd.read_parquet(path)
+    return None
+
+def save_customer_state(processed_path, state):
+    state.to_parquet(state_path(processed_path), index=False)
+
+def build_customer_state(orders):
+    """
+    Full build from order rows (order_id, order_date, customer_id, net_sales)
+
+    A customer's first order is the earliest (order_date, order number), so
+    same-day ties go to the lower ORD-<n> number rather than the string order.
+    """
+    if orders is None or orders.empty:
+        return empty_customer_state()
+    orders = orders[['order_id', 'order_date', 'customer_id', 'net_sales']].copy()
+    orders['order_date'] = pd.to_datetime(orders['order_date'])
+    # Plain strings: fact tables may carry customer_id as a categorical
+    orders['customer_id'] = orders['customer_id'].astype(str)
+    orders['order_number'] = order_number(orders['order_id'])
+    first = (orders.sort_values(['order_date', 'order_number', 'order_id'])
+                   .drop_duplicates('customer_id')
+                   .set_index('customer_id'))
+    agg = orders.groupby('customer_id').agg(
+        last_order_date=('order_date', 'max'),
+        order_count=('order_id', 'count'),
+        lifetime_net_sales=('net_sales', 'sum'))
+    state = agg.join(first[['order_date', 'order_id']].rename(
+        columns={'order_date': 'first_order_date', 'order_id': 'first_order_id'}))
+    return state.reset_index()[STATE_COLUMNS]
+
+def update_customer_state(state, batch, removed=None):
+    """
+    Fold a batch of new orders (and the rows it replaced) into the state
+
+    Counts and sales are adjusted by difference. First/last dates can only be
+    combined when the replaced rows did not define them; such customers are
+    returned as stale and must be rebuilt from their full history.
+
+    Returns:
+        updated state, set of stale customer_ids
+    """
+    delta = build_customer_state(batch).set_index('customer_id')
+    state = state.set_index('customer_id')
+    stale = set()
+
+    if removed is not None and not removed.empty:
+        removed = removed.copy()
+        removed['order_date'] = pd.to_datetime(removed['order_date'])
+        minus = removed.groupby('customer_id').agg(
+            order_count=('order_id', 'count'), lifetime_net_sales=('net_sales', 'sum'))
+        known = minus.index.intersection(state.index)
+        state.loc[known, 'order_count'] -= minus.loc[known, 'order_count']
+        state.loc[known, 'lifetime_net_sales'] -= minus.loc[known, 'lifetime_net_sales']
+
+        # Replaced rows whose customer or date changed may have defined first/last
+        restated = removed.merge(batch[['order_id', 'order_date', 'customer_id']], on='order_id',
+                                 how='left', suffixes=('', '_new'))
+        restated['order_date_new'] = pd.to_datetime(restated['order_date_new'])
+        moved = restated[(restated['customer_id'] != restated['customer_id_new']) |
+                         (restated['order_date'] != restated['order_date_new'])]
+        stale = set(moved['customer_id'])
+
+    both = delta.index.intersection(state.index)
+    new = delta.index.difference(state.index)
+    if len(both):
+        cur, add = state.loc[both], delta.loc[both]
+        earlier = (add['first_order_date'] < cur['first_order_date']) | \
+                  ((add['first_order_date'] == cur['first_order_date']) & earlier_order_id(add['first_order_id'], cur['first_order_id']))
+        state.loc[both, 'first_order_date'] = add['first_order_date'].where(earlier, cur['first_order_date'])
+        state.loc[both, 'first_order_id'] = add['first_order_id'].where(earlier, cur['first_order_id'])
+        state.loc[both, 'last_order_date'] = add['last_order_date'].where(add['last_order_date'] > cur['last_order_date'], cur['last_order_date'])
+        state.loc[both, 'order_count'] += add['order_count']
+        state.loc[both, 'lifetime_net_sales'] += add['lifetime_net_sales']
+    state = pd.concat([state, delta.loc[new]])
+    state = state[state['order_count'] > 0]
+    return state.reset_index()[STATE_COLUMNS], stale
+
+def replace_customers(state, rebuilt, customer_ids):
+    """Swap in fully rebuilt rows for the given customers"""
+    kept = state[~state['customer_id'].isin(customer_ids)]
+    return pd.concat([kept, rebuilt[rebuilt['customer_id'].isin(customer_ids)]], ignore_index=True)[STATE_COLUMNS]
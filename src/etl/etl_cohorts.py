@@ -1,72 +1,201 @@
 import pandas as pd
+import numpy as np
 import os
+import glob
 import sys
 
-def process_cohorts(config, logger):
+from src.utils.table_cache import load_table
+from src.utils.storage import read_table, write_table, table_exists
+from src.etl.customer_state import load_customer_state
+from src.etl.etl_orders import CHANGES_DIR
+
+# Mergeable cohort state: one row per (customer, order month) with revenue and order sums.
+# A cohort cell is the join of this table with each customer's cohort month, so distinct
+# customers per cell are exact and any cell can be recomputed without the order history.
+ACTIVITY_FILE = 'cohort_activity.parquet'
+COHORT_MAP_FILE = 'cohort_customers.parquet'
+OUTPUT_TABLE = 'fact_cohort_monthly'
+
+def customer_month_activity(orders):
+    """Aggregate order rows (optionally signed) to customer/month revenue and order counts"""
+    orders = orders.copy()
+    orders['order_date'] = pd.to_datetime(orders['order_date'])
+    if 'sign' not in orders.columns:
+        orders['sign'] = 1
+    orders['order_month'] = orders['order_date'].dt.strftime('%Y-%m')
+    orders['revenue'] = orders['net_sales'] * orders['sign']
+    return orders.groupby(['customer_id', 'order_month']).agg(
+        revenue=('revenue', 'sum'), orders=('sign', 'sum')).reset_index()
+
+def apply_activity_delta(activity, delta):
+    """
+    Merge a signed customer/month delta into the activity table
+
+    Returns:
+        updated activity, touched (customer_id, order_month) rows
+    """
+    activity = activity.set_index(['customer_id', 'order_month'])
+    delta = delta.set_index(['customer_id', 'order_month'])
+    known = delta.index.intersection(activity.index)
+    activity.loc[known, 'revenue'] += delta.loc[known, 'revenue']
+    activity.loc[known, 'orders'] += delta.loc[known, 'orders']
+    activity = pd.concat([activity, delta.loc[delta.index.difference(activity.index)]])
+    activity = activity[activity['orders'] > 0]
+    return activity.reset_index(), delta.index.to_frame(index=False)
+
+def customer_cohorts(processed_path, activity):
+    """customer_id -> cohort month (YYYY-MM), from the customer state when available"""
+    state = load_customer_state(processed_path)
+    if state is not None:
+        return pd.DataFrame({'customer_id': state['customer_id'],
+                             'cohort_month': pd.to_datetime(state['first_order_date']).dt.strftime('%Y-%m')})
+    # First active month is the first order month
+    return activity.groupby('customer_id')['order_month'].min().rename('cohort_month').reset_index()
+
+def cohort_cells(activity, cohorts):
+    """Cohort matrix cells from the activity table and customer cohorts"""
+    df = activity.merge(cohorts, on='customer_id', how='inner')
+    order_month = pd.PeriodIndex(df['order_month'], freq='M')
+    cohort_month = pd.PeriodIndex(df['cohort_month'], freq='M')
+    df['months_since_first'] = (order_month.year - cohort_month.year) * 12 + (order_month.month - cohort_month.month)
+    cells = df.groupby(['cohort_month', 'months_since_first']).agg(
+        active_customers=('customer_id', 'count'),
+        revenue=('revenue', 'sum'),
+        orders=('orders', 'sum')).reset_index()
+    cells['orders'] = cells['orders'].astype(int)
+    return cells
+
+def finalize_cohort_fact(cohort_fact):
+    """Attach cohort size (month 0) and retention rate"""
+    cohort_fact = cohort_fact.drop(columns=['cohort_size', 'retention_rate'], errors='ignore')
+    cohort_fact = cohort_fact.sort_values(['cohort_month', 'months_since_first']).reset_index(drop=True)
+    cohort_sizes = cohort_fact[cohort_fact['months_since_first'] == 0][['cohort_month', 'active_customers']]
+    cohort_sizes = cohort_sizes.rename(columns={'active_customers': 'cohort_size'})
+    cohort_fact = cohort_fact.merge(cohort_sizes, on='cohort_month', how='left')
+    cohort_fact['retention_rate'] = cohort_fact['active_customers'] / cohort_fact['cohort_size']
+    return cohort_fact
+
+def rebuild_cohorts(orders):
+    """Full rebuild from the order history (reference for verification)"""
+    orders = orders.copy()
+    orders['order_date'] = pd.to_datetime(orders['order_date'])
+
+    # Determine Cohort (First Order Month) for each customer
+    cohorts = orders.groupby('customer_id')['order_date'].min().reset_index()
+    cohorts.rename(columns={'order_date': 'first_purchase_date'}, inplace=True)
+    cohorts['cohort_month'] = cohorts['first_purchase_date'].dt.to_period('M')
+
+    # Merge back to orders
+    df = orders.merge(cohorts, on='customer_id', how='left')
+
+    # Calculate Retention: periods since first purchase
+    df['months_since_first'] = (df['order_date'].dt.year - df['first_purchase_date'].dt.year) * 12 + \
+                               (df['order_date'].dt.month - df['first_purchase_date'].dt.month)
+
+    # Cohort table: Cohort Month, Months Since, Revenue, Active Customers
+    cohort_fact = df.groupby(['cohort_month', 'months_since_first']).agg({
+        'customer_id': 'nunique',
+        'net_sales': 'sum',
+        'order_id': 'nunique'
+    }).reset_index()
+
+    cohort_fact.rename(columns={
+        'customer_id': 'active_customers',
+        'net_sales': 'revenue',
+        'order_id': 'orders'
+    }, inplace=True)
+
+    # Convert to string for storage
+    cohort_fact['cohort_month'] = cohort_fact['cohort_month'].astype(str)
+    return finalize_cohort_fact(cohort_fact)
+
+def pending_changes(processed_path):
+    return sorted(glob.glob(os.path.join(processed_path, CHANGES_DIR, '*.parquet')))
+
+def verify_cohorts(cohort_fact, orders, logger):
+    """Compare the incremental matrix with a full rebuild; raises ValueError on mismatch"""
+    expected = rebuild_cohorts(orders)
+    keys = ['cohort_month', 'months_since_first']
+    actual = cohort_fact.sort_values(keys).reset_index(drop=True)
+    expected = expected.sort_values(keys).reset_index(drop=True)
+
+    exact = keys + ['active_customers', 'orders', 'cohort_size']
+    ok = len(actual) == len(expected) and \
+        (actual[exact].values == expected[exact].values).all() and \
+        np.allclose(actual[['revenue', 'retention_rate']].values, expected[['revenue', 'retention_rate']].values)
+    if not ok:
+        logger.error("Cohort verification FAILED: incremental matrix differs from full rebuild")
+        raise ValueError("Incremental cohort matrix does not match full rebuild")
+    logger.info(f"Cohort verification passed ({len(actual)} cells match full rebuild)")
+
+def process_cohorts(config, logger, verify=None, tables=None):
+    """
+    Maintain fact_cohort_monthly incrementally
+
+    Pending order changes (written by etl_orders) are folded into the
+    customer/month activity table and only cohorts touched by the batch, or by
+    customers whose first order month moved, are recomputed. The first run
+    (or a missing state file) does a full build. With verify (or
+    etl.verify_cohorts in config) the result is checked against a full rebuild.
+    """
     logger.info("Processing Cohorts...")
-    
+
     processed_path = config['paths']['processed_data']
-    
+    if verify is None:
+        verify = config.get('etl', {}).get('verify_cohorts', False)
+    activity_file = os.path.join(processed_path, ACTIVITY_FILE)
+    map_file = os.path.join(processed_path, COHORT_MAP_FILE)
+
     try:
-        # Load Orders
-        orders_path = os.path.join(processed_path, 'fact_orders.parquet')
-        if not os.path.exists(orders_path):
-             orders_path = os.path.join(processed_path, 'fact_orders.csv')
-             
-        if orders_path.endswith('.parquet'):
-            orders = pd.read_parquet(orders_path)
+        changes = pending_changes(processed_path)
+        full_build = not (os.path.exists(activity_file) and os.path.exists(map_file)
+                          and table_exists(processed_path, OUTPUT_TABLE))
+
+        if full_build:
+            # Load Orders
+            orders = load_table(tables, processed_path, 'fact_orders', columns=['order_id', 'order_date', 'customer_id', 'net_sales'])
+            activity = customer_month_activity(orders)
+            cohorts = customer_cohorts(processed_path, activity)
+            cohort_fact = finalize_cohort_fact(cohort_cells(activity, cohorts))
+            logger.info("Built cohort state from full order history")
+        elif changes:
+            activity = pd.read_parquet(activity_file)
+            old_cohorts = pd.read_parquet(map_file)
+            delta = customer_month_activity(pd.concat([pd.read_parquet(f) for f in changes], ignore_index=True))
+            activity, touched = apply_activity_delta(activity, delta)
+            cohorts = customer_cohorts(processed_path, activity)
+
+            # Customers whose cohort changed contribute to both their old and new cohort
+            moved = old_cohorts.merge(cohorts, on='customer_id', suffixes=('_old', ''))
+            moved = moved[moved['cohort_month_old'] != moved['cohort_month']]
+            touched_customers = pd.Index(touched['customer_id']).union(moved['customer_id'])
+            affected = set(cohorts.loc[cohorts['customer_id'].isin(touched_customers), 'cohort_month']) | \
+                       set(old_cohorts.loc[old_cohorts['customer_id'].isin(touched_customers), 'cohort_month'])
+
+            members = cohorts[cohorts['cohort_month'].isin(affected)]
+            updated = cohort_cells(activity[activity['customer_id'].isin(members['customer_id'])], members)
+            cohort_fact = read_table(processed_path, OUTPUT_TABLE)
+            cohort_fact = pd.concat([cohort_fact[~cohort_fact['cohort_month'].isin(affected)], updated], ignore_index=True)
+            cohort_fact = finalize_cohort_fact(cohort_fact)
+            logger.info(f"Applied {len(changes)} order change batches ({len(affected)} cohorts recomputed)")
         else:
-            orders = pd.read_csv(orders_path)
-            
-        orders['order_date'] = pd.to_datetime(orders['order_date'])
-        
-        # Determine Cohort (First Order Month) for each customer
-        cohorts = orders.groupby('customer_id')['order_date'].min().reset_index()
-        cohorts.rename(columns={'order_date': 'first_purchase_date'}, inplace=True)
-        cohorts['cohort_month'] = cohorts['first_purchase_date'].dt.to_period('M')
-        
-        # Merge back to orders
-        df = orders.merge(cohorts, on='customer_id', how='left')
-        df['order_month'] = df['order_date'].dt.to_period('M')
-        
-        # Calculate Retention: periods since first purchase
-        # period_number = (order_month - cohort_month).n (months)
-        # We need integer diff
-        
-        def diff_month(d1, d2):
-            return (d1.year - d2.year) * 12 + d1.month - d2.month
-
-        # Optimization: Use vectorization
-        df['months_since_first'] = (df['order_date'].dt.year - df['first_purchase_date'].dt.year) * 12 + \
-                                   (df['order_date'].dt.month - df['first_purchase_date'].dt.month)
-        
-        # Cohort table: Cohort Month, Months Since, Revenue, Active Customers
-        cohort_fact = df.groupby(['cohort_month', 'months_since_first']).agg({
-            'customer_id': 'nunique',
-            'net_sales': 'sum',
-            'order_id': 'nunique'
-        }).reset_index()
-        
-        cohort_fact.rename(columns={
-            'customer_id': 'active_customers',
-            'net_sales': 'revenue',
-            'order_id': 'orders'
-        }, inplace=True)
-        
-        # Calculate Cohort Size (Month 0 count)
-        cohort_sizes = cohort_fact[cohort_fact['months_since_first'] == 0][['cohort_month', 'active_customers']]
-        cohort_sizes.rename(columns={'active_customers': 'cohort_size'}, inplace=True)
-        
-        cohort_fact = cohort_fact.merge(cohort_sizes, on='cohort_month', how='left')
-        cohort_fact['retention_rate'] = cohort_fact['active_customers'] / cohort_fact['cohort_size']
-        
-        # Convert to string for storage
-        cohort_fact['cohort_month'] = cohort_fact['cohort_month'].astype(str)
-        
-        output_file = os.path.join(processed_path, 'fact_cohort_monthly.csv')
-        cohort_fact.to_csv(output_file, index=False)
-        logger.info(f"Saved fact_cohort_monthly.csv ({len(cohort_fact)} rows)")
-        
+            logger.info("No pending order changes; cohort matrix is up to date.")
+            cohort_fact = read_table(processed_path, OUTPUT_TABLE)
+            activity = cohorts = None
+
+        if activity is not None:
+            activity.to_parquet(activity_file, index=False)
+            cohorts.to_parquet(map_file, index=False)
+            cohort_fact = write_table(cohort_fact, processed_path, OUTPUT_TABLE)
+            logger.info(f"Saved fact_cohort_monthly.parquet ({len(cohort_fact)} rows)")
+        # Changes are folded into the activity table (or covered by the full build)
+        for f in changes:
+            os.remove(f)
+
+        if verify:
+            orders = load_table(tables, processed_path, 'fact_orders', columns=['order_id', 'order_date', 'customer_id', 'net_sales'])
+            verify_cohorts(cohort_fact, orders, logger)
+
     except Exception as e:
         logger.error(f"Cohort ETL Failed: {e}")
         raise
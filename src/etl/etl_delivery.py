@@ -2,14 +2,22 @@ import pandas as pd
 import os
 import sys
 
-def process_delivery(config, logger):
+from src.utils.common import read_raw_table
+from src.utils.dim_index import load_dim_index
+from src.utils.sla_rules import SlaRules, sla_metrics, DEFAULT_PERCENTILES
+from src.utils.storage import write_table
+
+# Rule keys looked up on the delivery's order
+ORDER_KEYS = ['region_id', 'channel']
+
+def process_delivery(config, logger, tables=None):
     logger.info("Processing Delivery...")
     
     raw_path = config['paths']['raw_data']
     processed_path = config['paths']['processed_data']
     
     try:
-        df = pd.read_csv(os.path.join(raw_path, 'delivery_log.csv'))
+        df = read_raw_table(raw_path, 'delivery_log')
         
         # Date conversions
         df['dispatch_date'] = pd.to_datetime(df['dispatch_date'])
@@ -18,14 +26,25 @@ def process_delivery(config, logger):
         # Calculate Delivery Time
         df['delivery_time_days'] = (df['delivery_date'] - df['dispatch_date']).dt.days
         
-        # SLA Logic
-        # SLA met if <= 5 days
-        df['promise_days'] = 5
-        df['sla_met'] = df['delivery_time_days'].apply(lambda x: 1 if x <= 5 else 0)
+        # SLA Logic (promise days per carrier/region/channel from config.yaml)
+        rules = SlaRules.from_config(config)
+        order_keys = [key for key in ORDER_KEYS if rules.levels[key]]
+        if order_keys:
+            # Region and channel come from each delivery's order
+            orders = load_dim_index(tables, processed_path, 'fact_orders', 'order_id', order_keys)
+            if orders is not None:
+                df = orders.enrich(df, attributes=orders.attributes)
+            missing = [key for key in order_keys if orders is None or key not in orders.attributes]
+            if missing:
+                logger.warning(f"SLA rules on {', '.join(missing)} will not match (not in fact_orders)")
+        df = rules.apply(df).drop(columns=[c for c in ORDER_KEYS if c in df.columns])
+        
+        df = write_table(df, processed_path, 'fact_delivery')
+        logger.info(f"Saved fact_delivery/ ({len(df)} rows)")
         
-        output_file = os.path.join(processed_path, 'fact_delivery.parquet')
-        df.to_parquet(output_file, index=False)
-        logger.info(f"Saved fact_delivery.parquet ({len(df)} rows)")
+        percentiles = config.get('sla', {}).get('percentiles', DEFAULT_PERCENTILES)
+        metrics = write_table(sla_metrics(df, percentiles), processed_path, 'fact_delivery_sla')
+        logger.info(f"Saved fact_delivery_sla.parquet ({len(metrics)} rows)")
         
     except Exception as e:
         logger.error(f"Delivery ETL Failed: {e}")
@@ -1,7 +1,9 @@
 import pandas as pd
 import os
 import sys
-from datetime import datetime, timedelta
+
+from src.utils.date_dim import date_dim_from_config
+from src.utils.storage import write_table
 
 def process_customers(config, logger):
     logger.info("Processing Customers...")
@@ -29,16 +31,14 @@ def process_customers(config, logger):
         # Cohort Logic (Signup Month)
         if 'signup_date' in df.columns:
             df['signup_date'] = pd.to_datetime(df['signup_date'])
-            df['cohort_month'] = df['signup_date'].dt.to_period('M')
+            df['cohort_month'] = df['signup_date'].dt.strftime('%Y-%m')
         
         # Add Snapshot Date (CDC/SCD Type 1)
         df['etl_last_updated'] = pd.Timestamp.now()
         
         # Save
-        os.makedirs(processed_path, exist_ok=True)
-        output_file = os.path.join(processed_path, 'dim_customer.csv')
-        df.to_csv(output_file, index=False)
-        logger.info(f"Saved dim_customer.csv ({len(df)} rows)")
+        write_table(df, processed_path, 'dim_customer')
+        logger.info(f"Saved dim_customer.parquet ({len(df)} rows)")
         
     except Exception as e:
         logger.error(f"Failed to process customers: {e}")
@@ -70,10 +70,8 @@ def process_products(config, logger):
         df['reorder_point'] = 20  # Default value
         
         # Save
-        os.makedirs(processed_path, exist_ok=True)
-        output_file = os.path.join(processed_path, 'dim_product.csv')
-        df.to_csv(output_file, index=False)
-        logger.info(f"Saved dim_product.csv ({len(df)} rows)")
+        write_table(df, processed_path, 'dim_product')
+        logger.info(f"Saved dim_product.parquet ({len(df)} rows)")
         
     except Exception as e:
         logger.error(f"Failed to process products: {e}")
@@ -91,9 +89,8 @@ def process_regions(config, logger):
             return
 
         df = pd.read_csv(input_file)
-        output_file = os.path.join(processed_path, 'dim_region.csv')
-        df.to_csv(output_file, index=False)
-        logger.info(f"Saved dim_region.csv ({len(df)} rows)")
+        write_table(df, processed_path, 'dim_region')
+        logger.info(f"Saved dim_region.parquet ({len(df)} rows)")
         
     except Exception as e:
         logger.error(f"Failed to process regions: {e}")
@@ -102,37 +99,13 @@ def process_regions(config, logger):
 def generate_date_dim(config, logger):
     logger.info("Generating Date Dimension...")
     processed_path = config['paths']['processed_data']
-    start_year = config['etl'].get('date_dim_start_year', 2022)
-    end_year = config['etl'].get('date_dim_end_year', 2025)
     
     try:
-        start_date = datetime(start_year, 1, 1)
-        end_date = datetime(end_year, 12, 31)
-        delta = end_date - start_date
-        
-        date_list = [start_date + timedelta(days=i) for i in range(delta.days + 1)]
-        
-        data = []
-        for d in date_list:
-            data.append({
-                'date': d,
-                'date_key': int(d.strftime('%Y%m%d')), # Good for SK
-                'year': d.year,
-                'quarter': (d.month - 1) // 3 + 1,
-                'month': d.month,
-                'month_name': d.strftime('%B'),
-                'day': d.day,
-                'day_of_week': d.weekday(), # 0=Monday
-                'day_name': d.strftime('%A'),
-                'is_weekend': 1 if d.weekday() >= 5 else 0,
-                'year_month': d.strftime('%Y-%m')  # Added for Dashboard
-            })
-            
-        df = pd.DataFrame(data)
-        os.makedirs(processed_path, exist_ok=True)
-        output_file = os.path.join(processed_path, 'dim_date.csv')
-        df.to_csv(output_file, index=False)
-        logger.info(f"Saved dim_date.csv ({len(df)} rows)")
+        # Vectorized calendar (fiscal year, ISO week, holidays) from the etl config
+        df = date_dim_from_config(config)
+        write_table(df, processed_path, 'dim_date')
+        logger.info(f"Saved dim_date.parquet ({len(df)} rows)")
+        return df
         
     except Exception as e:
         logger.error(f"Failed to generate date dim: {e}")
@@ -8,7 +8,11 @@ project_root = os.path.join(current_dir, '..', '..')
 if project_root not in sys.path:
     sys.path.append(project_root)
 
-def process_finance(config, logger):
+from src.utils.common import read_raw_table
+from src.utils.table_cache import load_table
+from src.utils.storage import write_table
+
+def process_finance(config, logger, tables=None):
     logger.info("Processing Finance...")
     
     raw_path = config['paths']['raw_data']
@@ -16,23 +20,16 @@ def process_finance(config, logger):
     
     try:
         # Load Operating Costs
-        ops_df = pd.read_csv(os.path.join(raw_path, 'operating_costs.csv'))
+        ops_df = read_raw_table(raw_path, 'operating_costs')
         ops_df['date'] = pd.to_datetime(ops_df['date'])
         
         # We need Revenue and COGS from Orders/Inventory to build the full P&L
         # Load Fact Orders
-        orders_path = os.path.join(processed_path, 'fact_orders.parquet')
-        if not os.path.exists(orders_path):
-             orders_path = os.path.join(processed_path, 'fact_orders.csv')
-        
-        if not os.path.exists(orders_path):
+        orders_df = load_table(tables, processed_path, 'fact_orders', columns=['order_date', 'net_sales', 'total_cost', 'profit'])
+        if orders_df is None:
             logger.error("Fact Orders missing, cannot compute Finance P&L.")
             return
 
-        if orders_path.endswith('.parquet'):
-            orders_df = pd.read_parquet(orders_path)
-        else:
-            orders_df = pd.read_csv(orders_path)
         orders_df['order_date'] = pd.to_datetime(orders_df['order_date'])
         
         # Aggregate daily sales stats
@@ -51,9 +48,8 @@ def process_finance(config, logger):
         # Net Profit = Gross - Ops - Fixed
         final_df['net_profit'] = final_df['gross_margin'] - final_df['operating_cost'] - final_df['fixed_cost']
         
-        output_file = os.path.join(processed_path, 'fact_finance.parquet')
-        final_df.to_parquet(output_file, index=False)
-        logger.info(f"Saved fact_finance.parquet ({len(final_df)} rows)")
+        final_df = write_table(final_df, processed_path, 'fact_finance')
+        logger.info(f"Saved fact_finance/ ({len(final_df)} rows)")
         
     except Exception as e:
         logger.error(f"Finance ETL Failed: {e}")
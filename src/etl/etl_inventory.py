@@ -1,24 +1,36 @@
-import pandas as pd
 import os
 import sys
 
-def process_inventory(config, logger):
+from src.utils.common import read_raw_table
+from src.utils.dim_index import load_dim_index
+from src.utils.inventory_store import InventoryPositionStore, DEFAULT_CHECKPOINT_DAYS
+from src.utils.storage import write_table
+
+def process_inventory(config, logger, tables=None):
     logger.info("Processing Inventory...")
     
     raw_path = config['paths']['raw_data']
     processed_path = config['paths']['processed_data']
     
     try:
-        df = pd.read_csv(os.path.join(raw_path, 'inventory_daily.csv'))
-        
-        df['date'] = pd.to_datetime(df['date'])
+        df = read_raw_table(raw_path, 'inventory_daily')
+        
+        # Positions are kept as per-SKU change events plus checkpoints; the daily
+        # fact table is materialized from them, with days_since_last_sale as of
+        # each day from the sale events (orders are not read)
+        checkpoint_days = int(config.get('etl', {}).get('inventory_checkpoint_days', DEFAULT_CHECKPOINT_DAYS))
+        store = InventoryPositionStore.from_daily(df, checkpoint_days)
+        store.save(processed_path)
+        logger.info(f"Saved inventory position store ({len(store.events['day'])} events, "
+                    f"{len(store.checkpoint_days)} checkpoints)")
+        df = store.daily()
         
         # Calculate Turnover: Cost of Goods Sold / Average Inventory Value
         # This is typically aggregated, but for the fact table we keep daily snapshots.
         # We can enrich with unit_cost from Dim Products to get values.
         
-        prod_df = pd.read_csv(os.path.join(processed_path, 'dim_product.csv'))
-        df = df.merge(prod_df[['product_id', 'unit_cost']], on='product_id', how='left')
+        cost_index = load_dim_index(tables, processed_path, 'dim_product', 'product_id', ['unit_cost'])
+        df = cost_index.enrich(df, attributes=['unit_cost'])
         
         # Calculate daily inventory value
         df['inventory_value'] = df['closing_stock'] * df['unit_cost']
@@ -27,46 +39,13 @@ def process_inventory(config, logger):
         # Mandatory: On Hand Qty
         df['on_hand_qty'] = df['closing_stock']
         
-        # Mandatory: Days Since Last Sale
-        try:
-            orders_path = os.path.join(processed_path, 'fact_orders.parquet')
-            if os.path.exists(orders_path):
-                fact_orders = pd.read_parquet(orders_path)
-                fact_orders['order_date'] = pd.to_datetime(fact_orders['order_date'])
-                
-                # Get last sale date per product
-                last_sale = fact_orders.groupby('product_id')['order_date'].max().reset_index()
-                last_sale.columns = ['product_id', 'last_sale_date']
-                
-                # Merge
-                df = df.merge(last_sale, on='product_id', how='left')
-                
-                # Calculate days
-                df['days_since_last_sale'] = (df['date'] - df['last_sale_date']).dt.days
-                df['days_since_last_sale'] = df['days_since_last_sale'].fillna(0).astype(int)
-                
-                # Cleanup
-                if 'last_sale_date' in df.columns:
-                    df.drop(columns=['last_sale_date'], inplace=True)
-            else:
-                logger.warning("fact_orders.parquet not found, cannot calc days_since_last_sale")
-                df['days_since_last_sale'] = 0
-        except Exception as e:
-            logger.warning(f"Error calculating days_since_last_sale: {e}")
-            df['days_since_last_sale'] = 0
-        
         # Validation
         if (df['closing_stock'] < 0).any():
              logger.error("CRITICAL: Negative Closing Stock detected!")
              # In a real pipeline, we might filter or interpolate. For now, we flag.
         
-        output_file = os.path.join(processed_path, 'fact_inventory.parquet')
-        df.to_parquet(output_file, index=False)
-        
-        # Also save CSV as requested by user often
-        csv_output = os.path.join(processed_path, 'fact_inventory.csv')
-        df.to_csv(csv_output, index=False)
-        logger.info(f"Saved fact_inventory.parquet/csv ({len(df)} rows)")
+        df = write_table(df, processed_path, 'fact_inventory')
+        logger.info(f"Saved fact_inventory/ ({len(df)} rows)")
         
     except Exception as e:
         logger.error(f"Inventory ETL Failed: {e}")
@@ -2,6 +2,9 @@ import pandas as pd
 import os
 import sys
 
+from src.utils.common import read_raw_table
+from src.utils.storage import write_table
+
 def process_marketing(config, logger):
     logger.info("Processing Marketing...")
     
@@ -9,7 +12,7 @@ def process_marketing(config, logger):
     processed_path = config['paths']['processed_data']
     
     try:
-        df = pd.read_csv(os.path.join(raw_path, 'marketing_spend.csv'))
+        df = read_raw_table(raw_path, 'marketing_spend')
         df['date'] = pd.to_datetime(df['date'])
         
         # Aggregation needed? No, it's already daily/channel
@@ -23,9 +26,8 @@ def process_marketing(config, logger):
         df['cac'] = df['spend'] / df['conversions']
         df['cac'] = df['cac'].fillna(0) # Handle division by zero
         
-        output_file = os.path.join(processed_path, 'fact_marketing.parquet')
-        df.to_parquet(output_file, index=False)
-        logger.info(f"Saved fact_marketing.parquet ({len(df)} rows)")
+        df = write_table(df, processed_path, 'fact_marketing')
+        logger.info(f"Saved fact_marketing/ ({len(df)} rows)")
         
     except Exception as e:
         logger.error(f"Marketing ETL Failed: {e}")
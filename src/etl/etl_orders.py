@@ -4,6 +4,36 @@ import glob
 import json
 import sys
 
+import pyarrow as pa
+import pyarrow.csv as pv
+
+from src.utils.dim_index import DimensionIndex, as_index
+from src.utils.schemas import apply_schema
+from src.utils.storage import (delete_keys, write_partitioned, upsert_partitioned, rewrite_partition_files,
+                               read_dataset, read_table, remove_dataset, new_batch_id, month_partition,
+                               key_index, compact_partitions, partition_values)
+from src.etl.customer_state import (load_customer_state, save_customer_state, build_customer_state,
+                                    update_customer_state, replace_customers)
+
+STATE_SOURCE_COLUMNS = ['order_id', 'order_date', 'customer_id', 'net_sales']
+CHANGES_DIR = 'order_changes'
+ORDER_INDEX_FILE = 'order_index.parquet'
+
+# Raw order columns parsed with fixed types (order_id is left to inference)
+RAW_ORDER_TYPES = {
+    'order_date': pa.timestamp('s'),
+    'customer_id': pa.string(),
+    'product_id': pa.string(),
+    'units': pa.int64(),
+    'discount_pct': pa.float64(),
+    'status': pa.string(),
+    'order_status': pa.string(),
+    'delivery_date': pa.timestamp('s'),
+    'channel': pa.string(),
+}
+DEFAULT_CHUNK_MB = 64
+DEFAULT_COMPACT_MIN_FILES = 16
+
 def load_manifest(manifest_path):
     if os.path.exists(manifest_path):
         try:
@@ -17,13 +47,159 @@ def save_manifest(manifest_path, processed_files):
     with open(manifest_path, 'w') as f:
         json.dump(list(processed_files), f, indent=2)
 
+def repeat_flags(batch, state):
+    """is_repeat_customer for a batch: 0 only for each customer's first order in the state"""
+    first_ids = set(state.loc[state['customer_id'].isin(batch['customer_id']), 'first_order_id'])
+    return (~batch['order_id'].isin(first_ids)).astype(int)
+
+def first_order_changes(old_state, new_state):
+    """
+    Stored orders whose repeat flag changes between two states
+
+    Returns:
+        {order_month: {order_id: is_repeat_customer}}
+    """
+    both = old_state.merge(new_state, on='customer_id', suffixes=('_old', '_new'))
+    changed = both[both['first_order_id_old'] != both['first_order_id_new']]
+    changes = {}
+    for date_col, id_col, flag in [('first_order_date_old', 'first_order_id_old', 1),
+                                   ('first_order_date_new', 'first_order_id_new', 0)]:
+        stored = changed[changed[id_col].notna()]
+        for month, ids in stored.groupby(month_partition(stored[date_col]))[id_col]:
+            changes.setdefault(month, {}).update(dict.fromkeys(ids, flag))
+    return changes
+
+def set_repeat_flags(df, flags):
+    """
+    Apply {order_id: flag} to a partition file (returns df unchanged if nothing differs)
+
+    A file without the column (written before repeat flags) counts as all unset.
+    """
+    target = df['order_id'].map(flags)
+    current = df['is_repeat_customer'] if 'is_repeat_customer' in df.columns else pd.Series(float('nan'), index=df.index)
+    hit = target.notna() & (target != current)
+    if not hit.any():
+        return df
+    df = df.assign(is_repeat_customer=current)
+    df.loc[hit, 'is_repeat_customer'] = target[hit].astype(df['is_repeat_customer'].dtype)
+    return df
+
+def migrate_legacy_orders(processed_path, dataset_dir, logger):
+    """
+    One-time conversion of a monolithic fact_orders.parquet (or .csv) into the partitioned dataset
+
+    The Parquet file wins if both exist. Legacy files are left in place (they
+    may be tracked, and scripts still read them); read_table prefers the dataset.
+    Repeat flags and the customer state are derived from the migrated rows with
+    the same first-order rule as incremental batches.
+    """
+    if os.path.isdir(dataset_dir):
+        return
+    legacy_files = [os.path.join(processed_path, f'fact_orders{ext}') for ext in ('.parquet', '.csv')]
+    legacy_files = [path for path in legacy_files if os.path.exists(path)]
+    if not legacy_files:
+        return
+    legacy_file = legacy_files[0]
+    logger.info(f"Migrating {os.path.basename(legacy_file)} to partitioned fact_orders/ dataset...")
+    legacy = pd.read_parquet(legacy_file) if legacy_file.endswith('.parquet') else pd.read_csv(legacy_file)
+    legacy['order_date'] = pd.to_datetime(legacy['order_date'])
+    legacy['order_month'] = month_partition(legacy['order_date'])
+    state = build_customer_state(legacy)
+    legacy['is_repeat_customer'] = repeat_flags(legacy, state)
+    write_partitioned(apply_schema(legacy, 'fact_orders'), dataset_dir, 'order_month', sort_by='order_date')
+    save_customer_state(processed_path, state)
+
+def build_fact_sales(processed_path, dataset_dir, logger):
+    """Full build of the fact_sales/ dataset from fact_orders/ (replaces any previous version)"""
+    sales_dir = os.path.join(processed_path, 'fact_sales')
+    logger.info("Building fact_sales/ from fact_orders/...")
+    remove_dataset(sales_dir)
+    history = read_dataset(dataset_dir)
+    history['order_month'] = month_partition(history['order_date'])
+    write_partitioned(apply_schema(to_fact_sales(history), 'fact_sales'), sales_dir, 'order_month',
+                      sort_by='order_date')
+
+def write_order_changes(processed_path, batch, removed):
+    """
+    Append the batch delta to processed/order_changes/ for incremental consumers
+
+    Added rows carry sign +1, rows replaced by the upsert sign -1.
+    """
+    changes = pd.concat([batch[STATE_SOURCE_COLUMNS].assign(sign=1),
+                         removed[STATE_SOURCE_COLUMNS].assign(sign=-1)], ignore_index=True)
+    changes_dir = os.path.join(processed_path, CHANGES_DIR)
+    os.makedirs(changes_dir, exist_ok=True)
+    changes.to_parquet(os.path.join(changes_dir, f'{new_batch_id()}.parquet'), index=False)
+
+def load_or_build_state(processed_path, dataset_dir, logger):
+    """Customer state, bootstrapped once from the stored history if missing"""
+    state = load_customer_state(processed_path)
+    if state is None:
+        history = read_dataset(dataset_dir, columns=STATE_SOURCE_COLUMNS) if os.path.isdir(dataset_dir) else None
+        if history is not None:
+            logger.info("Building customer state from existing fact_orders/...")
+        state = build_customer_state(history)
+    return state
+
+def load_or_build_order_index(processed_path, dataset_dir, logger):
+    """order_id -> order_month of every stored order, bootstrapped once from fact_orders/ if missing"""
+    path = os.path.join(processed_path, ORDER_INDEX_FILE)
+    if os.path.exists(path):
+        return pd.read_parquet(path)
+    if os.path.isdir(dataset_dir):
+        logger.info("Building order index from existing fact_orders/...")
+    return key_index(dataset_dir, 'order_month', 'order_id')
+
+def save_order_index(processed_path, order_index):
+    order_index.to_parquet(os.path.join(processed_path, ORDER_INDEX_FILE), index=False)
+
+def update_order_index(order_index, batch):
+    """Batch orders replace their previous entries"""
+    kept = order_index[~order_index['order_id'].isin(batch['order_id'])]
+    return pd.concat([kept, batch[['order_id', 'order_month']]], ignore_index=True)
+
+def compact_orders(processed_path, min_files, logger):
+    """Merge fact_orders/ and fact_sales/ partitions that accumulated min_files or more batch files"""
+    for name in ('fact_orders', 'fact_sales'):
+        compacted = compact_partitions(os.path.join(processed_path, name), 'order_month',
+                                       partition_values(processed_path, name), min_files, sort_by='order_date')
+        if compacted:
+            logger.info(f"Compacted {len(compacted)} partitions of {name}/")
+
+def complete_derived_outputs(processed_path, dataset_dir, logger):
+    """fact_sales/, customer state and the change log for a dataset not built from new batches (e.g. migrated)"""
+    if not os.path.isdir(dataset_dir):
+        return
+    if not os.path.isdir(os.path.join(processed_path, 'fact_sales')):
+        build_fact_sales(processed_path, dataset_dir, logger)
+    if load_customer_state(processed_path) is None:
+        save_customer_state(processed_path, load_or_build_state(processed_path, dataset_dir, logger))
+    if not os.path.exists(os.path.join(processed_path, ORDER_INDEX_FILE)):
+        save_order_index(processed_path, load_or_build_order_index(processed_path, dataset_dir, logger))
+    os.makedirs(os.path.join(processed_path, CHANGES_DIR), exist_ok=True)
+
+def to_fact_sales(df):
+    return pd.DataFrame({
+        'order_id': df['order_id'],
+        'order_date': df['order_date'],
+        'product_id': df['product_id'],
+        'customer_id': df['customer_id'],
+        'order_value': df['net_sales'],
+        'quantity': df['units'],
+        'fulfilled': df['order_status'] == 'Delivered',
+        'order_month': df['order_month']
+    })
+
 def transform_orders(fact, products, customers):
-    # Merge price metrics
-    fact = fact.merge(products[['product_id', 'unit_price', 'unit_cost']], on='product_id', how='left')
+    # products/customers: dimension frames or prebuilt DimensionIndex lookups
+    # Enrich price metrics
+    products = as_index(products, 'product_id', ['unit_price', 'unit_cost'])
+    fact = products.enrich(fact, attributes=['unit_price', 'unit_cost'])
     
-    # Merge Region from Customer
-    if 'region_id' in customers.columns:
-        fact = fact.merge(customers[['customer_id', 'region_id']], on='customer_id', how='left')
+    # Enrich Region from Customer
+    customers = as_index(customers, 'customer_id', ['region_id'])
+    if 'region_id' in customers.attributes:
+        fact = customers.enrich(fact, attributes=['region_id'])
     
     # Conversions
     fact['order_date'] = pd.to_datetime(fact['order_date'])
@@ -64,125 +240,162 @@ def transform_orders(fact, products, customers):
     
     return final_df
 
+def read_order_chunks(filename, chunk_mb=DEFAULT_CHUNK_MB):
+    """
+    Stream a raw order file as DataFrames of about chunk_mb of CSV text each
+
+    Parsed by the pyarrow CSV reader with the declared column types, so no
+    chunk depends on type inference from another. order_id is inferred (numeric
+    or ORD-<n> strings).
+    """
+    reader = pv.open_csv(filename,
+                         read_options=pv.ReadOptions(block_size=int(chunk_mb * 1024 * 1024)),
+                         convert_options=pv.ConvertOptions(column_types=RAW_ORDER_TYPES))
+    for batch in reader:
+        if batch.num_rows:
+            yield batch.to_pandas()
+
+def ingest_order_batch(final_df, processed_path, dataset_dir, state, order_index, logger, upsert_sales=True):
+    """
+    Upsert one transformed batch into fact_orders/ and fold it into the customer state
+
+    Replaced orders are looked up in the order index, so only the partitions
+    that hold them are checked (not every file of the history).
+
+    Returns:
+        updated customer state, updated order index
+    """
+    # Orders without a date go to the default partition
+    final_df['order_month'] = month_partition(final_df['order_date'])
+    final_df = final_df.sort_values(['order_date', 'order_id'])
+    
+    old_state = state
+    candidates = set(order_index.loc[order_index['order_id'].isin(final_df['order_id']), 'order_month'])
+    removed = delete_keys(final_df, dataset_dir, 'order_month', 'order_id', partitions=candidates)
+    if len(removed):
+        logger.info(f"Idempotency: Removing {len(removed)} existing rows to replace with updated data.")
+    
+    # Customer state (first/last order, count, lifetime sales) folded from the batch
+    state, stale = update_customer_state(old_state, final_df, removed)
+    if stale:
+        # Restated orders moved a customer's first/last order: rebuild just those customers
+        history = read_dataset(dataset_dir, columns=STATE_SOURCE_COLUMNS)
+        history = pd.concat([history, final_df[STATE_SOURCE_COLUMNS]], ignore_index=True)
+        history = history[history['customer_id'].isin(stale)]
+        state = replace_customers(state, build_customer_state(history), stale)
+    
+    # is_repeat_customer from the state (no full-history pass)
+    final_df['is_repeat_customer'] = repeat_flags(final_df, state)
+    final_df = apply_schema(final_df, 'fact_orders')
+    write_partitioned(final_df, dataset_dir, 'order_month')
+    
+    # Stored first orders demoted (or promoted) by this batch
+    for month, flags in first_order_changes(old_state, state).items():
+        rewrite_partition_files(dataset_dir, 'order_month', month, lambda df, flags=flags: set_repeat_flags(df, flags))
+    
+    order_index = update_order_index(order_index, final_df)
+    save_customer_state(processed_path, state)
+    save_order_index(processed_path, order_index)
+    write_order_changes(processed_path, final_df, removed)
+    
+    # fact_sales/ for Dashboard, partitioned like fact_orders (same order index)
+    if upsert_sales:
+        sales = apply_schema(to_fact_sales(final_df), 'fact_sales')
+        upsert_partitioned(sales, os.path.join(processed_path, 'fact_sales'), 'order_month', 'order_id',
+                           partitions=candidates)
+    
+    logger.info(f"Appended {len(final_df)} rows to fact_orders/ ({final_df['order_month'].nunique()} partitions)")
+    return state, order_index
+
 def process_orders(config, logger):
+    """
+    Ingest new raw order files into the partitioned fact_orders/ dataset
+
+    Files are streamed in chunks of etl.orders_chunk_mb (pyarrow CSV reader,
+    declared dtypes). Each chunk is transformed against the dimensions, which
+    are loaded once, and upserted on its own, so peak memory is bounded by the
+    chunk size rather than by the size of the backfill. Partitions that
+    accumulate etl.compact_min_files batch files are compacted at the end.
+    """
     logger.info("Processing Orders Fact Table (Parquet)...")
     
     raw_path = config['paths']['raw_data']
     processed_path = config['paths']['processed_data']
-    manifest_path = os.path.join(processed_path, config['etl'].get('manifest_file', 'processed_manifest.json'))
-    output_file = os.path.join(processed_path, 'fact_orders.parquet')
+    etl_config = config.get('etl', {})
+    manifest_path = os.path.join(processed_path, etl_config.get('manifest_file', 'processed_manifest.json'))
+    chunk_mb = etl_config.get('orders_chunk_mb', DEFAULT_CHUNK_MB)
+    compact_min_files = etl_config.get('compact_min_files', DEFAULT_COMPACT_MIN_FILES)
+    dataset_dir = os.path.join(processed_path, 'fact_orders')
 
     # 1. Identify New Files
     processed_files = load_manifest(manifest_path)
-    all_files = glob.glob(os.path.join(raw_path, 'orders_*.csv'))
+    all_files = sorted(glob.glob(os.path.join(raw_path, 'orders_*.csv')))
     new_files = [f for f in all_files if os.path.basename(f) not in processed_files]
     
     if not new_files:
         logger.info("No new order files to process.")
+        migrate_legacy_orders(processed_path, dataset_dir, logger)
+        complete_derived_outputs(processed_path, dataset_dir, logger)
         return
 
-    # 2. Load Dimensions
+    # 2. Load Dimensions (small: indexed once, shared by every chunk)
     try:
-        prod_path = os.path.join(processed_path, 'dim_product.csv')
-        if not os.path.exists(prod_path): prod_path = os.path.join(raw_path, 'products.csv')
-        products = pd.read_csv(prod_path)
+        products = read_table(processed_path, 'dim_product')
+        if products is None or 'unit_price' not in products.columns:
+            products = pd.read_csv(os.path.join(raw_path, 'products.csv'))
         
-        cust_path = os.path.join(processed_path, 'dim_customer.csv')
-        if not os.path.exists(cust_path): cust_path = os.path.join(raw_path, 'customers.csv')
-        customers = pd.read_csv(cust_path)
+        customers = read_table(processed_path, 'dim_customer')
+        if customers is None: customers = pd.read_csv(os.path.join(raw_path, 'customers.csv'))
+        # Indexed once; every chunk is enriched by code lookups
+        products = DimensionIndex(products, 'product_id', ['unit_price', 'unit_cost'])
+        customers = DimensionIndex(customers, 'customer_id', ['region_id'])
     except Exception as e:
         logger.error(f"Failed to load dimensions: {e}")
         return
 
-    # 3. Process Each New File
-    df_list = []
-    for filename in new_files:
-        logger.info(f"Reading {filename}...")
-        try:
-            df = pd.read_csv(filename)
-            df_list.append(df)
-        except Exception as e:
-            logger.error(f"Failed to read {filename}: {e}")
-            continue
-            
-    if not df_list:
-        return
-
-    fact = pd.concat(df_list, ignore_index=True)
-    
-    # 4. Transformations
     try:
-        if 'unit_price' not in products.columns:
-             raw_prods = pd.read_csv(os.path.join(raw_path, 'products.csv'))
-             products = raw_prods
-        
-        final_df = transform_orders(fact, products, customers)
+        # 3. Idempotency & Persistence (partitioned by order month)
+        # Each chunk is appended as new files under fact_orders/order_month=YYYY-MM/.
+        # Upserts (new rows win on order_id) only rewrite the files holding replaced orders,
+        # found through the order_id -> order_month index.
+        migrate_legacy_orders(processed_path, dataset_dir, logger)
+        fresh_dataset = not os.path.isdir(dataset_dir)
+        build_sales = fresh_dataset or not os.path.isdir(os.path.join(processed_path, 'fact_sales'))
+        state = load_or_build_state(processed_path, dataset_dir, logger)
+        order_index = load_or_build_order_index(processed_path, dataset_dir, logger)
         
-        # Validation Log
-        if (final_df['net_sales'] < 0).any():
-            logger.warning("Negative net_sales detected in new batch.")
-            
-        # 5. Idempotency & Persistence
-        # Load existing data to check for duplicates if file exists
-        if os.path.exists(output_file):
+        # 4. Stream, transform and write each file chunk by chunk
+        for filename in new_files:
+            logger.info(f"Reading {filename} in chunks of {chunk_mb} MB...")
             try:
-                existing_df = pd.read_parquet(output_file)
-                # Drop rows from existing that are in new batch (Upsert logic: new batch wins)
-                # Or drop rows from new batch that are in existing (Ignore duplicates logic)
-                # Requirement: "running twice doesn't duplicate". 
-                # Identifying collisions by order_id.
-                
-                # Check for overlap
-                new_ids = set(final_df['order_id'])
-                overlap = existing_df[existing_df['order_id'].isin(new_ids)]
-                if not overlap.empty:
-                    logger.info(f"Idempotency: Removing {len(overlap)} existing rows to replace with updated data.")
-                    existing_df = existing_df[~existing_df['order_id'].isin(new_ids)]
-                
-                # Append
-                combined_df = pd.concat([existing_df, final_df], ignore_index=True)
-            except Exception as e:
-                logger.error(f"Error reading existing parquet: {e}. Overwriting.")
-                combined_df = final_df
-        else:
-            combined_df = final_df
-
-        # 6. Recalculate is_repeat_customer on FULL dataset (Historical context needed)
-        # Sort key for correct chronological repeat check
-        combined_df = combined_df.sort_values('order_date')
+                chunks = read_order_chunks(filename, chunk_mb)
+                rows = 0
+                for chunk in chunks:
+                    final_df = transform_orders(chunk, products, customers)
+                    if (final_df['net_sales'] < 0).any():
+                        logger.warning("Negative net_sales detected in new batch.")
+                    state, order_index = ingest_order_batch(final_df, processed_path, dataset_dir, state,
+                                                            order_index, logger, upsert_sales=not build_sales)
+                    rows += len(final_df)
+            except (pa.ArrowInvalid, OSError) as e:
+                # Rows already written are upserted again when the file is retried
+                logger.error(f"Failed to read {filename}: {e}")
+                continue
+            processed_files.add(os.path.basename(filename))
+            logger.info(f"Ingested {os.path.basename(filename)} ({rows} rows)")
         
-        # Vectorized repeat customer check (faster than loop)
-        # Identify first occurrence of each customer
-        combined_df['is_repeat_customer'] = combined_df.duplicated(subset=['customer_id'], keep='first').astype(int)
-
-        # 7. Save to Parquet
-        # Parquet requires pyarrow or fastparquet
-        combined_df.to_parquet(output_file, index=False)
-        logger.info(f"Saved fact_orders.parquet ({len(combined_df)} rows)")
+        if os.path.isdir(dataset_dir):
+            logger.info(f"Updated customer_state.parquet ({len(state)} customers)")
         
-        # REQUIRED: Create fact_sales.csv for Dashboard
-        # Columns: order_id, order_date, product_id, customer_id, order_value, quantity, fulfilled
-        logger.info("Generating fact_sales.csv...")
-        fact_sales = pd.DataFrame({
-            'order_id': combined_df['order_id'],
-            'order_date': combined_df['order_date'],
-            'product_id': combined_df['product_id'],
-            'customer_id': combined_df['customer_id'],
-            'order_value': combined_df['net_sales'],
-            'quantity': combined_df['units'],
-            'fulfilled': combined_df['order_status'] == 'Delivered'
-        })
-        sales_output_file = os.path.join(processed_path, 'fact_sales.csv')
-        fact_sales.to_csv(sales_output_file, index=False)
-        logger.info(f"Saved fact_sales.csv ({len(fact_sales)} rows)")
+        # 5. fact_sales/ for Dashboard (chunks were upserted; a new dataset is built once)
+        if build_sales and os.path.isdir(dataset_dir):
+            build_fact_sales(processed_path, dataset_dir, logger)
+        logger.info(f"Saved fact_sales/")
+        compact_orders(processed_path, compact_min_files, logger)
         
-        # 8. Update Manifest
-        for f in new_files:
-            processed_files.add(os.path.basename(f))
+        # 6. Update Manifest
         save_manifest(manifest_path, processed_files)
         
     except Exception as e:
         logger.error(f"Error during order transformation/saving: {e}")
         raise
-
-
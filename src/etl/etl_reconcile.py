@@ -0,0 +1,197 @@
+"""
+ETL Module for Order / Delivery Reconciliation
+Joins fact_orders to fact_delivery on order_id and writes fact_order_delivery
+(one row per order with its delivery, lags and consistency flags) plus
+recon_orphans (deliveries without an order, shipped orders without a delivery).
+
+The join is a sort-merge over the month partitions of both facts. Orders are
+read one order month at a time; deliveries are held only for the dispatch
+months an order of that month can ship in (reconcile.max_dispatch_lag_months
+after it). Deliveries whose dispatch month is behind the orders being read can
+no longer match and are flushed to the orphan report, so memory is bounded by
+a few months of each table regardless of history length.
+"""
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from src.utils.schemas import apply_schema
+from src.utils.storage import (NULL_PARTITION, PARTITIONING, partition_values, read_partition,
+                               write_partitioned, write_table, remove_dataset)
+
+OUTPUT_TABLE = 'fact_order_delivery'
+ORPHAN_TABLE = 'recon_orphans'
+ORDER_COLUMNS = ['order_id', 'order_date', 'customer_id', 'order_status', 'delivery_date']
+DELIVERY_COLUMNS = ['order_id', 'dispatch_date', 'delivery_date', 'carrier', 'return_flag']
+SHIPPED_STATUSES = {'Completed', 'Delivered', 'Returned', 'Shipped'}
+RETURNED_STATUSES = {'Returned'}
+FLAGS = ['status_mismatch', 'return_mismatch', 'delivery_date_mismatch']
+DEFAULT_MAX_LAG_MONTHS = 1
+
+def key_array(series):
+    """Order ids as a numpy array that sorts and compares vectorized"""
+    if pd.api.types.is_numeric_dtype(series):
+        return series.to_numpy()
+    return series.to_numpy(dtype=str)
+
+def month_add(month, months):
+    return (pd.Period(month, freq='M') + months).strftime('%Y-%m')
+
+def sort_by_key(df):
+    """Rows sorted by order_id, with the key array for the merge"""
+    keys = key_array(df['order_id'])
+    order = np.argsort(keys, kind='stable')
+    return df.iloc[order].reset_index(drop=True), keys[order]
+
+def merge_sorted(left_keys, right_keys):
+    """
+    Sort-merge match of sorted keys (right keys unique)
+
+    Returns:
+        Position in right for each left key (-1 where it has no match)
+    """
+    pos = np.searchsorted(right_keys, left_keys)
+    found = pos < len(right_keys)
+    found[found] = right_keys[pos[found]] == left_keys[found]
+    return np.where(found, pos, -1)
+
+def orphans(df, orphan_type, date_col):
+    return pd.DataFrame({'order_id': df['order_id'], 'orphan_type': orphan_type, 'date': df[date_col]})
+
+class DeliveryWindow:
+    """Unmatched deliveries of the dispatch months currently in reach, sorted by order_id"""
+    def __init__(self, processed_path, months):
+        self.processed_path = processed_path
+        self.unread = list(months)
+        self.rows, self.keys = sort_by_key(pd.DataFrame({col: [] for col in DELIVERY_COLUMNS}))
+        self.duplicates = []
+
+    def load_through(self, month):
+        """Read dispatch months up to and including month (None = all remaining)"""
+        ready = [m for m in self.unread if month is None or m <= month]
+        if not ready:
+            return
+        self.unread = [m for m in self.unread if m not in ready]
+        parts = [read_partition(self.processed_path, 'fact_delivery', m, DELIVERY_COLUMNS) for m in ready]
+        parts = [part for part in [self.rows] + parts if part is not None and len(part)]
+        if not parts:
+            return
+        rows = pd.concat(parts, ignore_index=True).sort_values('dispatch_date', kind='stable')
+        # One delivery per order: the first dispatch is joined, later ones are reported
+        dup = rows['order_id'].duplicated().to_numpy()
+        if dup.any():
+            self.duplicates.append(orphans(rows[dup], 'duplicate_delivery', 'dispatch_date'))
+        self.rows, self.keys = sort_by_key(rows[~dup])
+
+    def take(self, order_keys):
+        """
+        Match sorted order keys; matched deliveries leave the window
+
+        Returns:
+            matched delivery rows, boolean match mask over order_keys
+        """
+        pos = merge_sorted(order_keys, self.keys)
+        hit = pos >= 0
+        matched = self.rows.iloc[pos[hit]]
+        keep = np.ones(len(self.rows), dtype=bool)
+        keep[pos[hit]] = False
+        self.rows, self.keys = self.rows[keep].reset_index(drop=True), self.keys[keep]
+        return matched, hit
+
+    def expire_before(self, month=None):
+        """Remove deliveries dispatched before month (None = all): no later order can match them"""
+        if month is None or self.rows.empty:
+            expired = np.full(len(self.rows), month is None)
+        else:
+            expired = (self.rows['dispatch_date'] < pd.Timestamp(f'{month}-01')).to_numpy()
+        gone = self.rows[expired]
+        self.rows, self.keys = self.rows[~expired].reset_index(drop=True), self.keys[~expired]
+        return orphans(gone, 'delivery_without_order', 'dispatch_date')
+
+def reconcile_month(orders, window):
+    """Join one month of orders to the delivery window and derive the reconciliation columns"""
+    orders, keys = sort_by_key(orders)
+    delivery, has_delivery = window.take(keys)
+    delivery = delivery.drop(columns='order_id').set_axis(np.flatnonzero(has_delivery))
+    status = orders['order_status'].astype(str)
+    shipped = status.isin(SHIPPED_STATUSES).to_numpy()
+    returned = status.isin(RETURNED_STATUSES).to_numpy()
+
+    out = orders[['order_id', 'order_date', 'customer_id', 'order_status']].join(delivery)
+    out['has_delivery'] = has_delivery.astype('int8')
+    for col in ('dispatch_date', 'delivery_date'):
+        # Untyped when nothing matched
+        out[col] = pd.to_datetime(out[col])
+    out['dispatch_lag_days'] = (out['dispatch_date'] - out['order_date']).dt.days
+    out['delivery_lag_days'] = (out['delivery_date'] - out['order_date']).dt.days
+
+    # Consistency flags: shipped status <-> delivery, Returned status <-> return_flag,
+    # the order's delivery date <-> the carrier's
+    out['status_mismatch'] = (shipped != has_delivery).astype('int8')
+    out['return_mismatch'] = (has_delivery & ((out['return_flag'] == 1).to_numpy() != returned)).astype('int8')
+    order_delivery = pd.to_datetime(orders['delivery_date'])
+    out['delivery_date_mismatch'] = (has_delivery & order_delivery.notna().to_numpy() &
+                                     (order_delivery != out['delivery_date']).to_numpy()).astype('int8')
+
+    return out, orphans(orders[shipped & ~has_delivery], 'order_without_delivery', 'order_date')
+
+def process_reconciliation(config, logger):
+    logger.info("Reconciling Orders and Deliveries...")
+    processed_path = config['paths']['processed_data']
+    max_lag = int(config.get('reconcile', {}).get('max_dispatch_lag_months', DEFAULT_MAX_LAG_MONTHS))
+    # Written next to the live table and swapped in once complete
+    dataset_dir = os.path.join(processed_path, OUTPUT_TABLE)
+    staging_dir = dataset_dir + '.tmp'
+
+    try:
+        order_months = partition_values(processed_path, 'fact_orders')
+        if not order_months:
+            logger.warning("fact_orders has no partitions, nothing to reconcile")
+            return
+        window = DeliveryWindow(processed_path, partition_values(processed_path, 'fact_delivery'))
+
+        remove_dataset(staging_dir)
+        partition_col, date_col = PARTITIONING[OUTPUT_TABLE]
+
+        orphan_parts, totals = [], dict.fromkeys(['orders', 'matched'] + FLAGS, 0)
+        for month in order_months:
+            dated = month != NULL_PARTITION
+            window.load_through(month_add(month, max_lag) if dated else None)
+            orders = read_partition(processed_path, 'fact_orders', month, ORDER_COLUMNS)
+            out, missing = reconcile_month(orders, window)
+            write_partitioned(apply_schema(out, OUTPUT_TABLE).assign(**{partition_col: month}), staging_dir,
+                              partition_col, sort_by=date_col)
+            orphan_parts.append(missing)
+            if dated:
+                orphan_parts.append(window.expire_before(month_add(month, 1)))
+            totals['orders'] += len(out)
+            totals['matched'] += int(out['has_delivery'].sum())
+            for flag in FLAGS:
+                totals[flag] += int(out[flag].sum())
+
+        # Deliveries left in no order month's reach
+        window.load_through(None)
+        orphan_parts.append(window.expire_before())
+        orphan_parts.extend(window.duplicates)
+
+        remove_dataset(dataset_dir)
+        shutil.move(staging_dir, dataset_dir)
+        for stale in (f'{OUTPUT_TABLE}.parquet', f'{OUTPUT_TABLE}.csv'):
+            if os.path.exists(os.path.join(processed_path, stale)):
+                os.remove(os.path.join(processed_path, stale))
+        logger.info(f"Saved {OUTPUT_TABLE}/ ({totals['orders']} orders, {totals['matched']} with a delivery)")
+
+        report = pd.concat([p for p in orphan_parts if not p.empty] or [orphan_parts[0]], ignore_index=True)
+        report = write_table(report, processed_path, ORPHAN_TABLE)
+        counts = report['orphan_type'].value_counts().to_dict()
+        logger.info(f"Saved {ORPHAN_TABLE}.parquet ({len(report)} rows: {counts})")
+        for flag in FLAGS:
+            if totals[flag]:
+                logger.warning(f"Reconciliation: {totals[flag]} orders with {flag}")
+
+    except Exception as e:
+        remove_dataset(staging_dir)
+        logger.error(f"Reconciliation Failed: {e}")
+        raise
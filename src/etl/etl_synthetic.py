@@ -5,107 +5,103 @@ Generates fact_production and fact_procurement if they are missing or need refre
 
 import pandas as pd
 import numpy as np
-import os
-from datetime import datetime, timedelta
 
-def generate_production(config, logger):
+from src.utils.date_dim import date_dim_from_config
+from src.utils.dim_index import DimensionIndex
+from src.utils.storage import write_table
+from src.utils.table_cache import load_table
+
+# Default volume of fact_procurement (etl.procurement_orders)
+DEFAULT_PROCUREMENT_ORDERS = 500
+
+def sequence_ids(prefix, count, width):
+    """'<prefix>00001'-style IDs, widened when count needs more digits"""
+    width = max(width, len(str(count)))
+    return prefix + pd.Series(np.arange(1, count + 1)).astype(str).str.zfill(width)
+
+def generate_production(config, logger, tables=None):
     logger.info("Generating Synthetic Production Data...")
     processed_path = config['paths']['processed_data']
     
     try:
         # Load date dim for consistency
-        dim_date_path = os.path.join(processed_path, 'dim_date.csv')
-        if not os.path.exists(dim_date_path):
-            logger.warning("dim_date.csv not found, cannot generate production data perfectly aligned.")
-            dates = pd.date_range(start='2022-01-01', end='2025-12-31', freq='D')
-        else:
-            dim_date = pd.read_csv(dim_date_path)
-            dates = pd.to_datetime(dim_date['date']).unique()
+        dim_date = load_table(tables, processed_path, 'dim_date', columns=['date'])
+        if dim_date is None:
+            logger.warning("dim_date not found, building the configured calendar in memory.")
+            dim_date = date_dim_from_config(config)
+        dates = dim_date['date'].unique()
             
         production_lines = ['Line A', 'Line B', 'Line C']
         shifts = ['Morning', 'Evening', 'Night']
+        # Seeded here so the result does not depend on which steps ran before in this process
+        rng = np.random.default_rng(42)
         
-        records = []
-        # Seed for reproducibility
-        np.random.seed(42)
-        
-        for date in dates:
-            for line in production_lines:
-                for shift in shifts:
-                    records.append({
-                        'date': date,
-                        'line': line,
-                        'shift': shift,
-                        'lead_time_days': np.random.randint(1, 8),
-                        'machine_util_pct': np.random.uniform(45, 92)
-                    })
-        
-        fact_production = pd.DataFrame(records)
-        output_file = os.path.join(processed_path, 'fact_production.csv')
-        fact_production.to_csv(output_file, index=False)
-        logger.info(f"Saved fact_production.csv ({len(fact_production)} rows)")
+        # dates x lines x shifts, in that nesting order
+        per_date = len(production_lines) * len(shifts)
+        rows = len(dates) * per_date
+        slot = np.tile(np.arange(per_date), len(dates))
+        fact_production = pd.DataFrame({
+            'date': np.repeat(np.asarray(dates), per_date),
+            'line': pd.Categorical.from_codes(slot // len(shifts), production_lines),
+            'shift': pd.Categorical.from_codes(slot % len(shifts), shifts),
+            'lead_time_days': rng.integers(1, 8, rows),
+            'machine_util_pct': rng.uniform(45, 92, rows)
+        })
+        write_table(fact_production, processed_path, 'fact_production')
+        logger.info(f"Saved fact_production.parquet ({len(fact_production)} rows)")
         
     except Exception as e:
         logger.error(f"Failed to generate production data: {e}")
         raise
 
-def generate_procurement(config, logger):
+def generate_procurement(config, logger, tables=None):
     logger.info("Generating Synthetic Procurement Data...")
     processed_path = config['paths']['processed_data']
+    n_orders = int(config.get('etl', {}).get('procurement_orders', DEFAULT_PROCUREMENT_ORDERS))
     
     try:
         # Load dependencies
-        dim_date = pd.read_csv(os.path.join(processed_path, 'dim_date.csv'))
-        dim_product = pd.read_csv(os.path.join(processed_path, 'dim_product.csv'))
+        dim_date = load_table(tables, processed_path, 'dim_date', columns=['date'])
+        if dim_date is None:
+            dim_date = date_dim_from_config(config)
+        dim_product = load_table(tables, processed_path, 'dim_product', columns=['product_id', 'unit_cost'])
         
-        # 1. Create dim_supplier
-        suppliers = []
-        for i in range(1, 21):  # 20 suppliers
-            suppliers.append({
-                'supplier_id': f'SUP{i:03d}',
-                'supplier_name': f'Supplier {i}',
-                'country': np.random.choice(['India', 'China', 'USA', 'Germany', 'Japan']),
-                'lead_time_days': np.random.randint(7, 31),
-                'quality_rating': np.random.uniform(3.5, 5.0)
-            })
+        # Seeded here so the result does not depend on which steps ran before in this process
+        rng = np.random.default_rng(42)
         
-        dim_supplier = pd.DataFrame(suppliers)
-        dim_supplier.to_csv(os.path.join(processed_path, 'dim_supplier.csv'), index=False)
-        logger.info(f"Saved dim_supplier.csv ({len(dim_supplier)} rows)")
+        # 1. Create dim_supplier
+        n_suppliers = 20
+        dim_supplier = pd.DataFrame({
+            'supplier_id': sequence_ids('SUP', n_suppliers, 3),
+            'supplier_name': 'Supplier ' + pd.Series(np.arange(1, n_suppliers + 1)).astype(str),
+            'country': rng.choice(['India', 'China', 'USA', 'Germany', 'Japan'], n_suppliers),
+            'lead_time_days': rng.integers(7, 31, n_suppliers),
+            'quality_rating': rng.uniform(3.5, 5.0, n_suppliers)
+        })
+        write_table(dim_supplier, processed_path, 'dim_supplier')
+        logger.info(f"Saved dim_supplier.parquet ({len(dim_supplier)} rows)")
         
         # 2. Create fact_procurement
-        dates = pd.to_datetime(dim_date['date']).unique()
-        products = dim_product['product_id'].unique()
-        supplier_ids = dim_supplier['supplier_id'].unique()
-        
-        procurement_records = []
-        np.random.seed(42)
-        
-        # Generate ~500 procurement orders
-        for _ in range(500):
-            date = np.random.choice(dates)
-            product = np.random.choice(products)
-            supplier = np.random.choice(supplier_ids)
-            qty = np.random.randint(50, 500)
-            
-            # Get unit cost
-            unit_cost = dim_product[dim_product['product_id'] == product]['unit_cost'].values[0]
-            
-            procurement_records.append({
-                'po_id': f'PO{len(procurement_records)+1:05d}',
-                'date': date,
-                'supplier_id': supplier,
-                'product_id': product,
-                'quantity': qty,
-                'unit_cost': unit_cost,
-                'total_cost': qty * unit_cost,
-                'delivery_status': np.random.choice(['Delivered', 'In Transit', 'Pending'], p=[0.7, 0.2, 0.1])
-            })
+        # Random columns are drawn as codes into the date, product and supplier arrays
+        dates = np.asarray(dim_date['date'].unique())
+        cost_index = DimensionIndex(dim_product, 'product_id', ['unit_cost'])
+        statuses = ['Delivered', 'In Transit', 'Pending']
         
-        fact_procurement = pd.DataFrame(procurement_records)
-        output_file = os.path.join(processed_path, 'fact_procurement.csv')
-        fact_procurement.to_csv(output_file, index=False)
-        logger.info(f"Saved fact_procurement.csv ({len(fact_procurement)} rows)")
+        product_codes = rng.integers(0, len(cost_index), n_orders)
+        quantity = rng.integers(50, 500, n_orders)
+        unit_cost = cost_index.take('unit_cost', product_codes)
+        fact_procurement = pd.DataFrame({
+            'po_id': sequence_ids('PO', n_orders, 5),
+            'date': dates[rng.integers(0, len(dates), n_orders)],
+            'supplier_id': pd.Categorical.from_codes(rng.integers(0, n_suppliers, n_orders), dim_supplier['supplier_id']),
+            'product_id': pd.Categorical.from_codes(product_codes, cost_index.index),
+            'quantity': quantity,
+            'unit_cost': unit_cost,
+            'total_cost': quantity * unit_cost,
+            'delivery_status': pd.Categorical.from_codes(rng.choice(len(statuses), n_orders, p=[0.7, 0.2, 0.1]), statuses)
+        })
+        write_table(fact_procurement, processed_path, 'fact_procurement')
+        logger.info(f"Saved fact_procurement.parquet ({len(fact_procurement)} rows)")
         
     except Exception as e:
         logger.error(f"Failed to generate procurement data: {e}")
@@ -9,22 +9,64 @@ project_root = os.path.join(current_dir, '..', '..')
 if project_root not in sys.path:
     sys.path.append(project_root)
 
-# Imports
-from src.etl import etl_dimensions
-from src.etl import etl_orders
-from src.etl import etl_inventory
-from src.etl import etl_delivery
-from src.etl import etl_marketing
-from src.etl import etl_finance
-from src.etl import etl_cohorts
-from src.etl import etl_synthetic
-
+from src.etl.scheduler import Task, run_graph
+from src.etl.stage_cache import StageCache
 from src.utils.common import load_config, setup_logger
 
-def main():
+# Declarative task graph: dependencies follow from the tables each step reads and writes.
+ETL_TASKS = [
+    # Dimensions
+    Task('customers', 'src.etl.etl_dimensions:process_customers', ['raw.customers'], ['dim_customer']),
+    Task('products', 'src.etl.etl_dimensions:process_products', ['raw.products'], ['dim_product']),
+    Task('regions', 'src.etl.etl_dimensions:process_regions', ['raw.regions'], ['dim_region']),
+    Task('date_dim', 'src.etl.etl_dimensions:generate_date_dim', [], ['dim_date'],
+         config_keys=['paths', 'etl.date_dim_start_year', 'etl.date_dim_end_year',
+                      'etl.fiscal_year_start_month', 'etl.holidays']),
+    # Facts
+    Task('orders', 'src.etl.etl_orders:process_orders',
+         ['raw.orders', 'raw.products', 'dim_product', 'dim_customer'],
+         ['fact_orders', 'fact_sales', 'customer_state', 'order_changes', 'order_index'],
+         config_keys=['paths', 'etl.manifest_file']),
+    Task('inventory', 'src.etl.etl_inventory:process_inventory',
+         ['raw.inventory_daily', 'dim_product'],
+         ['fact_inventory', 'inventory_events', 'inventory_checkpoints'],
+         config_keys=['paths', 'etl.inventory_checkpoint_days']),
+    Task('delivery', 'src.etl.etl_delivery:process_delivery', ['raw.delivery_log', 'fact_orders'],
+         ['fact_delivery', 'fact_delivery_sla'], config_keys=['paths', 'sla']),
+    Task('marketing', 'src.etl.etl_marketing:process_marketing', ['raw.marketing_spend'], ['fact_marketing']),
+    Task('finance', 'src.etl.etl_finance:process_finance', ['raw.operating_costs', 'fact_orders'], ['fact_finance']),
+    # Synthetic Facts (Operations & Procurement)
+    Task('production', 'src.etl.etl_synthetic:generate_production', ['dim_date'], ['fact_production']),
+    Task('procurement', 'src.etl.etl_synthetic:generate_procurement',
+         ['dim_date', 'dim_product'], ['dim_supplier', 'fact_procurement'],
+         config_keys=['paths', 'etl.procurement_orders']),
+    # Analytics / aggregations
+    Task('reconcile', 'src.etl.etl_reconcile:process_reconciliation', ['fact_orders', 'fact_delivery'],
+         ['fact_order_delivery', 'recon_orphans'], config_keys=['paths', 'reconcile']),
+    Task('cohorts', 'src.etl.etl_cohorts:process_cohorts',
+         ['fact_orders', 'customer_state', 'order_changes'], ['fact_cohort_monthly'],
+         config_keys=['paths', 'etl.verify_cohorts']),
+]
+
+def main(argv=None, tables=None):
+    """
+    Run the ETL task graph
+
+    Args:
+        argv: Command line arguments (default: sys.argv)
+        tables: Optional pipeline TableCache shared by steps run in this process
+
+    Returns:
+        Scheduler report (per-task timings, critical path), or None if the config failed to load
+    """
     parser = argparse.ArgumentParser(description="Run ETL Pipeline")
     parser.add_argument('--config', default='config.yaml', help="Path to config file")
-    args = parser.parse_args()
+    parser.add_argument('--etl-workers', type=int, default=None,
+                        help="Processes for independent ETL steps (default: etl.workers or CPU count; 1 = sequential)")
+    parser.add_argument('--force', nargs='*', metavar='TASK', default=None,
+                        help="Rerun steps even if their inputs are unchanged (no names = all steps)")
+    parser.add_argument('--no-cache', action='store_true', help="Disable the stage cache")
+    args = parser.parse_args(argv)
 
     # 1. Load Config & Setup
     try:
@@ -43,45 +85,24 @@ def main():
     logger.info("Starting Main ETL Pipeline...")
     logger.info(f"Config loaded from: {args.config}")
     logger.info("-" * 30)
-    
-    # 2. Process Dimensions
-    try:
-        etl_dimensions.process_customers(config, logger)
-        etl_dimensions.process_products(config, logger)
-        etl_dimensions.process_regions(config, logger)
-        etl_dimensions.generate_date_dim(config, logger)
-    except Exception as e:
-        logger.error(f"Error in Dimension ETL: {e}")
-        logger.error("Aborting ETL due to Dimension failure.")
-        return
 
-    logger.info("-" * 30)
+    # 2. Run dimensions, facts and aggregations as soon as their inputs are ready
+    workers = args.etl_workers or config['etl'].get('workers')
+    cache = None if args.no_cache else StageCache(config)
+    report = run_graph(ETL_TASKS, config, log_path, logger, workers=workers, cache=cache, force=args.force,
+                       tables=tables)
 
-    # 3. Process Facts
-    try:
-        etl_orders.process_orders(config, logger)
-        
-        # New Facts
-        etl_inventory.process_inventory(config, logger)
-        etl_delivery.process_delivery(config, logger)
-        etl_marketing.process_marketing(config, logger)
-        etl_finance.process_finance(config, logger)
-        
-        # Synthetic Facts (Operations & Procurement)
-        etl_synthetic.generate_production(config, logger)
-        etl_synthetic.generate_procurement(config, logger)
-        
-        # Analytics / aggregations
-        etl_cohorts.process_cohorts(config, logger)
-        
-    except Exception as e:
-        logger.error(f"Error in Fact ETL: {e}")
-        return
-        
     logger.info("-" * 30)
+    if report['status'] != 'success':
+        logger.error(f"Aborting ETL: task {report['failed_task']} failed.")
+    if cache is not None:
+        logger.info(f"Stage cache: {len(report['cache']['hits'])} skipped, {len(report['cache']['misses'])} run")
+        for name, reason in report['cache']['misses'].items():
+            logger.info(f"  {name}: {reason}")
+    logger.info(f"Critical path: {' -> '.join(report['critical_path'])} ({report['critical_path_seconds']:.2f}s)")
     elapsed = time.time() - start_time
     logger.info(f"ETL Pipeline Completed in {elapsed:.2f} seconds.")
+    return report
 
 if __name__ == "__main__":
     main()
-
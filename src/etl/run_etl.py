@@ -11,7 +11,8 @@ import json
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 
 def run_full_pipeline(start_date=None, end_date=None, output_dir='data/processed', 
-                      fast_mode=False, seed=42, skip_validation=False):
+                      fast_mode=False, seed=42, skip_validation=False, stream=False,
+                      workers=None, customers=None, force=False):
     """
     Run the complete ETL pipeline with parameters
     
@@ -22,6 +23,10 @@ def run_full_pipeline(start_date=None, end_date=None, output_dir='data/processed
         fast_mode: Use sampling for faster execution
         seed: Random seed for reproducibility
         skip_validation: Skip data validation step
+        stream: Generate raw facts as monthly partitions (bounded memory)
+        workers: Generate monthly partitions in parallel with N processes
+        customers: Number of customers to generate (overrides the default/fast size)
+        force: Rerun every ETL step, ignoring the stage cache
     """
     
     print("=" * 70)
@@ -33,6 +38,10 @@ def run_full_pipeline(start_date=None, end_date=None, output_dir='data/processed
     print(f"Fast Mode: {fast_mode}")
     print(f"Seed: {seed}")
     print(f"Skip Validation: {skip_validation}")
+    print(f"Streaming Generation: {stream}")
+    print(f"Generation Workers: {workers or 1}")
+    print(f"Customers: {customers or 'default'}")
+    print(f"Force ETL: {force}")
     print("=" * 70)
     
     # Track execution
@@ -44,7 +53,11 @@ def run_full_pipeline(start_date=None, end_date=None, output_dir='data/processed
             'output_dir': output_dir,
             'fast_mode': fast_mode,
             'seed': seed,
-            'skip_validation': skip_validation
+            'skip_validation': skip_validation,
+            'stream': stream,
+            'workers': workers,
+            'customers': customers,
+            'force': force
         },
         'steps': []
     }
@@ -57,15 +70,12 @@ def run_full_pipeline(start_date=None, end_date=None, output_dir='data/processed
         # Import and run data generation
         from src.generate_data import (generate_regions, generate_customers, generate_products,
                                         generate_marketing, generate_finance_costs, generate_full_simulation,
+                                        generate_streaming, generate_sharded,
                                         NUM_CUSTOMERS, NUM_PRODUCTS, START_DATE, END_DATE)
         
-        # Override dates if provided
-        if start_date:
-            import src.generate_data as gen_module
-            gen_module.START_DATE = datetime.strptime(start_date, '%Y-%m-%d')
-        if end_date:
-            import src.generate_data as gen_module
-            gen_module.END_DATE = datetime.strptime(end_date, '%Y-%m-%d')
+        # Resolve the date range locally (no module globals are modified)
+        gen_start = datetime.strptime(start_date, '%Y-%m-%d') if start_date else START_DATE
+        gen_end = datetime.strptime(end_date, '%Y-%m-%d') if end_date else END_DATE
         
         # Set seed
         import numpy as np
@@ -75,11 +85,18 @@ def run_full_pipeline(start_date=None, end_date=None, output_dir='data/processed
         
         # Generate data
         reg = generate_regions()
-        cust = generate_customers(NUM_CUSTOMERS if not fast_mode else 200, [r['region_id'] for r in reg])
+        num_customers = customers or (NUM_CUSTOMERS if not fast_mode else 200)
+        cust = generate_customers(num_customers, [r['region_id'] for r in reg],
+                                  start_date=gen_start, end_date=gen_end)
         prod = generate_products(NUM_PRODUCTS if not fast_mode else 10)
-        generate_marketing(START_DATE, END_DATE)
-        generate_finance_costs(START_DATE, END_DATE)
-        generate_full_simulation(START_DATE, END_DATE, cust, prod)
+        if workers:
+            generate_sharded(gen_start, gen_end, cust, prod, seed=seed, workers=workers)
+        elif stream:
+            generate_streaming(gen_start, gen_end, cust, prod, seed=seed)
+        else:
+            generate_marketing(gen_start, gen_end)
+            generate_finance_costs(gen_start, gen_end)
+            generate_full_simulation(gen_start, gen_end, cust, prod, seed=seed)
         
         execution_log['steps'].append({
             'step': 'data_generation',
@@ -88,18 +105,34 @@ def run_full_pipeline(start_date=None, end_date=None, output_dir='data/processed
         })
         print("✓ Data generation complete")
         
+        # Tables loaded by one stage are shared with later stages of this run
+        from src.utils.common import load_config
+        from src.utils.table_cache import TableCache
+        config = load_config()
+        tables = TableCache(config['paths']['processed_data'],
+                            memory_budget_mb=config['etl'].get('table_cache_mb', 1024))
+        
         # Step 2: Run ETL
         print("\n[STEP 2/5] Running ETL Pipeline...")
         step_start = datetime.now()
         
         from src.etl.main_etl import main as run_etl_main
-        run_etl_main()
+        etl_report = run_etl_main(['--force'] if force else [], tables=tables)
+        if etl_report is None:
+            raise RuntimeError("ETL pipeline could not start (config not loaded)")
         
         execution_log['steps'].append({
             'step': 'etl_processing',
-            'status': 'success',
-            'duration_seconds': (datetime.now() - step_start).total_seconds()
+            'status': etl_report['status'],
+            'duration_seconds': (datetime.now() - step_start).total_seconds(),
+            'workers': etl_report['workers'],
+            'tasks': etl_report['tasks'],
+            'critical_path': etl_report['critical_path'],
+            'critical_path_seconds': etl_report['critical_path_seconds'],
+            'cache': etl_report.get('cache')
         })
+        if etl_report['status'] != 'success':
+            raise RuntimeError(f"ETL task {etl_report['failed_task']} failed")
         print("✓ ETL processing complete")
         
         # Step 3: Data Validation
@@ -107,8 +140,8 @@ def run_full_pipeline(start_date=None, end_date=None, output_dir='data/processed
             print("\n[STEP 3/5] Running Data Validation...")
             step_start = datetime.now()
             
-            from src.etl.verify_data import verify_all
-            verify_all()
+            from src.etl.verify_data import verify_data
+            verify_data(tables=tables)
             
             execution_log['steps'].append({
                 'step': 'validation',
@@ -129,7 +162,7 @@ def run_full_pipeline(start_date=None, end_date=None, output_dir='data/processed
         step_start = datetime.now()
         
         from src.etl.create_snapshots import create_snapshots
-        create_snapshots()
+        create_snapshots(tables=tables)
         
         execution_log['steps'].append({
             'step': 'snapshots',
@@ -143,7 +176,7 @@ def run_full_pipeline(start_date=None, end_date=None, output_dir='data/processed
         step_start = datetime.now()
         
         from src.etl.create_bi_exports import create_bi_exports
-        manifest = create_bi_exports(output_format='both')
+        manifest = create_bi_exports(output_format='both', tables=tables)
         
         execution_log['steps'].append({
             'step': 'bi_exports',
@@ -157,6 +190,7 @@ def run_full_pipeline(start_date=None, end_date=None, output_dir='data/processed
         execution_log['end_time'] = datetime.now().isoformat()
         execution_log['status'] = 'success'
         execution_log['total_duration_seconds'] = sum(s['duration_seconds'] for s in execution_log['steps'])
+        execution_log['table_cache'] = tables.report()
         
         # Save execution log
         log_dir = 'logs'
@@ -209,6 +243,18 @@ Examples:
   
   # Skip validation for speed
   python src/etl/run_etl.py --skip-validation
+  
+  # Stream raw data as monthly partitions (bounded memory)
+  python src/etl/run_etl.py --stream
+  
+  # Generate monthly partitions on 32 processes
+  python src/etl/run_etl.py --start 2015-01-01 --end 2025-01-01 --workers 32
+  
+  # Scale test with 5M customers
+  python src/etl/run_etl.py --customers 5000000
+  
+  # Rerun every ETL step, ignoring the stage cache
+  python src/etl/run_etl.py --force
         """
     )
     
@@ -222,6 +268,14 @@ Examples:
                         help='Random seed for reproducibility (default: 42)')
     parser.add_argument('--skip-validation', action='store_true', 
                         help='Skip data validation step')
+    parser.add_argument('--stream', action='store_true',
+                        help='Generate raw data as monthly partitions (orders_YYYYMM.csv, ...)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Generate monthly partitions in parallel with N processes')
+    parser.add_argument('--customers', type=int, default=None,
+                        help='Number of customers to generate (scale option)')
+    parser.add_argument('--force', action='store_true',
+                        help='Rerun every ETL step even if its inputs are unchanged')
     
     args = parser.parse_args()
     
@@ -231,5 +285,9 @@ Examples:
         output_dir=args.out_dir,
         fast_mode=args.fast,
         seed=args.seed,
-        skip_validation=args.skip_validation
+        skip_validation=args.skip_validation,
+        stream=args.stream,
+        workers=args.workers,
+        customers=args.customers,
+        force=args.force
     )
@@ -0,0 +1,229 @@
+"""
+DAG Scheduler for ETL Tasks
+Each task declares the tables it reads and writes; dependencies are derived
+from those declarations and independent tasks run concurrently in a process pool.
+"""
+import importlib
+import inspect
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from src.utils.common import setup_logger
+
+class Task:
+    """
+    One ETL step: module.function(config, logger)
+
+    Args:
+        name: Unique task name
+        func: 'module:function' to import and call in the worker
+        inputs: Tables read ('raw.<name>' for raw files, otherwise processed tables)
+        outputs: Tables written
+        config_keys: Dotted config keys the step depends on (part of its cache key)
+    """
+    def __init__(self, name, func, inputs=(), outputs=(), config_keys=('paths',)):
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+        self.config_keys = tuple(config_keys)
+
+    def __repr__(self):
+        return f"Task({self.name!r})"
+
+def build_graph(tasks):
+    """
+    Map each task to the set of tasks it depends on
+
+    A task depends on the producer of every input it reads. A table may only
+    have one producer, and the graph must be acyclic.
+    """
+    producers = {}
+    for task in tasks:
+        for table in task.outputs:
+            if table in producers:
+                raise ValueError(f"Table {table!r} is produced by both {producers[table]!r} and {task.name!r}")
+            producers[table] = task.name
+
+    deps = {task.name: {producers[t] for t in task.inputs if t in producers and producers[t] != task.name}
+            for task in tasks}
+    topological_order(deps)
+    return deps
+
+def topological_order(deps):
+    """Kahn's algorithm; raises ValueError on cycles"""
+    remaining = {name: set(d) for name, d in deps.items()}
+    order = []
+    ready = sorted(name for name, d in remaining.items() if not d)
+    while ready:
+        name = ready.pop(0)
+        order.append(name)
+        for other, d in remaining.items():
+            if name in d:
+                d.remove(name)
+                if not d and other not in order and other not in ready:
+                    ready.append(other)
+    if len(order) != len(deps):
+        raise ValueError(f"Task graph has a cycle among: {sorted(set(deps) - set(order))}")
+    return order
+
+def critical_path(deps, timings):
+    """
+    Longest chain of dependent tasks by duration
+
+    Returns:
+        (list of task names, total seconds)
+    """
+    finish, via = {}, {}
+    for name in topological_order(deps):
+        prev = max(deps[name], key=lambda d: finish[d], default=None)
+        finish[name] = (finish[prev] if prev else 0.0) + timings.get(name, 0.0)
+        via[name] = prev
+    if not finish:
+        return [], 0.0
+    name = max(finish, key=finish.get)
+    total = finish[name]
+    path = []
+    while name:
+        path.append(name)
+        name = via[name]
+    return path[::-1], total
+
+def run_task(task_name, func, config, log_path, tables=None):
+    """Worker entry point: import the step, run it with its own logger, time it"""
+    module_name, func_name = func.split(':')
+    step = getattr(importlib.import_module(module_name), func_name)
+    logger = setup_logger(f'ETL_Main.{task_name}', log_path)
+    logger.propagate = False
+    start = time.time()
+    if tables is not None and 'tables' in inspect.signature(step).parameters:
+        step(config, logger, tables=tables)
+    else:
+        step(config, logger)
+    return {'start': start, 'end': time.time()}
+
+def run_graph(tasks, config, log_path, logger, workers=None, cache=None, force=None, tables=None):
+    """
+    Run tasks as soon as their dependencies finish
+
+    With workers=1 tasks run inline in topological order. A failed task stops
+    scheduling of new tasks; tasks already running are allowed to finish.
+    With a StageCache, tasks whose fingerprint is unchanged are not run and
+    keep their previous outputs; force is an iterable of task names to rerun
+    regardless (empty = all tasks). A TableCache is shared by inline tasks
+    (worker processes read from disk); outputs of finished tasks are invalidated in it.
+
+    Returns:
+        dict with per-task status/timings/cache decision, the critical path and wall time
+    """
+    deps = build_graph(tasks)
+    by_name = {task.name: task for task in tasks}
+    order = topological_order(deps)
+    workers = workers or min(len(tasks), os.cpu_count() or 1)
+    forced = set(deps) if force is not None and not force else set(force or ())
+
+    started = time.time()
+    report = {}
+    done, failed = set(), None
+
+    def record(name, result=None, error=None):
+        entry = report.setdefault(name, {})
+        entry['status'] = 'success' if error is None else 'failed'
+        if tables is not None:
+            for table in by_name[name].outputs:
+                tables.invalidate(table)
+        if result is not None:
+            entry.update({
+                'start_offset_seconds': round(result['start'] - started, 3),
+                'duration_seconds': round(result['end'] - result['start'], 3)
+            })
+        if error is not None:
+            entry['error'] = str(error)
+            logger.error(f"Task {name} failed: {error}")
+        else:
+            logger.info(f"Task {name} finished in {entry['duration_seconds']:.2f}s")
+            if cache is not None:
+                # Fingerprint at completion: steps may consume their inputs (e.g. pending change files)
+                cache.record(by_name[name], cache.fingerprint(by_name[name]))
+                cache.save()
+
+    def cached(name):
+        """Decide (in the parent, once dependencies are done) whether a task can be skipped"""
+        if cache is None:
+            return False
+        if name in forced:
+            hit, reason = False, 'forced'
+        else:
+            hit, reason = cache.check(by_name[name], cache.fingerprint(by_name[name]))
+        report[name] = {'cache': 'hit' if hit else 'miss', 'cache_reason': reason}
+        if hit:
+            report[name].update({'status': 'cached', 'duration_seconds': 0.0})
+            logger.info(f"Task {name} skipped (cache hit: {reason})")
+        return hit
+
+    if workers == 1:
+        for name in order:
+            if cached(name):
+                done.add(name)
+                continue
+            try:
+                record(name, run_task(name, by_name[name].func, config, log_path, tables))
+                done.add(name)
+            except Exception as e:
+                record(name, error=e)
+                failed = name
+                break
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            running = {}
+            while True:
+                scheduled = True
+                while failed is None and scheduled:
+                    # Repeat the scan: cache hits complete immediately and may unblock dependents
+                    scheduled = False
+                    for name in order:
+                        if name in done or 'status' in report.get(name, {}) or name in running.values():
+                            continue
+                        if deps[name] <= done:
+                            if cached(name):
+                                done.add(name)
+                                scheduled = True
+                                continue
+                            logger.info(f"Starting task {name}")
+                            future = pool.submit(run_task, name, by_name[name].func, config, log_path)
+                            running[future] = name
+                if not running:
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    try:
+                        record(name, future.result())
+                        done.add(name)
+                    except Exception as e:
+                        record(name, error=e)
+                        failed = failed or name
+
+    for name in deps:
+        report.setdefault(name, {})
+        report[name].setdefault('status', 'skipped')
+
+    timings = {name: entry.get('duration_seconds', 0.0) for name, entry in report.items()}
+    path, path_seconds = critical_path(deps, timings)
+    result = {
+        'status': 'success' if failed is None else 'failed',
+        'failed_task': failed,
+        'workers': workers,
+        'wall_seconds': round(time.time() - started, 3),
+        'critical_path': path,
+        'critical_path_seconds': round(path_seconds, 3),
+        'tasks': report,
+        'dependencies': {name: sorted(d) for name, d in deps.items()}
+    }
+    if cache is not None:
+        result['cache'] = {
+            'hits': sorted(n for n, e in report.items() if e.get('cache') == 'hit'),
+            'misses': {n: e['cache_reason'] for n, e in report.items() if e.get('cache') == 'miss'}
+        }
+    return result
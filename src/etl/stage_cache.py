@@ -0,0 +1,163 @@
+"""
+Stage-level build cache for ETL tasks
+A task is skipped when the content of its input files, its config section and
+the source of its module and of the project modules it imports are unchanged
+since its last successful run, and its outputs still exist. File hashes are
+reused while size and mtime are unchanged.
+"""
+import ast
+import glob
+import hashlib
+import importlib.util
+import json
+import os
+from datetime import datetime
+
+from src.utils.common import raw_table_files
+
+CACHE_FILE = 'stage_cache.json'
+CACHE_VERSION = 1
+PROJECT_PACKAGE = 'src'
+
+def table_files(config, table):
+    """Existing files backing a declared table ('raw.<name>' or a processed table)"""
+    if table.startswith('raw.'):
+        files = raw_table_files(config['paths']['raw_data'], table[len('raw.'):])
+    else:
+        processed_path = config['paths']['processed_data']
+        files = sorted(glob.glob(os.path.join(processed_path, table, '**', '*'), recursive=True))
+        files += [os.path.join(processed_path, f'{table}{ext}') for ext in ('.parquet', '.csv')]
+    return [f for f in files if os.path.isfile(f)]
+
+def table_exists(config, table):
+    if table.startswith('raw.'):
+        return bool(table_files(config, table))
+    processed_path = config['paths']['processed_data']
+    return (os.path.isdir(os.path.join(processed_path, table))
+            or any(os.path.exists(os.path.join(processed_path, f'{table}{ext}')) for ext in ('.parquet', '.csv')))
+
+def config_section(config, keys):
+    """Values of dotted config keys (missing keys map to None)"""
+    section = {}
+    for key in keys:
+        value = config
+        for part in key.split('.'):
+            value = value.get(part) if isinstance(value, dict) else None
+        section[key] = value
+    return section
+
+def project_imports(path):
+    """Project (src.*) modules imported by a source file"""
+    with open(path, 'rb') as f:
+        tree = ast.parse(f.read(), filename=path)
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.add(node.module)
+            # from src.utils import storage imports a module, not an attribute
+            names.update(f'{node.module}.{alias.name}' for alias in node.names)
+    return {name for name in names if name == PROJECT_PACKAGE or name.startswith(PROJECT_PACKAGE + '.')}
+
+def module_sources(module):
+    """Source files of a module and of every project module it imports, transitively"""
+    sources, pending = {}, [module]
+    while pending:
+        name = pending.pop()
+        try:
+            spec = importlib.util.find_spec(name)
+        except (ImportError, ValueError):
+            spec = None
+        if spec is None or not spec.origin or not spec.origin.endswith('.py') or name in sources:
+            continue
+        sources[name] = spec.origin
+        pending.extend(project_imports(spec.origin))
+    return sources
+
+def code_version(func):
+    """Hash of the source of a 'module:function' task and of the project modules it imports"""
+    h = hashlib.sha256()
+    for name, path in sorted(module_sources(func.split(':')[0]).items()):
+        h.update(name.encode())
+        with open(path, 'rb') as f:
+            h.update(hashlib.sha256(f.read()).digest())
+    return h.hexdigest()
+
+def digest(obj):
+    return hashlib.sha256(json.dumps(obj, sort_keys=True, default=str).encode()).hexdigest()
+
+class StageCache:
+    """
+    Fingerprints and hit/miss decisions for ETL tasks, persisted as JSON
+
+    Args:
+        config: Pipeline config (paths resolve the declared tables)
+        path: Cache file (default: <processed_data>/stage_cache.json)
+    """
+    def __init__(self, config, path=None):
+        self.config = config
+        self.path = path or os.path.join(config['paths']['processed_data'], CACHE_FILE)
+        self.files = {}
+        self.tasks = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r') as f:
+                    data = json.load(f)
+                if data.get('version') == CACHE_VERSION:
+                    self.files = data.get('files', {})
+                    self.tasks = data.get('tasks', {})
+            except json.JSONDecodeError:
+                pass
+
+    def file_hash(self, path):
+        """Content hash, recomputed only when size or mtime changed"""
+        stat = os.stat(path)
+        entry = self.files.get(path)
+        if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            return entry['sha256']
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                h.update(block)
+        self.files[path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': h.hexdigest()}
+        return self.files[path]['sha256']
+
+    def fingerprint(self, task):
+        """Per-input, config and code digests for a task (call once its dependencies have run)"""
+        inputs = {table: digest([[os.path.relpath(p), self.file_hash(p)] for p in table_files(self.config, table)])
+                  for table in task.inputs}
+        return {
+            'inputs': inputs,
+            'config': digest(config_section(self.config, task.config_keys)),
+            'code': code_version(task.func)
+        }
+
+    def check(self, task, fingerprint):
+        """
+        Returns:
+            (hit, reason)
+        """
+        previous = self.tasks.get(task.name)
+        if previous is None:
+            return False, 'no cache entry'
+        if previous['code'] != fingerprint['code']:
+            return False, 'code changed'
+        if previous['config'] != fingerprint['config']:
+            return False, 'config changed'
+        changed = sorted(t for t, d in fingerprint['inputs'].items() if previous['inputs'].get(t) != d)
+        if changed:
+            return False, f"inputs changed: {', '.join(changed)}"
+        missing = [t for t in task.outputs if not table_exists(self.config, t)]
+        if missing:
+            return False, f"outputs missing: {', '.join(missing)}"
+        return True, 'unchanged'
+
+    def record(self, task, fingerprint):
+        self.tasks[task.name] = dict(fingerprint, completed_at=datetime.now().isoformat())
+
+    def save(self):
+        # Drop hashes of files that no longer exist
+        self.files = {p: e for p, e in self.files.items() if os.path.exists(p)}
+        with open(self.path, 'w') as f:
+            json.dump({'version': CACHE_VERSION, 'files': self.files, 'tasks': self.tasks}, f, indent=2)
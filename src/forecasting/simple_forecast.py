@@ -7,17 +7,14 @@ from sklearn.metrics import mean_absolute_percentage_error, mean_squared_error
 # Add project root to sys.path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 from src.utils.common import load_config
+from src.utils.storage import scan_table
 
 def generate_forecast(config_path='config.yaml'):
     config = load_config(config_path)
     processed_path = config['paths']['processed_data']
     
-    # Support Parquet
-    parquet_path = os.path.join(processed_path, 'fact_orders.parquet')
-    if os.path.exists(parquet_path):
-        df = pd.read_parquet(parquet_path)
-    else:
-        df = pd.read_csv(os.path.join(processed_path, 'fact_orders.csv'))
+    # Only the two columns the monthly series needs
+    df = scan_table(processed_path, 'fact_orders', columns=['order_date', 'net_sales'])
         
     df['order_date'] = pd.to_datetime(df['order_date'])
     monthly_sales = df.groupby(pd.Grouper(key='order_date', freq='M'))['net_sales'].sum()
@@ -3,8 +3,10 @@ import numpy as np
 from faker import Faker
 import random
 import os
+import glob
 from datetime import datetime, timedelta
 import argparse
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 
 # Initialize Faker
 fake = Faker('en_IN')
@@ -36,57 +38,78 @@ def generate_regions():
     print("Generated regions.csv")
     return regions
 
-def generate_customers(num, region_ids):
-    data = []
-    segments = ['Consumer', 'Corporate', 'Home Office']
-    start_ts = START_DATE.timestamp()
-    end_ts = END_DATE.timestamp()
+# Faker is slow per call, so dimension generators build a pool of Faker
+# values once and sample it with vectorized index draws.
+FAKER_POOL_SIZE = 2000
+
+def faker_pool(provider, num):
+    """Call a Faker provider at most FAKER_POOL_SIZE times"""
+    return np.array([provider() for _ in range(min(num, FAKER_POOL_SIZE))], dtype=object)
+
+def sample_pool(pool, num):
+    return pool[np.random.randint(0, len(pool), num)]
+
+def surrogate_ids(prefix, num):
+    """C00001, C00002, ... as a vectorized string column"""
+    return prefix + pd.Series(np.arange(1, num + 1)).astype(str).str.zfill(5)
+
+def customers_frame(num, region_ids, start_date=None, end_date=None):
+    segments = np.array(['Consumer', 'Corporate', 'Home Office'], dtype=object)
+    start = np.datetime64(start_date or START_DATE, 's')
+    span = (np.datetime64(end_date or END_DATE, 's') - start).astype(np.int64)
     
-    for i in range(1, num + 1):
-        ts = random.uniform(start_ts, end_ts)
-        signup_date = datetime.fromtimestamp(ts)
-        data.append({
-            'customer_id': f'C{i:05d}',
-            'customer_name': fake.name(),
-            'segment': np.random.choice(segments, p=[0.5, 0.3, 0.2]),
-            'city': fake.city(),
-            'state': fake.state(),
-            'region_id': np.random.choice(region_ids),
-            'signup_date': signup_date.strftime('%Y-%m-%d')
-        })
-    df = pd.DataFrame(data)
+    # Uniform signup timestamp, truncated to the day
+    offsets = (np.random.random_sample(num) * span).astype(np.int64)
+    signup_date = (start + offsets.astype('timedelta64[s]')).astype('datetime64[D]')
+    
+    return pd.DataFrame({
+        'customer_id': surrogate_ids('C', num),
+        'customer_name': sample_pool(faker_pool(fake.name, num), num),
+        'segment': segments[np.random.choice(3, num, p=[0.5, 0.3, 0.2])],
+        'city': sample_pool(faker_pool(fake.city, num), num),
+        'state': sample_pool(faker_pool(fake.state, num), num),
+        'region_id': np.random.choice(region_ids, num),
+        'signup_date': signup_date
+    })
+
+def generate_customers(num, region_ids, start_date=None, end_date=None):
+    df = customers_frame(num, region_ids, start_date, end_date)
     df.to_csv(f'{RAW_DATA_PATH}/customers.csv', index=False)
     print(f"Generated customers.csv ({num} rows)")
     return df
 
-def generate_products(num):
+def products_frame(num):
     categories = {
         'Electronics': ['Headphones', 'Smartwatch', 'Speaker'],
         'Home': ['Lamp', 'Chair', 'Vase'],
         'Lifestyle': ['Bag', 'Bottle', 'Mat']
     }
-    data = []
-    for i in range(1, num + 1):
-        cat = np.random.choice(list(categories.keys()))
-        sub = np.random.choice(categories[cat])
-        base_cost = round(random.uniform(200, 2000), 2)
-        if cat == 'Electronics': base_cost *= 2
-        
-        data.append({
-            'product_id': f'P{i:05d}',
-            'product_name': f"{fake.word().title()} {sub}",
-            'category': cat,
-            'subcategory': sub,
-            'brand': fake.company(),
-            'unit_cost': base_cost,
-            'unit_price': round(base_cost * random.uniform(1.3, 1.8), 2) # Healthy margins
-        })
-    df = pd.DataFrame(data)
+    cat_names = np.array(list(categories.keys()), dtype=object)
+    subcats = np.array(list(categories.values()), dtype=object)
+    
+    cat_idx = np.random.randint(0, len(cat_names), num)
+    sub = subcats[cat_idx, np.random.randint(0, subcats.shape[1], num)]
+    base_cost = np.round(np.random.uniform(200, 2000, num), 2)
+    base_cost = np.where(cat_names[cat_idx] == 'Electronics', base_cost * 2, base_cost)
+    words = pd.Series(sample_pool(faker_pool(fake.word, num), num)).str.title()
+    
+    return pd.DataFrame({
+        'product_id': surrogate_ids('P', num),
+        'product_name': words + ' ' + sub,
+        'category': cat_names[cat_idx],
+        'subcategory': sub,
+        'brand': sample_pool(faker_pool(fake.company, num), num),
+        'unit_cost': base_cost,
+        'unit_price': np.round(base_cost * np.random.uniform(1.3, 1.8, num), 2) # Healthy margins
+    })
+
+def generate_products(num):
+    df = products_frame(num)
     df.to_csv(f'{RAW_DATA_PATH}/products.csv', index=False)
     print(f"Generated products.csv ({num} rows)")
     return df
 
-def generate_marketing(start_date, end_date):
+def marketing_frame(start_date, end_date):
     dates = pd.date_range(start_date, end_date - timedelta(days=1))
     channels = ['Facebook', 'Google', 'Email', 'Instagram']
     data = []
@@ -107,11 +130,14 @@ def generate_marketing(start_date, end_date):
                 'clicks': clicks,
                 'conversions': conversions
             })
-    df = pd.DataFrame(data)
+    return pd.DataFrame(data)
+
+def generate_marketing(start_date, end_date):
+    df = marketing_frame(start_date, end_date)
     df.to_csv(f'{RAW_DATA_PATH}/marketing_spend.csv', index=False)
     print("Generated marketing_spend.csv")
 
-def generate_finance_costs(start_date, end_date):
+def finance_frame(start_date, end_date):
     dates = pd.date_range(start_date, end_date - timedelta(days=1))
     data = []
     for d in dates:
@@ -121,7 +147,10 @@ def generate_finance_costs(start_date, end_date):
             'operating_cost': round(random.uniform(5000, 15000), 2),
             'fixed_cost': 2000 # Rent etc.
         })
-    df = pd.DataFrame(data)
+    return pd.DataFrame(data)
+
+def generate_finance_costs(start_date, end_date):
+    df = finance_frame(start_date, end_date)
     df.to_csv(f'{RAW_DATA_PATH}/operating_costs.csv', index=False)
     print("Generated operating_costs.csv")
 
@@ -250,7 +279,7 @@ def generate_transactions(start_date, end_date, customers, products):
     # (Refactoring inline for brevity and correctness)
     pass
 
-def generate_full_simulation(start_date, end_date, customers, products):
+def _simulate_loop(start_date, end_date, customers, products):
     dates = pd.date_range(start_date, end_date - timedelta(days=1))
     prod_ids = products['product_id'].values
     cust_ids = customers['customer_id'].values
@@ -261,8 +290,6 @@ def generate_full_simulation(start_date, end_date, customers, products):
     delivery_records = []
     order_counter = 10000
     
-    print("Simulating Daily Transactions...")
-    
     for d in dates:
         # Per Product Logic
         daily_sold = {pid: 0 for pid in prod_ids}
@@ -351,27 +378,392 @@ def generate_full_simulation(start_date, end_date, customers, products):
             rec['closing_stock'] = rec['opening_stock'] + rec['restock_qty'] - sold_qty
             rec['stockout_flag'] = 1 if rec['closing_stock'] == 0 else 0
             
+    return pd.DataFrame(order_records), pd.DataFrame(inventory_records), pd.DataFrame(delivery_records)
+
+# ============================================================
+# VECTORIZED SIMULATION ENGINE
+# ============================================================
+# Same business rules as the loop above, but orders are drawn per day in
+# NumPy batches and written into preallocated columnar arrays.
+
+RESTOCK_POINT = 15
+RESTOCK_QTY = 100
+ORDER_STATUSES = np.array(['Completed', 'Cancelled', 'Returned'], dtype=object)
+CARRIERS = np.array(['FedEx', 'UPS', 'DHL'], dtype=object)
+CHANNELS = np.array(['Online', 'Store'], dtype=object)
+DISCOUNTS = np.array([0, 0.05, 0.1])
+
+def seed_streams(seed=None):
+    """Split one seed into independent demand and attribute generators"""
+    demand_seq, attr_seq = np.random.SeedSequence(seed).spawn(2)
+    return np.random.default_rng(demand_seq), np.random.default_rng(attr_seq)
+
+def fill_orders(prod_idx, qty, available):
+    """
+    Stock check for one day's orders, in arrival order
+    
+    Same rule as the loop engine: an order is filled if its product still has
+    enough stock, otherwise it is rejected and later orders see the stock it
+    did not take. A per-product cumulative sum settles every order up to the
+    first rejection; only the over-stock tail after it is walked one by one.
+    
+    Returns:
+        bool mask of filled orders, aligned with prod_idx
+    """
+    # Group the orders by product (stable keeps arrival order)
+    order = np.argsort(prod_idx, kind='stable')
+    ps = prod_idx[order]
+    qs = qty[order]
+    cum = np.cumsum(qs)
+    new_group = np.ones(len(ps), dtype=bool)
+    new_group[1:] = ps[1:] != ps[:-1]
+    # Running units per product = global cumsum minus the total before the group
+    base = np.maximum.accumulate(np.where(new_group, cum - qs, 0))
+    ok = (cum - base) <= available[ps]
+    
+    # Once a product's running total overshoots it stays over, so ~ok is exactly the tail
+    tail = np.flatnonzero(~ok)
+    if len(tail):
+        left = available - np.bincount(ps[ok], weights=qs[ok], minlength=len(available)).astype(np.int64)
+        for i in tail:
+            if qs[i] <= left[ps[i]]:
+                ok[i] = True
+                left[ps[i]] -= qs[i]
+    
+    filled = np.zeros(len(prod_idx), dtype=bool)
+    filled[order[ok]] = True
+    return filled
+
+def simulate_demand(dates, num_products, rng, opening_stock=None):
+    """
+    Draw daily orders and run the inventory ledger for a range of dates
+    
+    Order counts are Poisson (25/day, +10 in Oct-Dec). Each day's orders are
+    filled in arrival order against available stock (see fill_orders).
+    
+    Returns:
+        accepted: dict of day_idx, prod_idx, qty arrays for fulfilled orders
+        ledger: dict of opening/restock/sold/closing arrays (days x products, flattened)
+        closing_stock: stock per product at the end of the range
+    """
+    dates = pd.DatetimeIndex(dates)
+    n_days = len(dates)
+    
+    if opening_stock is None:
+        stock = rng.integers(50, 101, num_products)
+    else:
+        stock = np.asarray(opening_stock, dtype=np.int64).copy()
+    
+    counts = rng.poisson(25, n_days) + np.where(dates.month >= 10, 10, 0)
+    bounds = np.concatenate(([0], np.cumsum(counts)))
+    total = int(bounds[-1])
+    prod_idx = rng.integers(0, num_products, total)
+    qty = rng.integers(1, 4, total)
+    accepted = np.zeros(total, dtype=bool)
+    
+    size = n_days * num_products
+    ledger = {col: np.empty(size, dtype=np.int64) for col in ['opening_stock', 'restock_qty', 'sold_qty', 'closing_stock']}
+    
+    for d in range(n_days):
+        s, e = bounds[d], bounds[d + 1]
+        restock = np.where(stock < RESTOCK_POINT, RESTOCK_QTY, 0)
+        available = stock + restock
+        sold = np.zeros(num_products, dtype=np.int64)
+        
+        if e > s:
+            ok = fill_orders(prod_idx[s:e], qty[s:e], available)
+            accepted[s:e] = ok
+            sold = np.bincount(prod_idx[s:e][ok], weights=qty[s:e][ok], minlength=num_products).astype(np.int64)
+        
+        sl = slice(d * num_products, (d + 1) * num_products)
+        ledger['opening_stock'][sl] = stock
+        ledger['restock_qty'][sl] = restock
+        ledger['sold_qty'][sl] = sold
+        stock = available - sold
+        ledger['closing_stock'][sl] = stock
+    
+    day_idx = np.repeat(np.arange(n_days), counts)
+    fulfilled = {
+        'day_idx': day_idx[accepted],
+        'prod_idx': prod_idx[accepted],
+        'qty': qty[accepted]
+    }
+    return fulfilled, ledger, stock
+
+def build_inventory_table(dates, prod_ids, ledger):
+    """Materialize the daily SKU x date inventory log from ledger arrays"""
+    dates = pd.DatetimeIndex(dates)
+    prod_ids = np.asarray(prod_ids, dtype=object)
+    df = pd.DataFrame({
+        'date': np.repeat(dates.values, len(prod_ids)),
+        'product_id': np.tile(prod_ids, len(dates)),
+        **ledger
+    })
+    df['stockout_flag'] = (df['closing_stock'] == 0).astype(int)
+    return df
+
+def build_order_tables(dates, fulfilled, cust_ids, prod_ids, rng, order_id_start=10001):
+    """
+    Draw order attributes for fulfilled orders in one pass
+    
+    Returns:
+        orders, delivery DataFrames in the raw file layout
+    """
+    dates = pd.DatetimeIndex(dates)
+    n = len(fulfilled['day_idx'])
+    order_dates = dates.values[fulfilled['day_idx']]
+    
+    status_idx = rng.choice(3, n, p=[0.9, 0.05, 0.05])
+    shipped = status_idx != 1
+    dispatch = order_dates + rng.integers(0, 3, n).astype('timedelta64[D]')
+    delivery = dispatch + rng.integers(2, 7, n).astype('timedelta64[D]')
+    carrier = CARRIERS[rng.integers(0, 3, n)]
+    cost = np.round(rng.uniform(5, 15, n), 2)
+    order_ids = 'ORD-' + pd.Series(np.arange(order_id_start, order_id_start + n)).astype(str)
+    
+    orders = pd.DataFrame({
+        'order_id': order_ids,
+        'order_date': order_dates,
+        'customer_id': np.asarray(cust_ids, dtype=object)[rng.integers(0, len(cust_ids), n)],
+        'product_id': np.asarray(prod_ids, dtype=object)[fulfilled['prod_idx']],
+        'units': fulfilled['qty'],
+        'discount_pct': DISCOUNTS[rng.integers(0, 3, n)],
+        'status': ORDER_STATUSES[status_idx],
+        'delivery_date': np.where(shipped, delivery, np.datetime64('NaT')),  # Legacy support
+        'channel': CHANNELS[rng.integers(0, 2, n)]
+    })
+    
+    delivery_df = pd.DataFrame({
+        'order_id': order_ids[shipped].values,
+        'dispatch_date': dispatch[shipped],
+        'delivery_date': delivery[shipped],
+        'carrier': carrier[shipped],
+        'delivery_cost': cost[shipped],
+        'return_flag': (status_idx[shipped] == 2).astype(int)
+    })
+    return orders, delivery_df
+
+def simulate_transactions(start_date, end_date, customers, products, seed=None,
+                          opening_stock=None, order_id_start=10001):
+    """
+    Vectorized Orders / Inventory / Delivery simulation
+    
+    Args:
+        seed: Seed for reproducible output (None = fresh entropy)
+        opening_stock: Stock per product on start_date (None = random 50-100)
+        order_id_start: First numeric order id (ORD-<n>)
+    
+    Returns:
+        orders, inventory, delivery DataFrames and the closing stock per product
+    """
+    dates = pd.date_range(start_date, end_date - timedelta(days=1))
+    prod_ids = products['product_id'].values
+    cust_ids = customers['customer_id'].values
+    demand_rng, attr_rng = seed_streams(seed)
+    
+    fulfilled, ledger, closing_stock = simulate_demand(dates, len(prod_ids), demand_rng, opening_stock)
+    orders, delivery = build_order_tables(dates, fulfilled, cust_ids, prod_ids, attr_rng, order_id_start)
+    inventory = build_inventory_table(dates, prod_ids, ledger)
+    return orders, inventory, delivery, closing_stock
+
+def generate_full_simulation(start_date, end_date, customers, products, engine='vectorized', seed=None):
+    """
+    Simulate Orders, Inventory and Delivery and write the raw CSVs
+    
+    Args:
+        engine: 'vectorized' (NumPy batch engine) or 'loop' (legacy per-order loop)
+        seed: Seed for the vectorized engine; the loop engine uses the global RNGs
+    """
+    print(f"Simulating Daily Transactions ({engine} engine)...")
+    
+    if engine == 'loop':
+        orders, inventory, delivery = _simulate_loop(start_date, end_date, customers, products)
+    elif engine == 'vectorized':
+        orders, inventory, delivery, _ = simulate_transactions(start_date, end_date, customers, products, seed=seed)
+    else:
+        raise ValueError(f"Unknown simulation engine: {engine}")
+            
     # Save
-    pd.DataFrame(order_records).to_csv(f'{RAW_DATA_PATH}/orders.csv', index=False)
-    pd.DataFrame(inventory_records).to_csv(f'{RAW_DATA_PATH}/inventory_daily.csv', index=False)
-    pd.DataFrame(delivery_records).to_csv(f'{RAW_DATA_PATH}/delivery_log.csv', index=False)
+    orders.to_csv(f'{RAW_DATA_PATH}/orders.csv', index=False)
+    inventory.to_csv(f'{RAW_DATA_PATH}/inventory_daily.csv', index=False)
+    delivery.to_csv(f'{RAW_DATA_PATH}/delivery_log.csv', index=False)
     print(f"Generated orders.csv, inventory_daily.csv, delivery_log.csv")
 
+# ============================================================
+# STREAMING (CHUNKED) GENERATION
+# ============================================================
+# Each calendar month is simulated and flushed to its own partition
+# (<table>_YYYYMM.csv), carrying closing stock and the order id counter
+# into the next month, so peak memory is one month of data.
+
+STREAM_TABLES = ['orders', 'inventory_daily', 'delivery_log', 'marketing_spend', 'operating_costs']
+
+def month_chunks(start_date, end_date):
+    """Split [start_date, end_date) into calendar-month [start, end) ranges"""
+    bounds = pd.date_range(start_date, end_date, freq='MS').union([pd.Timestamp(start_date), pd.Timestamp(end_date)])
+    return [(bounds[i], bounds[i + 1]) for i in range(len(bounds) - 1)]
+
+def clear_partitions(output_path, tables=STREAM_TABLES):
+    """Remove previously generated monthly partitions so one run never mixes with another"""
+    for name in tables:
+        for f in glob.glob(os.path.join(output_path, f'{name}_[0-9][0-9][0-9][0-9][0-9][0-9].csv')):
+            os.remove(f)
+
+def generate_streaming(start_date, end_date, customers, products, seed=None, output_path=None):
+    """
+    Generate Orders, Inventory, Delivery, Marketing and Finance one month at a time
+    
+    Writes <table>_YYYYMM.csv partitions. orders_YYYYMM.csv matches the
+    orders_*.csv pattern picked up incrementally by etl_orders.process_orders.
+    
+    Returns:
+        Number of orders written
+    """
+    output_path = output_path or RAW_DATA_PATH
+    ensure_dir(output_path)
+    clear_partitions(output_path)
+    
+    prod_ids = products['product_id'].values
+    cust_ids = customers['customer_id'].values
+    demand_rng, attr_rng = seed_streams(seed)
+    stock = None
+    next_order_id = 10001
+    
+    print("Simulating Daily Transactions (streaming, monthly partitions)...")
+    for chunk_start, chunk_end in month_chunks(start_date, end_date):
+        suffix = chunk_start.strftime('%Y%m')
+        dates = pd.date_range(chunk_start, chunk_end - timedelta(days=1))
+        
+        fulfilled, ledger, stock = simulate_demand(dates, len(prod_ids), demand_rng, stock)
+        orders, delivery = build_order_tables(dates, fulfilled, cust_ids, prod_ids, attr_rng, next_order_id)
+        next_order_id += len(orders)
+        
+        orders.to_csv(os.path.join(output_path, f'orders_{suffix}.csv'), index=False)
+        build_inventory_table(dates, prod_ids, ledger).to_csv(os.path.join(output_path, f'inventory_daily_{suffix}.csv'), index=False)
+        delivery.to_csv(os.path.join(output_path, f'delivery_log_{suffix}.csv'), index=False)
+        marketing_frame(chunk_start, chunk_end).to_csv(os.path.join(output_path, f'marketing_spend_{suffix}.csv'), index=False)
+        finance_frame(chunk_start, chunk_end).to_csv(os.path.join(output_path, f'operating_costs_{suffix}.csv'), index=False)
+        print(f"  Wrote partition {suffix} ({len(orders)} orders)")
+    
+    total_orders = next_order_id - 10001
+    print(f"Generated {len(month_chunks(start_date, end_date))} monthly partitions ({total_orders} orders)")
+    return total_orders
+
+# ============================================================
+# SHARDED PARALLEL GENERATION
+# ============================================================
+# The date range is split into monthly shards. Every shard gets a sub-seed
+# spawned from the run seed. The inventory ledger is the only sequential
+# dependency, so the parent runs the (cheap) demand + stock-check pass shard
+# by shard, carrying closing stock across shard boundaries, and hands each
+# shard's fulfilled orders to a worker process. Workers draw the remaining
+# order attributes, marketing and finance rows and write the partitions.
+# Knowing each shard's fulfilled count up front gives every shard a disjoint,
+# contiguous order_id range. Output is identical for any number of workers.
+
+def _write_shard(output_path, chunk_start, chunk_end, fulfilled, ledger, cust_ids, prod_ids,
+                 attr_seq, aux_seed, order_id_start):
+    """Worker: materialize one shard and write its <table>_YYYYMM.csv partitions"""
+    suffix = chunk_start.strftime('%Y%m')
+    dates = pd.date_range(chunk_start, chunk_end - timedelta(days=1))
+    
+    orders, delivery = build_order_tables(dates, fulfilled, cust_ids, prod_ids, np.random.default_rng(attr_seq), order_id_start)
+    orders.to_csv(os.path.join(output_path, f'orders_{suffix}.csv'), index=False)
+    delivery.to_csv(os.path.join(output_path, f'delivery_log_{suffix}.csv'), index=False)
+    build_inventory_table(dates, prod_ids, ledger).to_csv(os.path.join(output_path, f'inventory_daily_{suffix}.csv'), index=False)
+    
+    # Marketing / finance use the stdlib RNG; reseed it per shard for determinism
+    random.seed(aux_seed)
+    marketing_frame(chunk_start, chunk_end).to_csv(os.path.join(output_path, f'marketing_spend_{suffix}.csv'), index=False)
+    finance_frame(chunk_start, chunk_end).to_csv(os.path.join(output_path, f'operating_costs_{suffix}.csv'), index=False)
+    return suffix, len(orders)
+
+def generate_sharded(start_date, end_date, customers, products, seed=None, workers=None, output_path=None):
+    """
+    Generate raw facts in parallel, one monthly shard per task
+    
+    Args:
+        seed: Run seed; shard sub-seeds are spawned from it deterministically
+        workers: Process pool size (None = os.cpu_count())
+        output_path: Directory for <table>_YYYYMM.csv partitions
+    
+    Returns:
+        Number of orders written
+    """
+    output_path = output_path or RAW_DATA_PATH
+    ensure_dir(output_path)
+    clear_partitions(output_path)
+    
+    prod_ids = products['product_id'].values
+    cust_ids = customers['customer_id'].values
+    chunks = month_chunks(start_date, end_date)
+    shard_seqs = np.random.SeedSequence(seed).spawn(len(chunks))
+    max_pending = 2 * (workers or os.cpu_count() or 1)
+    
+    stock = None
+    next_order_id = 10001
+    print(f"Simulating Daily Transactions ({len(chunks)} shards, {workers or os.cpu_count()} workers)...")
+    
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for (chunk_start, chunk_end), shard_seq in zip(chunks, shard_seqs):
+            demand_seq, attr_seq, aux_seq = shard_seq.spawn(3)
+            dates = pd.date_range(chunk_start, chunk_end - timedelta(days=1))
+            
+            # Sequential stitch: opening stock of this shard = closing stock of the previous one
+            fulfilled, ledger, stock = simulate_demand(dates, len(prod_ids), np.random.default_rng(demand_seq), stock)
+            
+            pending.add(pool.submit(_write_shard, output_path, chunk_start, chunk_end, fulfilled, ledger,
+                                    cust_ids, prod_ids, attr_seq, int(aux_seq.generate_state(1)[0]), next_order_id))
+            next_order_id += len(fulfilled['day_idx'])
+            
+            # Bound memory held by queued shards
+            if len(pending) >= max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for f in done:
+                    f.result()
+        
+        for f in pending:
+            f.result()
+    
+    total_orders = next_order_id - 10001
+    print(f"Generated {len(chunks)} shards ({total_orders} orders)")
+    return total_orders
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Generate synthetic raw data')
+    parser.add_argument('--engine', choices=['vectorized', 'loop'], default='vectorized',
+                        help='Transaction simulation engine (default: vectorized)')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed (default: 42)')
+    parser.add_argument('--customers', type=int, default=NUM_CUSTOMERS,
+                        help=f'Number of customers to generate (default: {NUM_CUSTOMERS})')
+    parser.add_argument('--products', type=int, default=NUM_PRODUCTS,
+                        help=f'Number of products to generate (default: {NUM_PRODUCTS})')
+    parser.add_argument('--stream', action='store_true',
+                        help='Write monthly partitions (<table>_YYYYMM.csv) with bounded memory')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Generate monthly partitions in parallel with N worker processes')
+    args = parser.parse_args()
+    
     print("Starting Enhanced Data Generation...")
     
     # Dimensions
     reg = generate_regions()
-    cust = generate_customers(NUM_CUSTOMERS, [r['region_id'] for r in reg])
-    prod = generate_products(NUM_PRODUCTS)
-    
-    # Financials & Marketing
-    generate_marketing(START_DATE, END_DATE)
-    generate_finance_costs(START_DATE, END_DATE)
+    cust = generate_customers(args.customers, [r['region_id'] for r in reg])
+    prod = generate_products(args.products)
     
-    # Transactions (Orders, Inv, Delivery)
-    generate_full_simulation(START_DATE, END_DATE, cust, prod)
+    if args.workers:
+        # Monthly shards in a process pool
+        generate_sharded(START_DATE, END_DATE, cust, prod, seed=args.seed, workers=args.workers)
+    elif args.stream:
+        # Transactions, Financials & Marketing as monthly partitions
+        generate_streaming(START_DATE, END_DATE, cust, prod, seed=args.seed)
+    else:
+        # Financials & Marketing
+        generate_marketing(START_DATE, END_DATE)
+        generate_finance_costs(START_DATE, END_DATE)
+        
+        # Transactions (Orders, Inv, Delivery)
+        generate_full_simulation(START_DATE, END_DATE, cust, prod, engine=args.engine, seed=args.seed)
     
     print("Data Generation Complete.")
-
-
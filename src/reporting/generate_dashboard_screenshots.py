@@ -8,6 +8,10 @@ import matplotlib.dates as mdates
 import matplotlib.patches as mpatches
 from matplotlib.gridspec import GridSpec
 import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from src.utils.bi_tables import load_bi_table
 
 plt.style.use('dark_background')
 
@@ -20,13 +24,13 @@ def create_dashboard_screenshots():
         os.makedirs(screenshot_dir)
     
     # Load data
-    transactions = pd.read_csv('data/bi/fact_transactions.csv')
+    transactions = load_bi_table('fact_transactions')
     transactions['order_date'] = pd.to_datetime(transactions['order_date'])
     
-    kpis_daily = pd.read_csv('data/bi/fact_kpis_daily.csv')
+    kpis_daily = load_bi_table('fact_kpis_daily')
     kpis_daily['date'] = pd.to_datetime(kpis_daily['date'])
     
-    delivery = pd.read_csv('data/bi/fact_delivery.csv')
+    delivery = load_bi_table('fact_delivery')
     delivery['dispatch_date'] = pd.to_datetime(delivery['dispatch_date'])
     
     summary = pd.read_csv('data/summary_metrics.csv')
@@ -113,7 +117,7 @@ def create_overview_dashboard(transactions, kpis_daily, summary, output_dir):
     ax3.set_facecolor('#1E1E1E')
     
     # Load product data for category
-    products = pd.read_csv('data/bi/dim_product.csv')
+    products = load_bi_table('dim_product', columns=['product_id', 'category'])
     trans_with_cat = transactions.merge(products[['product_id', 'category']], on='product_id')
     category_revenue = trans_with_cat.groupby('category')['revenue_net'].sum().sort_values(ascending=False)
     
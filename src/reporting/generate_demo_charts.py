@@ -6,6 +6,10 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from src.utils.bi_tables import load_bi_table
 
 # Set style
 plt.style.use('dark_background')
@@ -19,10 +23,10 @@ def create_demo_charts():
         os.makedirs(demo_dir)
     
     # Load data
-    transactions = pd.read_csv('data/bi/fact_transactions.csv')
+    transactions = load_bi_table('fact_transactions')
     transactions['order_date'] = pd.to_datetime(transactions['order_date'])
     
-    kpis_daily = pd.read_csv('data/bi/fact_kpis_daily.csv')
+    kpis_daily = load_bi_table('fact_kpis_daily')
     kpis_daily['date'] = pd.to_datetime(kpis_daily['date'])
     
     # Chart 1: Revenue Trend (Equity Curve style)
@@ -101,7 +105,7 @@ def create_demo_charts():
     
     # SLA Compliance
     ax4.set_facecolor('#1E1E1E')
-    delivery = pd.read_csv('data/bi/fact_delivery.csv')
+    delivery = load_bi_table('fact_delivery')
     delivery['dispatch_date'] = pd.to_datetime(delivery['dispatch_date'])
     monthly_sla = delivery.groupby(delivery['dispatch_date'].dt.to_period('M'))['sla_met'].mean() * 100
     monthly_sla.index = monthly_sla.index.to_timestamp()
@@ -128,7 +132,7 @@ def create_demo_charts():
     ax.set_facecolor('#1E1E1E')
     
     # Load scenario results
-    scenario_results = pd.read_csv('data/bi/scenario_results_S001.csv')
+    scenario_results = load_bi_table('scenario_results_S001')
     scenario_results['date'] = pd.to_datetime(scenario_results['date'])
     
     # Get revenue data
@@ -5,8 +5,12 @@ Creates evidence file with all key metrics referenced in CV/README
 import pandas as pd
 import numpy as np
 import os
+import sys
 from datetime import datetime
 
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from src.utils.bi_tables import load_bi_table
+
 def calculate_summary_metrics():
     """Calculate all key metrics for CV claims"""
     
@@ -15,13 +19,13 @@ def calculate_summary_metrics():
     print("=" * 70)
     
     # Load data
-    transactions = pd.read_csv('data/bi/fact_transactions.csv')
+    transactions = load_bi_table('fact_transactions')
     transactions['order_date'] = pd.to_datetime(transactions['order_date'])
     
-    kpis_daily = pd.read_csv('data/bi/fact_kpis_daily.csv')
+    kpis_daily = load_bi_table('fact_kpis_daily')
     kpis_daily['date'] = pd.to_datetime(kpis_daily['date'])
     
-    delivery = pd.read_csv('data/bi/fact_delivery.csv')
+    delivery = load_bi_table('fact_delivery')
     
     # Calculate metrics
     metrics = {}
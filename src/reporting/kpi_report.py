@@ -5,27 +5,43 @@ import sys
 # Add project root to sys.path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 from src.utils.common import load_config
+from src.utils.storage import scan_table
+from src.etl.customer_state import load_customer_state, build_customer_state
 
-def calculate_kpis(config_path='config.yaml'):
+REPORT_COLUMNS = ['order_id', 'order_date', 'customer_id', 'product_id', 'region_id',
+                  'net_sales', 'order_status', 'delivery_days']
+
+def calculate_kpis(config_path='config.yaml', month=None):
+    """
+    Print the business KPI report
+
+    Args:
+        config_path: Path to config file
+        month: Optional YYYY-MM; only that month's partition of fact_orders is read
+    """
     config = load_config(config_path)
     processed_path = config['paths']['processed_data']
     
-    # Support Parquet
-    parquet_path = os.path.join(processed_path, 'fact_orders.parquet')
-    csv_path = os.path.join(processed_path, 'fact_orders.csv')
-    
-    if os.path.exists(parquet_path):
-        df = pd.read_parquet(parquet_path)
-    elif os.path.exists(csv_path):
-        df = pd.read_csv(csv_path)
-    else:
+    # Only the report's columns (and, for one month, one partition) are read
+    start = end = None
+    if month is not None:
+        start = pd.Period(month, freq='M').start_time
+        end = start + pd.DateOffset(months=1)
+    df = scan_table(processed_path, 'fact_orders', columns=REPORT_COLUMNS, start=start, end=end)
+    if df is None:
         print("Fact table not found.")
         return
 
     df['order_date'] = pd.to_datetime(df['order_date'])
     df['year_month'] = df['order_date'].dt.to_period('M')
     
-    print("=== BUSINESS KPI REPORT ===\n")
+    # Per-customer state (first order, order count) without a full-history groupby
+    state = load_customer_state(processed_path)
+    if state is None:
+        state = build_customer_state(df)
+    state = state.set_index('customer_id')
+    
+    print(f"=== BUSINESS KPI REPORT{f' ({month})' if month else ''} ===\n")
     
     # 1. High-Level Financials
     total_rev = df['net_sales'].sum()
@@ -48,7 +64,7 @@ def calculate_kpis(config_path='config.yaml'):
     
     # 3. Repeat Purchase Rate
     # Rate = Customers with >1 order / Total Customers
-    order_counts = df.groupby('customer_id')['order_id'].nunique()
+    order_counts = state['order_count'].reindex(df['customer_id'].astype(str).unique()).fillna(0)
     repeat_customers = order_counts[order_counts > 1].count()
     repeat_rate = (repeat_customers / total_customers) * 100
     
@@ -58,7 +74,7 @@ def calculate_kpis(config_path='config.yaml'):
     
     # 4. Cohort Retention (Simple)
     # Define cohort by first order month
-    df['cohort_month'] = df.groupby('customer_id')['order_date'].transform('min').dt.to_period('M')
+    df['cohort_month'] = df['customer_id'].map(state['first_order_date']).dt.to_period('M')
     
     # Calculate retention
     # For each cohort, count unique customers per subsequent month
@@ -113,7 +129,7 @@ def calculate_kpis(config_path='config.yaml'):
 
     # 8. Purchase Frequency (Avg Days between purchases)
     # Filter for customers with > 1 order
-    multi_order_cust = df.groupby('customer_id').filter(lambda x: x['order_id'].nunique() > 1)
+    multi_order_cust = df[df['customer_id'].isin(order_counts.index[order_counts > 1])]
     if not multi_order_cust.empty:
         # Sort by cust, date
         multi_order_cust = multi_order_cust.sort_values(['customer_id', 'order_date'])
@@ -129,4 +145,9 @@ def calculate_kpis(config_path='config.yaml'):
         print("Not enough data for Purchase Frequency.")
 
 if __name__ == "__main__":
-    calculate_kpis()
+    import argparse
+    parser = argparse.ArgumentParser(description='Business KPI report')
+    parser.add_argument('--month', help='Report a single month (YYYY-MM)')
+    args = parser.parse_args()
+    
+    calculate_kpis(month=args.month)
@@ -8,8 +8,102 @@ import os
 import sys
 from datetime import datetime
 import json
+from concurrent.futures import ProcessPoolExecutor
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from src.utils.bi_tables import load_bi_table, write_ipc
+
+SCENARIO_PARAMS = ['revenue_growth', 'cost_reduction', 'conversion_improvement', 'churn_reduction', 'marketing_efficiency']
+
+def transform_vectors(kpi_index, scenario_params, n_scenarios):
+    """
+    Per-KPI transform vectors for one or many scenarios
+    
+    Args:
+        kpi_index: dict of kpi_name -> column in the KPI matrix
+        scenario_params: dict of parameter -> scalar or array of length n_scenarios
+        n_scenarios: number of scenarios
+    
+    Returns:
+        mult, mult2, divisor arrays of shape (n_scenarios, n_kpis)
+    """
+    shape = (n_scenarios, len(kpi_index))
+    mult, mult2, divisor = np.ones(shape), np.ones(shape), np.ones(shape)
+    
+    def set_factor(vector, kpi_name, value):
+        if kpi_name in kpi_index:
+            vector[:, kpi_index[kpi_name]] = value
+    
+    if 'revenue_growth' in scenario_params:
+        set_factor(mult, 'revenue', 1 + scenario_params['revenue_growth'])
+    
+    # Margin improves with revenue growth and cost reduction
+    # Simplified: assume margin scales with revenue but costs change
+    revenue_factor = 1 + scenario_params.get('revenue_growth', 0)
+    cost_factor = 1 + scenario_params.get('cost_reduction', 0)
+    set_factor(mult, 'gross_margin', revenue_factor)
+    set_factor(mult2, 'gross_margin', 2 - cost_factor)
+    
+    if 'conversion_improvement' in scenario_params:
+        set_factor(mult, 'conversions', 1 + scenario_params['conversion_improvement'])
+        # CAC improves (decreases) with better conversion
+        set_factor(divisor, 'cac', 1 + scenario_params['conversion_improvement'])
+    
+    if 'churn_reduction' in scenario_params:
+        set_factor(mult, 'return_rate', 1 + scenario_params['churn_reduction'])
+    
+    if 'marketing_efficiency' in scenario_params:
+        set_factor(mult, 'marketing_spend', 1 + scenario_params['marketing_efficiency'])
+    
+    return mult, mult2, divisor
+
+def grid_totals(baseline_matrix, kpi_index, scenario_params, n_scenarios):
+    """
+    KPI totals for a batch of scenarios
+    
+    Evaluated as one broadcast over a (scenarios x dates x KPIs) tensor,
+    then summed over dates (missing cells are NaN and ignored).
+    
+    Returns:
+        (n_scenarios, n_kpis) array of totals
+    """
+    mult, mult2, divisor = transform_vectors(kpi_index, scenario_params, n_scenarios)
+    tensor = baseline_matrix[None, :, :] * mult[:, None, :] * mult2[:, None, :] / divisor[:, None, :]
+    return np.nansum(tensor, axis=1)
+
+def build_param_grid(param_space, n_draws=None, seed=None):
+    """
+    Expand a parameter space into a scenarios x parameters frame
+    
+    Args:
+        param_space: dict of parameter -> values
+            - Cartesian grid (n_draws None): a list of values per parameter
+            - Monte Carlo (n_draws set): ('uniform', low, high), ('normal', mean, sd),
+              ('triangular', low, mode, high), a list to sample from, or a constant
+        n_draws: number of Monte Carlo draws
+        seed: seed for Monte Carlo draws
+    """
+    names = list(param_space.keys())
+    
+    if n_draws is None:
+        axes = [np.atleast_1d(np.asarray(param_space[n], dtype=float)) for n in names]
+        mesh = np.meshgrid(*axes, indexing='ij')
+        return pd.DataFrame({n: m.ravel() for n, m in zip(names, mesh)})
+    
+    rng = np.random.default_rng(seed)
+    draws = {}
+    for n in names:
+        spec = param_space[n]
+        if isinstance(spec, tuple):
+            dist, *args = spec
+            if dist not in ('uniform', 'normal', 'triangular'):
+                raise ValueError(f"Unsupported distribution for {n}: {dist}")
+            draws[n] = getattr(rng, dist)(*args, size=n_draws)
+        elif isinstance(spec, (list, np.ndarray)):
+            draws[n] = rng.choice(np.asarray(spec, dtype=float), size=n_draws)
+        else:
+            draws[n] = np.full(n_draws, float(spec))
+    return pd.DataFrame(draws)
 
 class ScenarioEngine:
     """
@@ -23,14 +117,50 @@ class ScenarioEngine:
     
     def load_baseline(self):
         """Load baseline KPIs"""
-        kpi_file = os.path.join(self.bi_path, 'fact_kpis_daily.csv')
-        if os.path.exists(kpi_file):
-            self.baseline_kpis = pd.read_csv(kpi_file)
+        self.baseline_kpis = load_bi_table('fact_kpis_daily', self.bi_path)
+        if self.baseline_kpis is not None:
             self.baseline_kpis['date'] = pd.to_datetime(self.baseline_kpis['date'])
+            self.index_baseline()
             print(f"✓ Loaded baseline KPIs: {len(self.baseline_kpis):,} rows")
         else:
             print("⚠ Baseline KPIs not found. Run create_bi_exports.py first.")
     
+    def index_baseline(self):
+        """
+        Pivot the long baseline once into a dates x KPIs matrix
+        
+        Dates and KPIs keep first-appearance order; output rows are grouped
+        by date in that order, keeping baseline row order within a date.
+        """
+        date_codes, self.kpi_dates = pd.factorize(self.baseline_kpis['date'])
+        kpi_codes, kpi_names = pd.factorize(self.baseline_kpis['kpi_name'])
+        self.kpi_names = np.asarray(kpi_names, dtype=object)
+        self.kpi_index = {name: i for i, name in enumerate(self.kpi_names)}
+        
+        cells = date_codes * len(self.kpi_names) + kpi_codes
+        if len(np.unique(cells)) != len(cells):
+            raise ValueError("Baseline KPIs contain duplicate (date, kpi_name) rows")
+        
+        self.baseline_matrix = np.full((len(self.kpi_dates), len(self.kpi_names)), np.nan)
+        self.baseline_matrix[date_codes, kpi_codes] = self.baseline_kpis['kpi_value'].to_numpy(dtype=float)
+        
+        order = np.argsort(date_codes, kind='stable')
+        self._row_dates = date_codes[order]
+        self._row_kpis = kpi_codes[order]
+    
+    def scenario_vectors(self, scenario_params):
+        """
+        Translate scenario parameters into per-KPI transform vectors
+        
+        scenario_value = baseline_value * mult * mult2 / divisor, with factors
+        applied in the same order as the per-KPI rules so results are exact.
+        
+        Returns:
+            mult, mult2, divisor arrays aligned with self.kpi_names
+        """
+        mult, mult2, divisor = transform_vectors(self.kpi_index, scenario_params, 1)
+        return mult[0], mult2[0], divisor[0]
+    
     def run_scenario(self, scenario_params, scenario_name="Custom Scenario"):
         """
         Run a scenario simulation
@@ -41,6 +171,7 @@ class ScenarioEngine:
                 - cost_reduction: % change in costs (e.g., -0.05 for -5%)
                 - conversion_improvement: % change in conversions
                 - churn_reduction: % change in churn/returns
+                - marketing_efficiency: % change in marketing spend
             scenario_name: Name of the scenario
         
         Returns:
@@ -57,63 +188,103 @@ class ScenarioEngine:
             print(f"  • {key}: {value:+.1%}")
         print(f"{'='*60}\n")
         
-        # Create scenario results
-        results = []
+        # Apply scenario transformations to the whole matrix at once
+        mult, mult2, divisor = self.scenario_vectors(scenario_params)
+        scenario_matrix = self.baseline_matrix * mult * mult2 / divisor
         
-        # Get unique dates
-        dates = self.baseline_kpis['date'].unique()
+        baseline_value = self.baseline_matrix[self._row_dates, self._row_kpis]
+        scenario_value = scenario_matrix[self._row_dates, self._row_kpis]
         
-        for date in dates:
-            daily_baseline = self.baseline_kpis[self.baseline_kpis['date'] == date]
-            
-            for _, row in daily_baseline.iterrows():
-                kpi_name = row['kpi_name']
-                baseline_value = row['kpi_value']
-                scenario_value = baseline_value
-                
-                # Apply scenario transformations
-                if kpi_name == 'revenue' and 'revenue_growth' in scenario_params:
-                    scenario_value = baseline_value * (1 + scenario_params['revenue_growth'])
-                
-                elif kpi_name == 'gross_margin':
-                    # Margin improves with revenue growth and cost reduction
-                    revenue_factor = 1 + scenario_params.get('revenue_growth', 0)
-                    cost_factor = 1 + scenario_params.get('cost_reduction', 0)
-                    # Simplified: assume margin scales with revenue but costs change
-                    scenario_value = baseline_value * revenue_factor * (2 - cost_factor)
-                
-                elif kpi_name == 'conversions' and 'conversion_improvement' in scenario_params:
-                    scenario_value = baseline_value * (1 + scenario_params['conversion_improvement'])
-                
-                elif kpi_name == 'return_rate' and 'churn_reduction' in scenario_params:
-                    scenario_value = baseline_value * (1 + scenario_params['churn_reduction'])
-                
-                elif kpi_name == 'cac' and 'conversion_improvement' in scenario_params:
-                    # CAC improves (decreases) with better conversion
-                    scenario_value = baseline_value / (1 + scenario_params['conversion_improvement'])
-                
-                elif kpi_name == 'marketing_spend' and 'marketing_efficiency' in scenario_params:
-                    scenario_value = baseline_value * (1 + scenario_params['marketing_efficiency'])
-                
-                # Calculate delta
-                delta = scenario_value - baseline_value
-                delta_pct = (delta / baseline_value * 100) if baseline_value != 0 else 0
-                
-                results.append({
-                    'date': date,
-                    'kpi_name': kpi_name,
-                    'baseline_value': baseline_value,
-                    'scenario_value': scenario_value,
-                    'delta': delta,
-                    'delta_pct': delta_pct
-                })
-        
-        df_results = pd.DataFrame(results)
+        # Calculate delta
+        delta = scenario_value - baseline_value
+        nonzero = baseline_value != 0
+        delta_pct = np.zeros_like(delta)
+        np.divide(delta, baseline_value, out=delta_pct, where=nonzero)
+        delta_pct[nonzero] *= 100
+        
+        df_results = pd.DataFrame({
+            'date': self.kpi_dates[self._row_dates].strftime('%Y-%m-%d'),
+            'kpi_name': self.kpi_names[self._row_kpis],
+            'baseline_value': baseline_value,
+            'scenario_value': scenario_value,
+            'delta': delta,
+            'delta_pct': delta_pct
+        })
         df_results['scenario_name'] = scenario_name
-        df_results['date'] = pd.to_datetime(df_results['date']).dt.strftime('%Y-%m-%d')
         
         return df_results
     
+    def run_grid(self, param_space, n_draws=None, seed=None, percentiles=(5, 50, 95),
+                 return_rows=False, memory_budget_mb=256, workers=None):
+        """
+        Evaluate a grid (or Monte Carlo sample) of scenarios in one broadcast
+        
+        Args:
+            param_space: see build_param_grid (lists = Cartesian grid,
+                distributions + n_draws = Monte Carlo)
+            n_draws: number of Monte Carlo draws (None = Cartesian grid)
+            seed: seed for Monte Carlo draws
+            percentiles: percentiles of each KPI total across scenarios
+            return_rows: also return per-date rows (scenarios x dates x KPIs)
+            memory_budget_mb: max size of one scenarios x dates x KPIs batch
+            workers: process pool size used when more than one batch is needed
+        
+        Returns:
+            dict with
+                - summary: one row per KPI with baseline total, mean and percentiles
+                - scenarios: parameters + KPI totals per scenario
+                - rows: long per-date results (only if return_rows)
+        """
+        if self.baseline_kpis is None:
+            raise ValueError("Baseline KPIs not loaded")
+        
+        grid = build_param_grid(param_space, n_draws, seed)
+        n_scen = len(grid)
+        n_dates, n_kpis = self.baseline_matrix.shape
+        
+        # Split scenarios so one batch tensor stays within the memory budget
+        batch_size = max(1, int(memory_budget_mb * 1024 ** 2 // (n_dates * n_kpis * 8 * 2)))
+        batches = [(start, min(start + batch_size, n_scen)) for start in range(0, n_scen, batch_size)]
+        
+        def batch_params(start, end):
+            return {name: grid[name].to_numpy()[start:end] for name in grid.columns}
+        
+        if len(batches) > 1 and workers != 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(grid_totals, self.baseline_matrix, self.kpi_index, batch_params(s, e), e - s)
+                           for s, e in batches]
+                totals = np.vstack([f.result() for f in futures])
+        else:
+            totals = np.vstack([grid_totals(self.baseline_matrix, self.kpi_index, batch_params(s, e), e - s)
+                                for s, e in batches])
+        
+        pct = np.percentile(totals, percentiles, axis=0)
+        summary = pd.DataFrame({
+            'kpi_name': self.kpi_names,
+            'baseline_total': np.nansum(self.baseline_matrix, axis=0),
+            'scenario_mean': totals.mean(axis=0)
+        })
+        for p, values in zip(percentiles, pct):
+            summary[f'p{p:g}'] = values
+        
+        scenarios = pd.concat([grid, pd.DataFrame(totals, columns=[f'{k}_total' for k in self.kpi_names])], axis=1)
+        result = {'summary': summary, 'scenarios': scenarios, 'rows': None}
+        
+        if return_rows:
+            mult, mult2, divisor = transform_vectors(self.kpi_index, batch_params(0, n_scen), n_scen)
+            values = (self.baseline_matrix[self._row_dates, self._row_kpis][None, :]
+                      * mult[:, self._row_kpis] * mult2[:, self._row_kpis] / divisor[:, self._row_kpis])
+            n_rows = len(self._row_dates)
+            result['rows'] = pd.DataFrame({
+                'scenario_idx': np.repeat(np.arange(n_scen), n_rows),
+                'date': np.tile(self.kpi_dates[self._row_dates].strftime('%Y-%m-%d'), n_scen),
+                'kpi_name': np.tile(self.kpi_names[self._row_kpis], n_scen),
+                'baseline_value': np.tile(self.baseline_matrix[self._row_dates, self._row_kpis], n_scen),
+                'scenario_value': values.ravel()
+            })
+        
+        return result
+    
     def save_scenario_results(self, results, scenario_id, output_path='data/bi'):
         """Save scenario results"""
         if not os.path.exists(output_path):
@@ -129,6 +300,9 @@ class ScenarioEngine:
         results.to_parquet(parquet_file, index=False)
         print(f"✓ Saved scenario results: {parquet_file}")
         
+        # Arrow IPC copy for reports (memory-mapped by load_bi_table)
+        write_ipc(results, os.path.join(output_path, f'scenario_results_{scenario_id}.feather'))
+        
         return csv_file
     
     def create_scenario_summary(self, results):
@@ -278,11 +452,25 @@ if __name__ == "__main__":
     parser.add_argument('--revenue-growth', type=float, default=0.0, help='Revenue growth %')
     parser.add_argument('--cost-reduction', type=float, default=0.0, help='Cost reduction %')
     parser.add_argument('--conversion-improvement', type=float, default=0.0, help='Conversion improvement %')
+    parser.add_argument('--sweep', type=int, default=None, help='Monte Carlo sensitivity sweep with N draws')
+    parser.add_argument('--seed', type=int, default=42, help='Seed for --sweep draws')
     
     args = parser.parse_args()
     
     if args.all:
         run_all_scenarios()
+    elif args.sweep:
+        engine = ScenarioEngine()
+        param_space = {
+            'revenue_growth': ('uniform', -0.10, 0.25),
+            'cost_reduction': ('uniform', -0.15, 0.05),
+            'conversion_improvement': ('uniform', -0.05, 0.20),
+            'churn_reduction': ('uniform', -0.30, 0.10),
+            'marketing_efficiency': ('uniform', -0.15, 0.15)
+        }
+        grid = engine.run_grid(param_space, n_draws=args.sweep, seed=args.seed)
+        print(f"\nMonte Carlo Sweep ({args.sweep:,} scenarios):")
+        print(grid['summary'].to_string(index=False))
     elif args.custom:
         engine = ScenarioEngine()
         params = {
@@ -0,0 +1,87 @@
+"""
+Loader for BI export tables
+create_bi_exports writes every table as uncompressed Arrow IPC (<name>.feather)
+next to its CSV/Parquet copies, with date columns stored as dates. Readers
+memory-map the IPC file, so loading a table neither parses text nor copies the
+file into memory. Exports without a current IPC file fall back to Parquet,
+then CSV. A date column that is not entirely ISO dates stays text in the IPC
+copy, exactly as in the CSV, so quality checks still see the bad values.
+"""
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+# Date columns of the BI tables (ISO strings in the CSV export)
+DATE_COLUMNS = ['date', 'order_date', 'dispatch_date', 'delivery_date', 'signup_date']
+
+def ipc_dates(column):
+    """An ISO date column as datetimes; any other value keeps the whole column as text"""
+    try:
+        return pd.to_datetime(column, format='%Y-%m-%d')
+    except (ValueError, TypeError):
+        return column
+
+def write_ipc(df, path):
+    """Write the Arrow IPC copy of a BI table (uncompressed so it can be memory-mapped)"""
+    dates = {col: ipc_dates(df[col])
+             for col in DATE_COLUMNS if col in df.columns and not pd.api.types.is_datetime64_any_dtype(df[col])}
+    feather.write_feather(df.assign(**dates) if dates else df, path, compression='uncompressed')
+
+def bi_table_source(bi_path, name, formats=('feather', 'parquet', 'csv')):
+    """
+    (format, path) of the best available copy of a BI table, or (None, None)
+
+    The IPC file is only used while it is at least as new as the other copies;
+    an older one is left over from an earlier export. formats limits the
+    copies considered (e.g. ('csv', 'parquet') for the values as exported).
+    """
+    paths = {fmt: os.path.join(bi_path, f'{name}.{fmt}') for fmt in formats}
+    existing = {fmt: path for fmt, path in paths.items() if os.path.exists(path)}
+    if 'feather' in existing:
+        ipc_mtime = os.path.getmtime(existing['feather'])
+        if all(os.path.getmtime(path) <= ipc_mtime for path in existing.values()):
+            return 'feather', existing['feather']
+    for fmt in ('parquet', 'csv'):
+        if fmt in existing:
+            return fmt, existing[fmt]
+    return None, None
+
+def bi_table_exists(name, bi_path='data/bi'):
+    return bi_table_source(bi_path, name)[0] is not None
+
+def bi_table_columns(name, bi_path='data/bi'):
+    """Column names of a BI table read from its schema only, or None if it has not been exported"""
+    fmt, path = bi_table_source(bi_path, name)
+    if fmt == 'feather':
+        with pa.memory_map(path) as source:
+            return pa.ipc.open_file(source).schema.names
+    if fmt == 'parquet':
+        return pq.read_schema(path).names
+    if fmt == 'csv':
+        return list(pd.read_csv(path, nrows=0).columns)
+    return None
+
+def load_bi_table(name, bi_path='data/bi', columns=None, formats=('feather', 'parquet', 'csv')):
+    """
+    Load a BI table, memory-mapped from Arrow IPC when possible
+
+    Args:
+        name: Table name (e.g. 'fact_transactions')
+        bi_path: BI export directory
+        columns: Optional column subset
+        formats: Copies to consider (default: all, IPC first)
+
+    Returns:
+        DataFrame, or None if the table has not been exported
+    """
+    fmt, path = bi_table_source(bi_path, name, formats)
+    if fmt == 'feather':
+        return feather.read_table(path, columns=columns, memory_map=True).to_pandas()
+    if fmt == 'parquet':
+        return pd.read_parquet(path, columns=columns)
+    if fmt == 'csv':
+        return pd.read_csv(path, usecols=columns)
+    return None
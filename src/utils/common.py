@@ -1,7 +1,9 @@
+import glob
 import yaml
 import logging
 import os
 import sys
+import pandas as pd
 
 def load_config(config_path='config.yaml'):
     # Try to find the config file
@@ -50,3 +52,23 @@ def setup_logger(name, log_file, level=logging.INFO):
     logger.addHandler(stream_handler)
         
     return logger
+
+def raw_table_files(raw_path, name):
+    """
+    Resolve the raw file(s) backing a table
+    
+    Streaming generation writes monthly partitions (<name>_YYYYMM.csv);
+    these take precedence over a single <name>.csv.
+    """
+    pattern = os.path.join(raw_path, f'{name}_[0-9][0-9][0-9][0-9][0-9][0-9].csv')
+    partitions = sorted(glob.glob(pattern))
+    if partitions:
+        return partitions
+    return [os.path.join(raw_path, f'{name}.csv')]
+
+def read_raw_table(raw_path, name):
+    """Read a raw table from its single file or its monthly partitions"""
+    files = raw_table_files(raw_path, name)
+    if len(files) == 1:
+        return pd.read_csv(files[0])
+    return pd.concat([pd.read_csv(f) for f in files], ignore_index=True)
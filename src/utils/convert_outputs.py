@@ -1,28 +1,40 @@
-import pandas as pd
+"""
+CSV exports of processed tables for BI tools
+Processed tables are stored as Parquet; CSV copies are produced on demand into
+paths.csv_exports and only rewritten when the table changed since the last export.
+"""
+import argparse
 import os
-import glob
 import sys
 
 # Add project root to sys.path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 from src.utils.common import load_config
+from src.utils.storage import export_csv
 
-def convert_to_csv():
-    config = load_config('config.yaml')
+EXPORT_TABLES = [
+    'dim_customer', 'dim_product', 'dim_region', 'dim_date', 'dim_supplier',
+    'fact_orders', 'fact_sales', 'fact_inventory', 'fact_delivery', 'fact_delivery_sla', 'fact_marketing',
+    'fact_finance', 'fact_production', 'fact_procurement', 'fact_cohort_monthly', 'monthly_snapshot',
+    'fact_order_delivery', 'recon_orphans'
+]
+
+def convert_to_csv(config_path='config.yaml', names=None):
+    config = load_config(config_path)
     processed_path = config['paths']['processed_data']
-    
-    # helper
-    def to_csv(name):
-        pq = os.path.join(processed_path, f'{name}.parquet')
-        csv = os.path.join(processed_path, f'{name}.csv')
-        if os.path.exists(pq):
-            df = pd.read_parquet(pq)
-            df.to_csv(csv, index=False)
-            print(f"Converted {name}.parquet -> {name}.csv")
-            
-    facts = ['fact_inventory', 'fact_delivery', 'fact_marketing', 'fact_finance']
-    for f in facts:
-        to_csv(f)
+    export_dir = config['paths'].get('csv_exports', os.path.join('data', 'exports'))
+
+    for name in names or EXPORT_TABLES:
+        path = export_csv(processed_path, name, export_dir)
+        if path is None:
+            print(f"Skipped {name} (not built)")
+        else:
+            print(f"Exported {name} -> {path}")
 
 if __name__ == "__main__":
-    convert_to_csv()
+    parser = argparse.ArgumentParser(description='Export processed tables as CSV for BI tools')
+    parser.add_argument('tables', nargs='*', help='Tables to export (default: all)')
+    parser.add_argument('--config', default='config.yaml')
+    args = parser.parse_args()
+
+    convert_to_csv(args.config, args.tables)
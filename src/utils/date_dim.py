@@ -0,0 +1,86 @@
+"""
+Date dimension builder
+Every calendar attribute is derived column-wise from one pd.date_range, so a
+century of days builds in milliseconds. Besides the Gregorian hierarchy the
+dimension carries a fiscal calendar (any starting month), ISO-8601 weeks and
+holiday flags.
+"""
+import numpy as np
+import pandas as pd
+
+DEFAULT_START_YEAR = 2022
+DEFAULT_END_YEAR = 2025
+MONTH_NAMES = np.array(['January', 'February', 'March', 'April', 'May', 'June', 'July',
+                        'August', 'September', 'October', 'November', 'December'], dtype=object)
+DAY_NAMES = np.array(['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'], dtype=object)
+
+def year_month_labels(year, month):
+    """'YYYY-MM' per row, formatting each distinct month once"""
+    if len(year) == 0:
+        return np.array([], dtype=object)
+    first = year.min()
+    months = (year - first) * 12 + (month - 1)
+    labels = np.array([f'{first + m // 12}-{m % 12 + 1:02d}' for m in range(months.max() + 1)], dtype=object)
+    return labels[months]
+
+def holiday_mask(dates, holidays):
+    """
+    True for dates listed in holidays
+
+    Entries are 'MM-DD' (every year, e.g. '08-15') or 'YYYY-MM-DD' (one date,
+    for movable holidays).
+    """
+    holidays = [str(h) for h in holidays or ()]
+    annual = [int(h.replace('-', '')) for h in holidays if len(h) == 5]
+    fixed = pd.to_datetime([h for h in holidays if len(h) != 5], format='%Y-%m-%d')
+    month_day = dates.dt.month.to_numpy() * 100 + dates.dt.day.to_numpy()
+    return np.isin(month_day, annual) | dates.isin(fixed).to_numpy()
+
+def build_date_dim(start, end, fiscal_year_start_month=1, holidays=None):
+    """
+    One row per day from start to end (inclusive)
+
+    Args:
+        start, end: Range bounds (anything pd.Timestamp accepts)
+        fiscal_year_start_month: First month of the fiscal year (4 = April).
+            Fiscal years are named after the calendar year they end in.
+        holidays: Holiday dates, see holiday_mask
+
+    Returns:
+        DataFrame with the dim_date columns
+    """
+    if not 1 <= fiscal_year_start_month <= 12:
+        raise ValueError(f"fiscal_year_start_month must be 1-12, got {fiscal_year_start_month}")
+    dates = pd.Series(pd.date_range(pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize(), freq='D'))
+    year, month, day = dates.dt.year.to_numpy(), dates.dt.month.to_numpy(), dates.dt.day.to_numpy()
+    weekday = dates.dt.weekday.to_numpy()  # 0=Monday
+    fiscal_month = (month - fiscal_year_start_month) % 12 + 1
+    iso = dates.dt.isocalendar()
+
+    return pd.DataFrame({
+        'date': dates,
+        'date_key': year * 10000 + month * 100 + day,
+        'year': year,
+        'quarter': (month - 1) // 3 + 1,
+        'month': month,
+        'month_name': MONTH_NAMES[month - 1],
+        'day': day,
+        'day_of_week': weekday,
+        'day_name': DAY_NAMES[weekday],
+        'is_weekend': (weekday >= 5).astype('int8'),
+        'year_month': year_month_labels(year, month),
+        'fiscal_year': year + (fiscal_year_start_month > 1) * (month >= fiscal_year_start_month),
+        'fiscal_quarter': (fiscal_month - 1) // 3 + 1,
+        'fiscal_month': fiscal_month,
+        'iso_year': iso['year'].to_numpy('int32'),
+        'iso_week': iso['week'].to_numpy('int32'),
+        'is_holiday': holiday_mask(dates, holidays).astype('int8'),
+    })
+
+def date_dim_from_config(config):
+    """The date dimension described by the etl section of the config"""
+    etl = config.get('etl', {})
+    return build_date_dim(f"{etl.get('date_dim_start_year', DEFAULT_START_YEAR)}-01-01",
+                          f"{etl.get('date_dim_end_year', DEFAULT_END_YEAR)}-12-31",
+                          etl.get('fiscal_year_start_month', 1),
+                          etl.get('holidays'))
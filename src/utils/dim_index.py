@@ -0,0 +1,86 @@
+"""
+Dimension index for fact enrichment
+A dimension is indexed once per run: its business keys get dense integer codes
+(0..n-1, via a hash index) and each attribute is held as an array in code
+order. Enriching a fact batch is then one hash lookup per distinct key and an
+array take per attribute, instead of a DataFrame merge per batch.
+"""
+import numpy as np
+import pandas as pd
+
+from src.utils.storage import table_columns
+from src.utils.table_cache import load_table
+
+class DimensionIndex:
+    """
+    Dense-coded lookup over one dimension table
+
+    Args:
+        dim: Dimension rows
+        key: Business key column (e.g. 'product_id')
+        attributes: Columns to expose (default: every other column)
+
+    Duplicate keys keep their last row, the current version of the member.
+    """
+    def __init__(self, dim, key, attributes=None):
+        dim = dim.drop_duplicates(key, keep='last')
+        self.key = key
+        keys = dim[key]
+        if isinstance(keys.dtype, pd.CategoricalDtype):
+            keys = keys.astype(keys.cat.categories.dtype)
+        self.index = pd.Index(keys)
+        self.attributes = [c for c in (attributes or dim.columns) if c != key and c in dim.columns]
+        self.values = {col: dim[col].to_numpy() if not isinstance(dim[col].dtype, pd.api.extensions.ExtensionDtype)
+                       else dim[col].array for col in self.attributes}
+
+    def __len__(self):
+        return len(self.index)
+
+    def codes(self, keys):
+        """Dense codes for fact keys (-1 where the key is not in the dimension)"""
+        keys = pd.Series(keys) if not isinstance(keys, pd.Series) else keys
+        if isinstance(keys.dtype, pd.CategoricalDtype):
+            # One hash lookup per category instead of per row
+            category_codes = np.append(self.index.get_indexer(keys.cat.categories), -1)
+            return category_codes[keys.cat.codes.to_numpy()]
+        return self.index.get_indexer(keys)
+
+    def take(self, attribute, codes):
+        """Attribute values for codes; missing keys become NA (ints upcast like a left merge)"""
+        values = self.values[attribute]
+        if isinstance(values, np.ndarray) and (codes >= 0).all():
+            return np.take(values, codes)
+        return pd.api.extensions.take(values, codes, allow_fill=True)
+
+    def enrich(self, fact, on=None, attributes=None):
+        """
+        Add dimension attributes to a fact frame (same rows and order as a left merge)
+
+        Args:
+            fact: Fact rows
+            on: Fact column holding the key (default: the dimension key)
+            attributes: Attributes to add (default: all indexed attributes)
+        """
+        codes = self.codes(fact[on or self.key])
+        added = {col: self.take(col, codes) for col in (attributes or self.attributes)}
+        return fact.assign(**added)
+
+def as_index(dim, key, attributes=None):
+    """Use a prebuilt DimensionIndex as is, or index a dimension frame"""
+    if isinstance(dim, DimensionIndex):
+        return dim
+    return DimensionIndex(dim, key, attributes)
+
+def load_dim_index(tables, processed_path, name, key, attributes=None):
+    """
+    Index a processed table (read through the pipeline table cache when given)
+
+    Requested attributes the table does not have are left out of the index;
+    returns None if the table or its key column does not exist.
+    """
+    available = table_columns(processed_path, name)
+    if key not in available:
+        return None
+    columns = [key] + [col for col in attributes if col in available] if attributes else None
+    dim = load_table(tables, processed_path, name, columns=columns)
+    return None if dim is None else DimensionIndex(dim, key, attributes)
@@ -0,0 +1,272 @@
+"""
+Inventory position store
+Holds stock movements as per-SKU change events in columnar arrays instead of a
+dense SKU x date snapshot. A SKU-day is an event when anything happened
+(restock, sale, stockout, position change) or when the SKU first appears;
+quiet days are implied by the last event before them.
+
+Two views answer point-in-time questions by binary search over sorted dates:
+- per SKU (events sorted by SKU, then date, with offsets into each SKU's run):
+  the stock of one SKU on a date is the position after its last event on or
+  before that date
+- checkpoints (positions of every SKU every checkpoint_days): the stock of all
+  SKUs on a date is the nearest checkpoint plus the events since it
+
+The dense daily table is still available through daily(), for the fact table
+and the BI export. Its days_since_last_sale is an as-of value: each SKU-day
+counts from the SKU's last sale on or before that day, found from the sale
+events alone (no orders are read). New days are appended with extend().
+"""
+import numpy as np
+import pandas as pd
+
+from src.utils.storage import read_table, write_table
+
+EVENTS_TABLE = 'inventory_events'
+CHECKPOINTS_TABLE = 'inventory_checkpoints'
+DEFAULT_CHECKPOINT_DAYS = 30
+DAILY_COLUMNS = ['date', 'product_id', 'opening_stock', 'restock_qty', 'sold_qty', 'closing_stock', 'stockout_flag']
+# last_sale_days() result for a SKU without a sale
+NO_SALE = np.iinfo('int32').min
+
+def day_number(dates):
+    """Days since 1970-01-01 as int32 (dates sort and search as integers)"""
+    return np.asarray(pd.to_datetime(dates), dtype='datetime64[D]').astype('int32')
+
+def day_date(days):
+    return np.asarray(days, dtype='int64').astype('datetime64[D]')
+
+def sku_day_key(codes, days):
+    """(sku, day) pairs as one int64 that sorts by SKU, then day"""
+    return (np.asarray(codes, dtype='int64') << 32) + (np.asarray(days, dtype='int64') - NO_SALE)
+
+def daily_events(df, skus, prior):
+    """
+    Change events of daily snapshot rows
+
+    Args:
+        df: Daily rows (date, product_id, restock_qty, sold_qty, closing_stock, stockout_flag)
+        skus: Index of product ids covering df
+        prior: Position of each SKU before the first row of df
+    """
+    codes = skus.get_indexer(df['product_id'])
+    day = day_number(df['date'])
+    order = np.lexsort((day, codes))
+    codes, day = codes[order].astype('int32'), day[order]
+    closing = df['closing_stock'].to_numpy('int64')[order]
+    first = np.ones(len(codes), dtype=bool)
+    first[1:] = codes[1:] != codes[:-1]
+    change = closing - np.where(first, np.asarray(prior, dtype='int64')[codes], np.roll(closing, 1))
+    restock = df['restock_qty'].to_numpy('int64')[order]
+    sold = df['sold_qty'].to_numpy('int64')[order]
+    stockout = df['stockout_flag'].to_numpy('int8')[order]
+    keep = first | (change != 0) | (restock != 0) | (sold != 0) | (stockout != 0)
+    return {'day': day[keep], 'sku': codes[keep], 'restock': restock[keep], 'sold': sold[keep],
+            'change': change[keep], 'stockout': stockout[keep]}
+
+class InventoryPositionStore:
+    """
+    Columnar SKU stock positions
+
+    Args:
+        skus: Product ids; a SKU's code is its position
+        events: Dict of equal-length arrays: day, sku, restock, sold, change
+            (position change, normally restock - sold) and stockout
+        end_day: Last day covered (default: the last event)
+        checkpoint_days: Spacing of all-SKU checkpoints
+        checkpoints: Persisted (days, positions) to use instead of rebuilding them
+    """
+    def __init__(self, skus, events, end_day=None, checkpoint_days=DEFAULT_CHECKPOINT_DAYS, checkpoints=None):
+        self.skus = pd.Index(skus)
+        order = np.lexsort((events['sku'], events['day']))
+        self.events = {name: np.asarray(values)[order] for name, values in events.items()}
+        day, sku = self.events['day'], self.events['sku']
+        self.start_day = int(day[0]) if len(day) else 0
+        self.end_day = int(end_day if end_day is not None else (day[-1] if len(day) else 0))
+
+        # Per-SKU view: events by (sku, day), offsets[c]:offsets[c + 1] is SKU c's run
+        by_sku = np.lexsort((day, sku))
+        self.sku_days = day[by_sku]
+        self.offsets = np.searchsorted(sku[by_sku], np.arange(len(self.skus) + 1))
+        runs = np.diff(self.offsets)
+        totals = np.cumsum(self.events['change'][by_sku], dtype='int64')
+        before = np.concatenate([[0], totals])[self.offsets[:-1]]
+        self.sku_positions = totals - np.repeat(before, runs)
+        self.first_day = np.full(len(self.skus), np.iinfo('int32').max, dtype='int64')
+        self.first_day[runs > 0] = self.sku_days[self.offsets[:-1][runs > 0]]
+        # Sale events by (sku, day) for as-of lookups
+        sales = self.events['sold'][by_sku] > 0
+        self.sale_keys = sku_day_key(sku[by_sku][sales], self.sku_days[sales])
+
+        if checkpoints is None:
+            checkpoints = self.build_checkpoints(checkpoint_days)
+        self.checkpoint_days, self.checkpoints = checkpoints
+
+    def build_checkpoints(self, checkpoint_days, after=None, base=None):
+        """
+        Closing position of every SKU on start_day - 1, every checkpoint_days after it, and end_day
+
+        With after/base, only checkpoints after day `after` are built, starting
+        from the positions `base` held on that day.
+        """
+        if after is None:
+            after, base = self.start_day - 1, np.zeros(len(self.skus), dtype='int64')
+            days = np.arange(after, self.end_day, checkpoint_days, dtype='int32')
+        else:
+            days = np.arange(after + checkpoint_days, self.end_day, checkpoint_days, dtype='int32')
+        days = np.append(days, np.int32(self.end_day))
+        # Each event counts towards the first checkpoint on or after its day
+        lo = np.searchsorted(self.events['day'], after + 1)
+        slot = np.searchsorted(days, self.events['day'][lo:])
+        n = len(self.skus)
+        flat = np.bincount(slot * n + self.events['sku'][lo:], weights=self.events['change'][lo:],
+                           minlength=len(days) * n)
+        return days, base + flat.reshape(len(days), n).cumsum(axis=0).astype('int64')
+
+    @classmethod
+    def from_daily(cls, df, checkpoint_days=DEFAULT_CHECKPOINT_DAYS):
+        """Build from a daily snapshot (date, product_id, restock_qty, sold_qty, closing_stock, stockout_flag)"""
+        skus = pd.Index(pd.unique(df['product_id'])).sort_values()
+        events = daily_events(df, skus, np.zeros(len(skus), dtype='int64'))
+        end_day = int(day_number(df['date']).max()) if len(df) else None
+        return cls(skus, events, end_day=end_day, checkpoint_days=checkpoint_days)
+
+    def extend(self, df, checkpoint_days=DEFAULT_CHECKPOINT_DAYS):
+        """
+        Store with the daily rows of days after end_day appended
+
+        Existing events and checkpoints are kept; only the new days are
+        converted and checkpointed.
+        """
+        day = day_number(df['date'])
+        if len(day) and day.min() <= self.end_day:
+            raise ValueError(f"extend() takes days after {day_date([self.end_day])[0]}, got {day_date([day.min()])[0]}")
+        new = pd.Index(pd.unique(df['product_id'])).difference(self.skus)
+        skus = self.skus.append(new)
+        prior = np.concatenate([self.checkpoints[-1], np.zeros(len(new), dtype='int64')])
+        added = daily_events(df, skus, prior)
+        events = {name: np.concatenate([values, added[name]]) for name, values in self.events.items()}
+        # Old checkpoints, padded with the new SKUs (not yet tracked, so 0)
+        old = np.pad(self.checkpoints, ((0, 0), (0, len(new))))
+        store = type(self)(skus, events, end_day=int(day.max()) if len(day) else self.end_day,
+                           checkpoints=(self.checkpoint_days, old))
+        if store.end_day > self.end_day:
+            days, positions = store.build_checkpoints(checkpoint_days, after=self.end_day, base=old[-1])
+            store.checkpoint_days = np.concatenate([self.checkpoint_days, days])
+            store.checkpoints = np.concatenate([old, positions])
+        return store
+
+    def position(self, product_id, date):
+        """Stock of one SKU at the end of date (0 before the SKU is first tracked)"""
+        code = self.skus.get_loc(product_id)
+        lo, hi = self.offsets[code], self.offsets[code + 1]
+        i = np.searchsorted(self.sku_days[lo:hi], day_number([date])[0], side='right')
+        return int(self.sku_positions[lo + i - 1]) if i else 0
+
+    def positions_at(self, date):
+        """Stock of every SKU at the end of date, as a Series indexed by product_id"""
+        day = int(day_number([date])[0])
+        slot = max(np.searchsorted(self.checkpoint_days, day, side='right') - 1, 0)
+        positions = self.checkpoints[slot].copy()
+        lo, hi = np.searchsorted(self.events['day'], [self.checkpoint_days[slot] + 1, day + 1])
+        np.add.at(positions, self.events['sku'][lo:hi], self.events['change'][lo:hi])
+        return pd.Series(positions, index=self.skus, name='on_hand_qty')
+
+    def last_sale_days(self, codes, days):
+        """
+        As-of lookup: day of each SKU's last sale on or before the given day
+
+        Args:
+            codes: SKU codes
+            days: Day numbers (same length as codes)
+
+        Returns:
+            int64 day numbers, NO_SALE where the SKU had not sold by then
+        """
+        if not len(self.sale_keys):
+            return np.full(len(codes), NO_SALE, dtype='int64')
+        keys = sku_day_key(codes, days)
+        i = np.searchsorted(self.sale_keys, keys, side='right') - 1
+        found = i >= 0
+        found[found] = (self.sale_keys[i[found]] >> 32) == np.asarray(codes, dtype='int64')[found]
+        return np.where(found, (self.sale_keys[np.maximum(i, 0)] & 0xFFFFFFFF) + NO_SALE, NO_SALE)
+
+    def daily(self, start=None, end=None):
+        """
+        Dense daily table (DAILY_COLUMNS) for [start, end], one row per tracked SKU-day
+
+        Rows are ordered by date, then product_id. days_since_last_sale counts
+        from the SKU's last sale on or before the day (0 on a day with a sale),
+        or from the day it was first tracked if it has not sold since.
+        """
+        first = self.start_day if start is None else int(day_number([start])[0])
+        last = self.end_day if end is None else int(day_number([end])[0])
+        n_days, n = max(last - first + 1, 0), len(self.skus)
+        lo, hi = np.searchsorted(self.events['day'], [first, last + 1])
+        cell = (self.events['day'][lo:hi] - first) * n + self.events['sku'][lo:hi]
+
+        def grid(name):
+            return np.bincount(cell, weights=self.events[name][lo:hi], minlength=n_days * n).reshape(n_days, n)
+
+        change = grid('change')
+        opening_first = self.positions_at(day_date([first - 1])[0]).to_numpy() if n_days else np.zeros(n)
+        closing = opening_first + change.cumsum(axis=0)
+        tracked = (first + np.arange(n_days))[:, None] >= self.first_day[None, :]
+        days, codes = np.nonzero(tracked)
+        restock, sold = grid('restock')[days, codes], grid('sold')[days, codes]
+        # A SKU's first event carries its whole opening balance, so that day opens at closing - movements
+        opening = np.where(first + days == self.first_day[codes], closing[days, codes] - restock + sold,
+                           (closing - change)[days, codes])
+        # Last sale as of each day: forward max of sale days, seeded with the last sale before the window
+        sale_day = np.where(grid('sold') > 0, (first + np.arange(n_days))[:, None], NO_SALE)
+        seed = self.last_sale_days(np.arange(n), np.full(n, first - 1))
+        last_sale = np.maximum.accumulate(np.vstack([seed, sale_day]), axis=0)[1:][days, codes]
+        since = first + days - np.where(last_sale == NO_SALE, self.first_day[codes], last_sale)
+        return pd.DataFrame({
+            'date': day_date(first + days),
+            'product_id': self.skus[codes],
+            'opening_stock': opening.astype('int64'),
+            'restock_qty': restock.astype('int64'),
+            'sold_qty': sold.astype('int64'),
+            'closing_stock': closing[days, codes].astype('int64'),
+            'stockout_flag': grid('stockout')[days, codes].astype('int8'),
+            'days_since_last_sale': since.astype('int32'),
+        })
+
+    def save(self, processed_path):
+        """Persist events and checkpoints as processed tables"""
+        events = pd.DataFrame({
+            'date': day_date(self.events['day']),
+            'product_id': self.skus[self.events['sku']],
+            'restock_qty': self.events['restock'],
+            'sold_qty': self.events['sold'],
+            'stock_change': self.events['change'],
+            'stockout_flag': self.events['stockout'],
+        })
+        checkpoints = pd.DataFrame({
+            'date': np.repeat(day_date(self.checkpoint_days), len(self.skus)),
+            'product_id': np.tile(np.asarray(self.skus), len(self.checkpoint_days)),
+            'position': self.checkpoints.ravel(),
+        })
+        write_table(events, processed_path, EVENTS_TABLE)
+        write_table(checkpoints, processed_path, CHECKPOINTS_TABLE)
+
+    @classmethod
+    def load(cls, processed_path):
+        """Store persisted by save(), or None if it has not been built"""
+        events = read_table(processed_path, EVENTS_TABLE)
+        checkpoints = read_table(processed_path, CHECKPOINTS_TABLE)
+        if events is None or checkpoints is None:
+            return None
+        codes, skus = pd.factorize(events['product_id'].astype(str), sort=True)
+        cp_days, cp_slot = np.unique(day_number(checkpoints['date']), return_inverse=True)
+        positions = np.zeros((len(cp_days), len(skus)), dtype='int64')
+        positions[cp_slot, skus.get_indexer(checkpoints['product_id'].astype(str))] = checkpoints['position']
+        return cls(skus, {
+            'day': day_number(events['date']),
+            'sku': codes.astype('int32'),
+            'restock': events['restock_qty'].to_numpy('int64'),
+            'sold': events['sold_qty'].to_numpy('int64'),
+            'change': events['stock_change'].to_numpy('int64'),
+            'stockout': events['stockout_flag'].to_numpy('int8'),
+        }, end_day=int(cp_days[-1]), checkpoints=(cp_days.astype('int32'), positions))
@@ -0,0 +1,204 @@
+"""
+Schema registry for processed tables
+Column types applied when a table is written and when it is read back:
+low-cardinality strings and repeated IDs (customer_id, product_id) as
+categoricals, i.e. integer surrogate codes plus one copy of each distinct
+value; dates as datetime64; integer counts and flags downcast. Money and
+ratio columns stay float64 so sums match the unoptimized tables exactly.
+"""
+import numpy as np
+import pandas as pd
+
+SCHEMAS = {
+    'fact_orders': {
+        'order_id': 'key',
+        'order_date': 'datetime',
+        'customer_id': 'category',
+        'product_id': 'category',
+        'region_id': 'int8',
+        'units': 'int16',
+        'order_status': 'category',
+        'delivery_date': 'datetime',
+        'channel': 'category',
+        'is_repeat_customer': 'int8',
+    },
+    'fact_delivery': {
+        'order_id': 'key',
+        'dispatch_date': 'datetime',
+        'delivery_date': 'datetime',
+        'carrier': 'category',
+        'return_flag': 'int8',
+        'delivery_time_days': 'int16',
+        'promise_days': 'int16',
+        'sla_met': 'int8',
+        'sla_breach_days': 'int16',
+        'sla_rule': 'category',
+    },
+    'fact_order_delivery': {
+        'order_id': 'key',
+        'order_date': 'datetime',
+        'customer_id': 'category',
+        'order_status': 'category',
+        'dispatch_date': 'datetime',
+        'delivery_date': 'datetime',
+        'carrier': 'category',
+        'has_delivery': 'int8',
+        'dispatch_lag_days': 'int16',
+        'delivery_lag_days': 'int16',
+        'status_mismatch': 'int8',
+        'return_mismatch': 'int8',
+        'delivery_date_mismatch': 'int8',
+    },
+    'recon_orphans': {
+        'order_id': 'key',
+        'orphan_type': 'category',
+        'date': 'datetime',
+    },
+    'fact_delivery_sla': {
+        'sla_rule': 'category',
+        'promise_days': 'int16',
+        'deliveries': 'int32',
+    },
+    'fact_inventory': {
+        'date': 'datetime',
+        'product_id': 'category',
+        'opening_stock': 'int32',
+        'restock_qty': 'int32',
+        'sold_qty': 'int32',
+        'closing_stock': 'int32',
+        'stockout_flag': 'int8',
+        'on_hand_qty': 'int32',
+        'days_since_last_sale': 'int16',
+    },
+    'inventory_events': {
+        'date': 'datetime',
+        'product_id': 'category',
+        'restock_qty': 'int32',
+        'sold_qty': 'int32',
+        'stock_change': 'int32',
+        'stockout_flag': 'int8',
+    },
+    'inventory_checkpoints': {
+        'date': 'datetime',
+        'product_id': 'category',
+        'position': 'int32',
+    },
+    'fact_marketing': {
+        'date': 'datetime',
+        'channel': 'category',
+        'clicks': 'int32',
+        'conversions': 'int32',
+        'new_customers_acquired': 'int32',
+    },
+    'fact_finance': {
+        'date': 'datetime',
+    },
+    'fact_sales': {
+        'order_id': 'key',
+        'order_date': 'datetime',
+        'customer_id': 'category',
+        'product_id': 'category',
+        'quantity': 'int16',
+    },
+    'fact_production': {
+        'date': 'datetime',
+        'line': 'category',
+        'shift': 'category',
+        'lead_time_days': 'int8',
+    },
+    'fact_procurement': {
+        'date': 'datetime',
+        'supplier_id': 'category',
+        'product_id': 'category',
+        'quantity': 'int16',
+        'delivery_status': 'category',
+    },
+    'fact_cohort_monthly': {
+        'months_since_first': 'int16',
+        'active_customers': 'int32',
+        'orders': 'int32',
+        'cohort_size': 'int32',
+    },
+    'dim_customer': {
+        'segment': 'category',
+        'city': 'category',
+        'state': 'category',
+        'region_id': 'int8',
+        'signup_date': 'datetime',
+    },
+    'dim_product': {
+        'category': 'category',
+        'subcategory': 'category',
+        'brand': 'category',
+        'reorder_point': 'int16',
+    },
+    'dim_date': {
+        'date': 'datetime',
+        'date_key': 'int32',
+        'year': 'int16',
+        'quarter': 'int8',
+        'month': 'int8',
+        'day': 'int8',
+        'day_of_week': 'int8',
+        'is_weekend': 'int8',
+        'month_name': 'category',
+        'day_name': 'category',
+        'fiscal_year': 'int16',
+        'fiscal_quarter': 'int8',
+        'fiscal_month': 'int8',
+        'iso_year': 'int16',
+        'iso_week': 'int8',
+        'is_holiday': 'int8',
+    },
+    'dim_supplier': {
+        'country': 'category',
+        'lead_time_days': 'int8',
+    },
+}
+
+def cast_int(series, dtype):
+    """Downcast an integer column if every value fits, otherwise leave it unchanged"""
+    if not pd.api.types.is_numeric_dtype(series) or series.isna().any():
+        return series
+    if not pd.api.types.is_integer_dtype(series) and not (series % 1 == 0).all():
+        return series
+    info = np.iinfo(dtype)
+    if series.empty or (series.min() >= info.min and series.max() <= info.max):
+        return series.astype(dtype)
+    return series
+
+def cast_key(series):
+    """
+    Row-unique ID columns: integer IDs as int32
+
+    String IDs (ORD-<n>) are kept as strings: a dictionary encoding does not
+    shrink a column whose values are all distinct.
+    """
+    if pd.api.types.is_numeric_dtype(series):
+        return cast_int(series, 'int32')
+    return series
+
+def cast_column(series, kind):
+    if kind == 'key':
+        return cast_key(series)
+    if kind == 'category':
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            return series
+        return series.astype('category')
+    if kind == 'datetime':
+        if pd.api.types.is_datetime64_any_dtype(series):
+            return series
+        return pd.to_datetime(series, errors='coerce')
+    return cast_int(series, kind)
+
+def apply_schema(df, table):
+    """
+    Cast the columns of a registered table to their compact types
+
+    Columns not in the schema (and tables without a schema) are left as they are.
+    """
+    schema = SCHEMAS.get(table)
+    if df is None or not schema:
+        return df
+    converted = {col: cast_column(df[col], kind) for col, kind in schema.items() if col in df.columns}
+    return df.assign(**converted) if converted else df
@@ -0,0 +1,363 @@
+"""
+Storage helpers for processed tables
+Processed tables are stored as Parquet only: single-file tables as
+<name>.parquet, facts as partitioned datasets (<name>/<col>=<value>/<batch>.parquet)
+with append-only batch writes; upserts rewrite only the files holding replaced keys,
+and compaction merges partitions that accumulated many batch files.
+CSV is an export format for BI tools (export_csv), never read between stages.
+"""
+import os
+import glob
+import shutil
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from src.utils.schemas import apply_schema
+
+# Month-partitioned facts: table -> (partition column, date column it is derived from).
+# Files inside a partition are sorted by the date column, so row-group statistics
+# let date filters skip row groups as well as whole partitions.
+PARTITIONING = {
+    'fact_orders': ('order_month', 'order_date'),
+    'fact_sales': ('order_month', 'order_date'),
+    'fact_inventory': ('month', 'date'),
+    'fact_delivery': ('dispatch_month', 'dispatch_date'),
+    'fact_marketing': ('month', 'date'),
+    'fact_finance': ('month', 'date'),
+    'fact_order_delivery': ('order_month', 'order_date'),
+}
+NULL_PARTITION = '__HIVE_DEFAULT_PARTITION__'
+ROW_GROUP_SIZE = 50_000
+
+def new_batch_id():
+    """Sortable, unique id for one write batch"""
+    return datetime.now().strftime('batch-%Y%m%d%H%M%S%f')
+
+def partition_dir(dataset_dir, partition_col, value):
+    return os.path.join(dataset_dir, f'{partition_col}={value}')
+
+def partition_files(dataset_dir, partition_col, value):
+    return sorted(glob.glob(os.path.join(partition_dir(dataset_dir, partition_col, value), '*.parquet')))
+
+def month_partition(dates):
+    """YYYY-MM partition values for a date column (missing dates go to the default partition)"""
+    return pd.to_datetime(dates).dt.strftime('%Y-%m').fillna(NULL_PARTITION)
+
+def write_partitioned(df, dataset_dir, partition_col, batch_id=None, sort_by=None):
+    """
+    Append a batch as one new file per partition value
+
+    The partition column is encoded in the directory name only. With sort_by,
+    rows are sorted within each file so its row-group statistics are selective.
+
+    Returns:
+        List of partition values written
+    """
+    batch_id = batch_id or new_batch_id()
+    written = []
+    for value, part in df.groupby(partition_col, sort=True, dropna=False):
+        if pd.isna(value):
+            value = NULL_PARTITION
+        out_dir = partition_dir(dataset_dir, partition_col, value)
+        os.makedirs(out_dir, exist_ok=True)
+        if sort_by is not None:
+            part = part.sort_values(sort_by, kind='stable')
+        part.drop(columns=[partition_col]).to_parquet(os.path.join(out_dir, f'{batch_id}.parquet'), index=False,
+                                                      row_group_size=ROW_GROUP_SIZE)
+        written.append(value)
+    return written
+
+def rewrite_partition_files(dataset_dir, partition_col, value, transform):
+    """
+    Apply transform(df) -> df to every file of one partition, rewriting only changed files
+
+    Returns:
+        Number of files rewritten
+    """
+    rewritten = 0
+    for path in partition_files(dataset_dir, partition_col, value):
+        df = pd.read_parquet(path)
+        out = transform(df)
+        if out is df:
+            continue
+        if out.empty:
+            os.remove(path)
+        else:
+            out.to_parquet(path, index=False)
+        rewritten += 1
+    return rewritten
+
+def delete_keys(df, dataset_dir, partition_col, key, partitions=None):
+    """
+    Remove existing rows whose key appears in the batch, from any partition
+
+    A key can move between partitions (an order restated into another month),
+    so by default the key column of every file is checked. With partitions
+    (candidate values from a key index, see key_index) only the files of those
+    partitions are checked. Only files that overlap are read in full and rewritten.
+
+    Returns:
+        DataFrame of the removed rows (partition column restored)
+    """
+    removed = []
+    new_keys = set(df[key])
+    prefix = f'{partition_col}='
+    if partitions is None:
+        paths = sorted(glob.glob(os.path.join(dataset_dir, f'{prefix}*', '*.parquet')))
+    else:
+        paths = [path for value in sorted(partitions) for path in partition_files(dataset_dir, partition_col, value)]
+    for path in paths:
+        existing_keys = pq.read_table(path, columns=[key]).column(key).to_pandas()
+        if not existing_keys.isin(new_keys).any():
+            continue
+        value = os.path.basename(os.path.dirname(path))[len(prefix):]
+        existing = pd.read_parquet(path)
+        hit = existing[key].isin(new_keys)
+        removed.append(existing[hit].assign(**{partition_col: value}))
+        remaining = existing[~hit]
+        if remaining.empty:
+            os.remove(path)
+        else:
+            remaining.to_parquet(path, index=False)
+    if not removed:
+        return df.iloc[0:0]
+    return pd.concat(removed, ignore_index=True)
+
+def upsert_partitioned(df, dataset_dir, partition_col, key, batch_id=None, partitions=None):
+    """
+    Upsert a batch: rows whose key already exists in any partition are
+    replaced (new batch wins), then the batch is appended as new files
+
+    Returns:
+        Number of existing rows replaced
+    """
+    removed = delete_keys(df, dataset_dir, partition_col, key, partitions)
+    write_partitioned(df, dataset_dir, partition_col, batch_id)
+    return len(removed)
+
+def key_index(dataset_dir, partition_col, key):
+    """
+    Key -> partition value for every row of a dataset, from one read of the key column
+
+    Returns:
+        DataFrame of key and partition_col (empty if the dataset does not exist)
+    """
+    prefix = f'{partition_col}='
+    parts = []
+    for path in sorted(glob.glob(os.path.join(dataset_dir, f'{prefix}*', '*.parquet'))):
+        keys = pq.read_table(path, columns=[key]).column(key).to_pandas()
+        parts.append(pd.DataFrame({key: keys, partition_col: os.path.basename(os.path.dirname(path))[len(prefix):]}))
+    if not parts:
+        return pd.DataFrame({key: pd.Series(dtype=object), partition_col: pd.Series(dtype=object)})
+    return pd.concat(parts, ignore_index=True)
+
+def compact_partitions(dataset_dir, partition_col, values, min_files, sort_by=None):
+    """
+    Merge the batch files of each partition holding min_files or more into one file
+
+    Append-only batches leave many small files per partition; compaction keeps
+    the file count (and per-file overhead of reads and key checks) bounded.
+    The merged file is written before the batch files are removed.
+
+    Returns:
+        List of partition values compacted
+    """
+    compacted = []
+    for value in sorted(values):
+        files = partition_files(dataset_dir, partition_col, value)
+        if len(files) < max(min_files, 2):
+            continue
+        df = pd.concat([pd.read_parquet(f) for f in files], ignore_index=True)
+        if sort_by is not None:
+            df = df.sort_values(sort_by, kind='stable')
+        tmp_path = os.path.join(partition_dir(dataset_dir, partition_col, value), f'{new_batch_id()}.tmp')
+        df.to_parquet(tmp_path, index=False, row_group_size=ROW_GROUP_SIZE)
+        for path in files:
+            os.remove(path)
+        os.replace(tmp_path, tmp_path[:-len('.tmp')] + '.parquet')
+        compacted.append(value)
+    return compacted
+
+def read_dataset(dataset_dir, columns=None):
+    """Read a partitioned dataset without its directory-encoded partition columns"""
+    files = sorted(glob.glob(os.path.join(dataset_dir, '*', '*.parquet')))
+    if not files:
+        return None
+    return pd.concat([pd.read_parquet(f, columns=columns) for f in files], ignore_index=True)
+
+def partition_values(processed_path, name):
+    """Sorted partition values of a month-partitioned table (the default partition sorts last)"""
+    dataset_dir = os.path.join(processed_path, name)
+    if name not in PARTITIONING or not os.path.isdir(dataset_dir):
+        return []
+    partition_col = PARTITIONING[name][0]
+    prefix = f'{partition_col}='
+    values = [entry[len(prefix):] for entry in os.listdir(dataset_dir) if entry.startswith(prefix)]
+    return sorted(value for value in values if partition_files(dataset_dir, partition_col, value))
+
+def read_partition(processed_path, name, value, columns=None):
+    """Rows of one partition of a month-partitioned table, cast to its schema"""
+    files = partition_files(os.path.join(processed_path, name), PARTITIONING[name][0], value)
+    if not files:
+        return None
+    return apply_schema(pd.concat([pd.read_parquet(f, columns=columns) for f in files], ignore_index=True), name)
+
+def write_table(df, processed_path, name):
+    """
+    Write (replace) a processed table in its registered schema
+
+    Tables in PARTITIONING become month-partitioned datasets <name>/<col>=YYYY-MM/,
+    others a single <name>.parquet. Files of an older layout (<name>.parquet,
+    <name>.csv) are removed so they cannot drift from the table.
+    Returns the frame as written.
+    """
+    os.makedirs(processed_path, exist_ok=True)
+    df = apply_schema(df, name)
+    single = os.path.join(processed_path, f'{name}.parquet')
+    stale = [os.path.join(processed_path, f'{name}.csv')]
+    if name in PARTITIONING:
+        partition_col, date_col = PARTITIONING[name]
+        dataset_dir = os.path.join(processed_path, name)
+        remove_dataset(dataset_dir)
+        write_partitioned(df.assign(**{partition_col: month_partition(df[date_col])}), dataset_dir,
+                          partition_col, sort_by=date_col)
+        stale.append(single)
+    else:
+        df.to_parquet(single, index=False, row_group_size=ROW_GROUP_SIZE)
+    for path in stale:
+        if os.path.exists(path):
+            os.remove(path)
+    return df
+
+def read_table(processed_path, name, columns=None):
+    """
+    Read a processed table from the best available storage
+
+    Order: partitioned dataset <name>/, then <name>.parquet, then a legacy
+    <name>.csv from trees written before the Parquet-only layout.
+    Registered tables are cast to their schema (src.utils.schemas).
+    Returns None when the table does not exist.
+    """
+    dataset_dir = os.path.join(processed_path, name)
+    parquet_path = os.path.join(processed_path, f'{name}.parquet')
+    csv_path = os.path.join(processed_path, f'{name}.csv')
+    df = read_dataset(dataset_dir, columns) if os.path.isdir(dataset_dir) else None
+    if df is None and os.path.exists(parquet_path):
+        df = pd.read_parquet(parquet_path, columns=columns)
+    if df is None and os.path.exists(csv_path):
+        df = pd.read_csv(csv_path, usecols=columns)
+    return apply_schema(df, name)
+
+def open_dataset(processed_path, name):
+    """pyarrow dataset over a processed table's Parquet files (None if it has none)"""
+    dataset_dir = os.path.join(processed_path, name)
+    if os.path.isdir(dataset_dir) and name in PARTITIONING:
+        partitioning = ds.partitioning(pa.schema([(PARTITIONING[name][0], pa.string())]), flavor='hive')
+        return ds.dataset(dataset_dir, format='parquet', partitioning=partitioning)
+    files = table_files(processed_path, name)
+    return ds.dataset(files, format='parquet') if files else None
+
+def date_filter(dataset, name, start=None, end=None):
+    """
+    Filter expression for start <= date < end on a month-partitioned table
+
+    Bounds are pushed down twice: on the partition column (whole partitions are
+    skipped without opening their files) and on the date column (row groups are
+    skipped by their min/max statistics).
+    """
+    partition_col, date_col = PARTITIONING[name]
+    has_partitions = partition_col in dataset.schema.names
+    expr = None
+    if start is not None:
+        start = pd.Timestamp(start)
+        cond = ds.field(date_col) >= start
+        if has_partitions:
+            cond = (ds.field(partition_col) >= start.strftime('%Y-%m')) & cond
+        expr = cond
+    if end is not None:
+        end = pd.Timestamp(end)
+        cond = ds.field(date_col) < end
+        if has_partitions:
+            cond = (ds.field(partition_col) <= (end - pd.Timedelta(1, 'ns')).strftime('%Y-%m')) & cond
+        expr = cond if expr is None else expr & cond
+    return expr
+
+def scan_table(processed_path, name, columns=None, start=None, end=None):
+    """
+    Read a processed table with column projection and date-range pushdown
+
+    Only the requested columns are decoded, and for month-partitioned tables
+    only partitions and row groups overlapping [start, end) are read. The
+    partition column is not returned unless it is requested.
+    Returns None when the table does not exist.
+    """
+    windowed = start is not None or end is not None
+    if windowed and name not in PARTITIONING:
+        raise ValueError(f"Date filters need a month-partitioned table, got '{name}'")
+    dataset = open_dataset(processed_path, name)
+    if dataset is None:
+        # Legacy CSV table: filtered after a full read
+        df = read_table(processed_path, name)
+        if df is None:
+            return None
+        if windowed:
+            dates = pd.to_datetime(df[PARTITIONING[name][1]])
+            keep = pd.Series(True, index=df.index)
+            if start is not None:
+                keep &= dates >= pd.Timestamp(start)
+            if end is not None:
+                keep &= dates < pd.Timestamp(end)
+            df = df[keep].reset_index(drop=True)
+        return df[list(columns)] if columns is not None else df
+    expr = date_filter(dataset, name, start, end) if windowed else None
+    if columns is None:
+        partition_col = PARTITIONING.get(name, (None,))[0]
+        columns = [c for c in dataset.schema.names if c != partition_col]
+    df = dataset.to_table(columns=list(columns), filter=expr).to_pandas()
+    return apply_schema(df, name)
+
+def table_exists(processed_path, name):
+    return (os.path.isdir(os.path.join(processed_path, name))
+            or os.path.exists(os.path.join(processed_path, f'{name}.parquet'))
+            or os.path.exists(os.path.join(processed_path, f'{name}.csv')))
+
+def table_columns(processed_path, name):
+    """Column names of a processed table without reading its rows (empty if it does not exist)"""
+    dataset = open_dataset(processed_path, name)
+    if dataset is not None:
+        return list(dataset.schema.names)
+    csv_path = os.path.join(processed_path, f'{name}.csv')
+    if os.path.exists(csv_path):
+        return list(pd.read_csv(csv_path, nrows=0).columns)
+    return []
+
+def table_files(processed_path, name):
+    """Binary files backing a processed table (dataset files or <name>.parquet)"""
+    files = sorted(glob.glob(os.path.join(processed_path, name, '*', '*.parquet')))
+    single = os.path.join(processed_path, f'{name}.parquet')
+    return files or ([single] if os.path.exists(single) else [])
+
+def export_csv(processed_path, name, export_dir):
+    """
+    CSV copy of a processed table for BI tools, produced lazily
+
+    The CSV is rewritten only when it is missing or older than the table's files.
+    Returns the CSV path, or None if the table does not exist.
+    """
+    files = table_files(processed_path, name)
+    if not files:
+        return None
+    csv_path = os.path.join(export_dir, f'{name}.csv')
+    if os.path.exists(csv_path) and os.path.getmtime(csv_path) >= max(os.path.getmtime(f) for f in files):
+        return csv_path
+    os.makedirs(export_dir, exist_ok=True)
+    read_table(processed_path, name).to_csv(csv_path, index=False)
+    return csv_path
+
+def remove_dataset(dataset_dir):
+    if os.path.isdir(dataset_dir):
+        shutil.rmtree(dataset_dir)
@@ -0,0 +1,122 @@
+"""
+Pipeline-scoped table cache
+Holds each processed table in memory once (string columns dictionary-encoded)
+so later stages of the same run do not re-read and re-parse it. Tables are
+evicted least-recently-used when the memory budget is exceeded; evicted
+tables are simply re-read from their files on the next access.
+"""
+from collections import OrderedDict
+
+import pandas as pd
+
+from src.utils.storage import read_table
+
+# String columns with at most this share of distinct values are stored as categoricals
+CATEGORY_MAX_RATIO = 0.5
+
+def is_date_like(series):
+    """Date strings stay as they are: consumers parse them with pd.to_datetime"""
+    sample = series.dropna().head(5)
+    if sample.empty:
+        return False
+    try:
+        pd.to_datetime(sample, format='ISO8601')
+        return True
+    except (ValueError, TypeError):
+        return False
+
+def optimize_dtypes(df):
+    """Dictionary-encode low-cardinality string columns (values are unchanged)"""
+    if df.empty:
+        return df
+    converted = {}
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                continue
+            if series.nunique(dropna=True) <= CATEGORY_MAX_RATIO * len(series) and not is_date_like(series):
+                converted[col] = series.astype('category')
+    return df.assign(**converted) if converted else df
+
+def frame_bytes(df):
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+class TableCache:
+    """
+    In-memory view of processed tables for one pipeline run
+
+    Args:
+        processed_path: Directory the tables are read from
+        memory_budget_mb: Upper bound on memory held by cached tables
+    """
+    def __init__(self, processed_path, memory_budget_mb=1024):
+        self.processed_path = processed_path
+        self.budget = int(memory_budget_mb * 1024 * 1024)
+        self.tables = OrderedDict()
+        self.sizes = {}
+        self.stats = {'hits': 0, 'disk_reads': 0, 'evictions': 0, 'invalidations': 0, 'peak_bytes': 0}
+
+    @property
+    def used_bytes(self):
+        return sum(self.sizes.values())
+
+    def get(self, name, columns=None):
+        """
+        Table by name, optionally projected to columns; None if it does not exist
+
+        The whole table is loaded on first access so later stages asking for
+        other columns share the same copy. Returned frames are shallow copies:
+        callers may add or replace columns without affecting the cache.
+        """
+        if name in self.tables:
+            self.tables.move_to_end(name)
+            self.stats['hits'] += 1
+            df = self.tables[name]
+        else:
+            df = read_table(self.processed_path, name)
+            self.stats['disk_reads'] += 1
+            if df is None:
+                return None
+            df = self.put(name, df)
+        if columns is not None:
+            return df[list(columns)].copy(deep=False)
+        return df.copy(deep=False)
+
+    def put(self, name, df):
+        """Hold a table produced in this run (replaces any cached version)"""
+        self.invalidate(name, count=False)
+        df = optimize_dtypes(df)
+        size = frame_bytes(df)
+        if size > self.budget:
+            # Larger than the whole budget: serve it but do not hold it
+            return df
+        self.tables[name] = df
+        self.sizes[name] = size
+        self.evict()
+        self.stats['peak_bytes'] = max(self.stats['peak_bytes'], self.used_bytes)
+        return df
+
+    def invalidate(self, name, count=True):
+        """Drop a table whose files were rewritten"""
+        if name in self.tables:
+            del self.tables[name]
+            del self.sizes[name]
+            if count:
+                self.stats['invalidations'] += 1
+
+    def evict(self):
+        while self.used_bytes > self.budget and len(self.tables) > 1:
+            name, _ = self.tables.popitem(last=False)
+            del self.sizes[name]
+            self.stats['evictions'] += 1
+
+    def report(self):
+        return dict(self.stats, cached_tables=list(self.tables), used_bytes=self.used_bytes,
+                    budget_bytes=self.budget)
+
+def load_table(tables, processed_path, name, columns=None):
+    """Read through the pipeline table cache when one is given, otherwise from disk"""
+    if tables is not None:
+        return tables.get(name, columns)
+    return read_table(processed_path, name, columns)
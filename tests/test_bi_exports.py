@@ -0,0 +1,142 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.etl.create_bi_exports import create_daily_kpis, create_monthly_kpis, register_kpi, build_kpi_table, save_table
+from src.utils.bi_tables import load_bi_table, bi_table_source, bi_table_columns
+
+# Reference: the row-loop implementation the registry replaced
+
+def legacy_daily_kpis(orders, marketing, delivery, inventory):
+    kpis = []
+    revenue_daily = orders.groupby('order_date').agg({
+        'net_sales': 'sum', 'profit': 'sum', 'order_id': 'nunique', 'customer_id': 'nunique', 'units': 'sum'
+    }).reset_index()
+    for _, row in revenue_daily.iterrows():
+        kpis.append({'date': row['order_date'], 'kpi_name': 'revenue', 'kpi_value': row['net_sales']})
+        kpis.append({'date': row['order_date'], 'kpi_name': 'gross_margin', 'kpi_value': row['profit']})
+        kpis.append({'date': row['order_date'], 'kpi_name': 'orders', 'kpi_value': row['order_id']})
+        kpis.append({'date': row['order_date'], 'kpi_name': 'active_customers', 'kpi_value': row['customer_id']})
+        kpis.append({'date': row['order_date'], 'kpi_name': 'units_sold', 'kpi_value': row['units']})
+        kpis.append({'date': row['order_date'], 'kpi_name': 'aov', 'kpi_value': row['net_sales'] / row['order_id'] if row['order_id'] > 0 else 0})
+    mkt_daily = marketing.groupby('date').agg({'spend': 'sum', 'conversions': 'sum', 'clicks': 'sum'}).reset_index()
+    for _, row in mkt_daily.iterrows():
+        kpis.append({'date': row['date'], 'kpi_name': 'marketing_spend', 'kpi_value': row['spend']})
+        kpis.append({'date': row['date'], 'kpi_name': 'conversions', 'kpi_value': row['conversions']})
+        kpis.append({'date': row['date'], 'kpi_name': 'cac', 'kpi_value': row['spend'] / row['conversions'] if row['conversions'] > 0 else 0})
+    dlv_daily = delivery.groupby('dispatch_date').agg({'sla_met': 'mean', 'return_flag': 'mean'}).reset_index()
+    for _, row in dlv_daily.iterrows():
+        kpis.append({'date': row['dispatch_date'], 'kpi_name': 'sla_compliance', 'kpi_value': row['sla_met']})
+        kpis.append({'date': row['dispatch_date'], 'kpi_name': 'return_rate', 'kpi_value': row['return_flag']})
+    inv_daily = inventory.groupby('date').agg({'stockout_flag': 'mean', 'closing_stock': 'sum'}).reset_index()
+    for _, row in inv_daily.iterrows():
+        kpis.append({'date': row['date'], 'kpi_name': 'stockout_rate', 'kpi_value': row['stockout_flag']})
+        kpis.append({'date': row['date'], 'kpi_name': 'inventory_value', 'kpi_value': row['closing_stock']})
+    df_kpis = pd.DataFrame(kpis)
+    df_kpis['date'] = pd.to_datetime(df_kpis['date']).dt.strftime('%Y-%m-%d')
+    return df_kpis
+
+def legacy_monthly_kpis(monthly):
+    cols = [('revenue', 'monthly_revenue'), ('gross_margin', 'monthly_gross_margin'), ('orders', 'monthly_orders'),
+            ('active_customers', 'active_customers'), ('cac', 'monthly_cac'), ('sla_compliance', 'monthly_sla_perf'),
+            ('return_rate', 'monthly_return_rate'), ('stockout_rate', 'monthly_stockout_rate')]
+    kpis = []
+    for _, row in monthly.iterrows():
+        for name, col in cols:
+            kpis.append({'year_month': row['year_month'], 'kpi_name': name, 'kpi_value': row[col]})
+    return pd.DataFrame(kpis)
+
+def make_facts(path):
+    rng = np.random.default_rng(0)
+    n = 400
+    dates = pd.date_range('2024-01-01', periods=20)
+    orders = pd.DataFrame({
+        'order_id': [f'ORD-{i}' for i in range(n)],
+        'order_date': rng.choice(dates, n),
+        'customer_id': rng.choice([f'C{i:05d}' for i in range(30)], n),
+        'units': rng.integers(1, 4, n),
+        'net_sales': rng.uniform(100, 1000, n).round(2),
+        'profit': rng.uniform(-50, 300, n).round(2)
+    })
+    orders.to_csv(os.path.join(path, 'fact_orders.csv'), index=False)
+    marketing = pd.DataFrame({
+        'date': np.repeat(dates, 2),
+        'spend': rng.uniform(500, 5000, 40).round(2),
+        'clicks': rng.integers(10, 100, 40),
+        'conversions': np.r_[[0, 0], rng.integers(0, 5, 38)]  # Day with no conversions -> cac 0
+    })
+    marketing.to_parquet(os.path.join(path, 'fact_marketing.parquet'), index=False)
+    delivery = pd.DataFrame({
+        'dispatch_date': rng.choice(dates, 300),
+        'sla_met': rng.integers(0, 2, 300),
+        'return_flag': rng.integers(0, 2, 300)
+    })
+    delivery.to_parquet(os.path.join(path, 'fact_delivery.parquet'), index=False)
+    inventory = pd.DataFrame({
+        'date': np.repeat(dates, 5),
+        'stockout_flag': rng.integers(0, 2, 100),
+        'closing_stock': rng.integers(0, 200, 100)
+    })
+    inventory.to_parquet(os.path.join(path, 'fact_inventory.parquet'), index=False)
+    monthly = pd.DataFrame({
+        'year_month': ['2024-01', '2024-02'],
+        'monthly_revenue': [1000.5, 2000.25], 'monthly_gross_margin': [300.0, 400.0], 'monthly_orders': [10, 20],
+        'active_customers': [5, 8], 'monthly_cac': [np.nan, 12.5], 'monthly_sla_perf': [0.9, 0.95],
+        'monthly_return_rate': [0.05, 0.04], 'monthly_stockout_rate': [0.0, 0.1]
+    })
+    monthly.to_parquet(os.path.join(path, 'monthly_snapshot.parquet'), index=False)
+    orders['order_date'] = pd.to_datetime(orders['order_date'])
+    return orders, marketing, delivery, inventory, monthly
+
+def test_daily_kpis_match_legacy_row_for_row(tmp_path):
+    orders, marketing, delivery, inventory, _ = make_facts(str(tmp_path))
+    expected = legacy_daily_kpis(orders, marketing, delivery, inventory)
+    assert_frame_equal(create_daily_kpis(str(tmp_path)), expected)
+
+def test_monthly_kpis_match_legacy_row_for_row(tmp_path):
+    *_, monthly = make_facts(str(tmp_path))
+    assert_frame_equal(create_monthly_kpis(str(tmp_path)), legacy_monthly_kpis(monthly))
+
+def test_kpi_added_by_registration_only():
+    registry = []
+    register_kpi(registry, 'units', 'orders', 'order_date', agg=('units', 'sum'))
+    register_kpi(registry, 'big_orders', 'orders', 'order_date', agg=('units', lambda u: (u >= 3).sum()))
+    orders = pd.DataFrame({'order_date': ['d1', 'd1', 'd2'], 'units': [1, 3, 4]})
+    out = build_kpi_table({'orders': orders}, registry)
+    assert list(out['kpi_name']) == ['units', 'big_orders', 'units', 'big_orders']
+    assert list(out['kpi_value']) == [4.0, 1.0, 4.0, 1.0]
+
+def test_bi_tables_load_from_ipc_with_fallback(tmp_path):
+    path = str(tmp_path)
+    kpis = pd.DataFrame({'date': ['2024-01-01', '2024-01-02'], 'kpi_name': ['revenue', 'revenue'],
+                         'kpi_value': [10.5, 12.0]})
+    save_table(kpis, path, 'fact_kpis_daily', 'both')
+
+    assert bi_table_source(path, 'fact_kpis_daily')[0] == 'feather'
+    loaded = load_bi_table('fact_kpis_daily', path)
+    # Dates come back as dates: no parsing needed by reports
+    assert loaded['date'].dtype.kind == 'M'
+    assert_frame_equal(loaded.assign(date=loaded['date'].dt.strftime('%Y-%m-%d')), kpis, check_dtype=False)
+    assert list(load_bi_table('fact_kpis_daily', path, columns=['kpi_value'])['kpi_value']) == [10.5, 12.0]
+
+    # An IPC file older than a re-exported CSV is stale and skipped
+    os.utime(os.path.join(path, 'fact_kpis_daily.feather'), (0, 0))
+    assert bi_table_source(path, 'fact_kpis_daily')[0] == 'parquet'
+    os.remove(os.path.join(path, 'fact_kpis_daily.parquet'))
+    assert bi_table_source(path, 'fact_kpis_daily')[0] == 'csv'
+    assert len(load_bi_table('fact_kpis_daily', path)) == 2
+    assert load_bi_table('fact_transactions', path) is None
+
+def test_ipc_keeps_malformed_dates_as_text(tmp_path):
+    path = str(tmp_path)
+    orders = pd.DataFrame({'order_date': ['2024-01-01', '2024/01/02', 'not a date'], 'units': [1, 2, 3]})
+    save_table(orders, path, 'fact_transactions', 'csv')
+
+    loaded = load_bi_table('fact_transactions', path)
+    assert list(loaded['order_date']) == list(orders['order_date'])
+    assert bi_table_columns('fact_transactions', path) == ['order_date', 'units']
+    assert bi_table_columns('fact_delivery', path) is None
@@ -7,7 +7,8 @@ import os
 import sys
 from datetime import datetime
 
-sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.utils.bi_tables import load_bi_table, bi_table_exists, bi_table_columns
 
 class DataQualityValidator:
     """Comprehensive data quality validation"""
@@ -79,8 +80,7 @@ class DataQualityValidator:
         
         missing = []
         for table in required_tables:
-            csv_path = os.path.join(self.bi_path, f'{table}.csv')
-            if not os.path.exists(csv_path):
+            if not bi_table_exists(table, self.bi_path):
                 missing.append(table)
         
         passed = len(missing) == 0
@@ -97,10 +97,9 @@ class DataQualityValidator:
         }
         
         for table, required_cols in schema_requirements.items():
-            csv_path = os.path.join(self.bi_path, f'{table}.csv')
-            if os.path.exists(csv_path):
-                df = pd.read_csv(csv_path, nrows=1)
-                missing_cols = [col for col in required_cols if col not in df.columns]
+            columns = bi_table_columns(table, self.bi_path)
+            if columns is not None:
+                missing_cols = [col for col in required_cols if col not in columns]
                 
                 passed = len(missing_cols) == 0
                 message = f"{table}: All required columns present" if passed else f"{table}: Missing {missing_cols}"
@@ -116,9 +115,10 @@ class DataQualityValidator:
         }
         
         for table, cols in date_columns.items():
-            csv_path = os.path.join(self.bi_path, f'{table}.csv')
-            if os.path.exists(csv_path):
-                df = pd.read_csv(csv_path, nrows=100)
+            # Values as exported (the IPC copy already holds parsed dates)
+            df = load_bi_table(table, self.bi_path, formats=('csv', 'parquet'))
+            if df is not None:
+                df = df.head(100)
                 for col in cols:
                     if col in df.columns:
                         try:
@@ -137,9 +137,8 @@ class DataQualityValidator:
         }
         
         for table, cols in key_columns.items():
-            csv_path = os.path.join(self.bi_path, f'{table}.csv')
-            if os.path.exists(csv_path):
-                df = pd.read_csv(csv_path)
+            df = load_bi_table(table, self.bi_path)
+            if df is not None:
                 for col in cols:
                     if col in df.columns:
                         null_count = df[col].isnull().sum()
@@ -150,24 +149,18 @@ class DataQualityValidator:
     def test_referential_integrity(self):
         """Test foreign key relationships"""
         # Check customer_id in transactions exists in dim_customer
-        trans_path = os.path.join(self.bi_path, 'fact_transactions.csv')
-        cust_path = os.path.join(self.bi_path, 'dim_customer.csv')
+        trans = load_bi_table('fact_transactions', self.bi_path, columns=['customer_id', 'product_id'])
+        cust = load_bi_table('dim_customer', self.bi_path, columns=['customer_id'])
         
-        if os.path.exists(trans_path) and os.path.exists(cust_path):
-            trans = pd.read_csv(trans_path)
-            cust = pd.read_csv(cust_path)
-            
+        if trans is not None and cust is not None:
             orphaned = trans[~trans['customer_id'].isin(cust['customer_id'])]
             passed = len(orphaned) == 0
             message = "All customer_ids valid" if passed else f"{len(orphaned)} orphaned customer_ids"
             self.add_test_result("Referential Integrity - customer_id", passed, message, len(orphaned))
         
         # Check product_id
-        prod_path = os.path.join(self.bi_path, 'dim_product.csv')
-        if os.path.exists(trans_path) and os.path.exists(prod_path):
-            trans = pd.read_csv(trans_path)
-            prod = pd.read_csv(prod_path)
-            
+        prod = load_bi_table('dim_product', self.bi_path, columns=['product_id'])
+        if trans is not None and prod is not None:
             orphaned = trans[~trans['product_id'].isin(prod['product_id'])]
             passed = len(orphaned) == 0
             message = "All product_ids valid" if passed else f"{len(orphaned)} orphaned product_ids"
@@ -175,10 +168,9 @@ class DataQualityValidator:
     
     def test_date_continuity(self):
         """Test that daily series have no gaps"""
-        kpi_path = os.path.join(self.bi_path, 'fact_kpis_daily.csv')
+        df = load_bi_table('fact_kpis_daily', self.bi_path)
         
-        if os.path.exists(kpi_path):
-            df = pd.read_csv(kpi_path)
+        if df is not None:
             df['date'] = pd.to_datetime(df['date'])
             
             # Check for a specific KPI
@@ -195,13 +187,10 @@ class DataQualityValidator:
     def test_kpi_reconciliation(self):
         """Test that aggregated KPIs match raw data"""
         # Check if daily revenue KPI matches sum of transactions
-        kpi_path = os.path.join(self.bi_path, 'fact_kpis_daily.csv')
-        trans_path = os.path.join(self.bi_path, 'fact_transactions.csv')
+        kpis = load_bi_table('fact_kpis_daily', self.bi_path)
+        trans = load_bi_table('fact_transactions', self.bi_path, columns=['order_date', 'revenue_net'])
         
-        if os.path.exists(kpi_path) and os.path.exists(trans_path):
-            kpis = pd.read_csv(kpi_path)
-            trans = pd.read_csv(trans_path)
-            
+        if kpis is not None and trans is not None:
             kpis['date'] = pd.to_datetime(kpis['date'])
             trans['order_date'] = pd.to_datetime(trans['order_date'])
             
@@ -222,11 +211,9 @@ class DataQualityValidator:
     
     def test_revenue_calculations(self):
         """Test revenue calculation logic"""
-        trans_path = os.path.join(self.bi_path, 'fact_transactions.csv')
+        df = load_bi_table('fact_transactions', self.bi_path)
         
-        if os.path.exists(trans_path):
-            df = pd.read_csv(trans_path)
-            
+        if df is not None:
             # Test: revenue_net = revenue_gross - discount_amount
             if all(col in df.columns for col in ['revenue_net', 'revenue_gross', 'discount_amount']):
                 df['calculated_net'] = df['revenue_gross'] - df['discount_amount']
@@ -249,11 +236,9 @@ class DataQualityValidator:
     
     def test_non_negative_values(self):
         """Test that certain metrics are non-negative"""
-        trans_path = os.path.join(self.bi_path, 'fact_transactions.csv')
+        df = load_bi_table('fact_transactions', self.bi_path)
         
-        if os.path.exists(trans_path):
-            df = pd.read_csv(trans_path)
-            
+        if df is not None:
             non_negative_cols = ['quantity', 'revenue_gross', 'revenue_net', 'cogs']
             for col in non_negative_cols:
                 if col in df.columns:
@@ -0,0 +1,38 @@
+import os
+import sys
+from datetime import date
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.utils.date_dim import build_date_dim
+
+def test_calendar_columns_match_python_dates():
+    dim = build_date_dim('1999-12-25', '2001-01-10', fiscal_year_start_month=4)
+    assert len(dim) == (date(2001, 1, 10) - date(1999, 12, 25)).days + 1
+
+    for row in dim.sample(50, random_state=0).itertuples():
+        d = row.date.date()
+        assert row.date_key == int(d.strftime('%Y%m%d'))
+        assert row.quarter == (d.month - 1) // 3 + 1
+        assert (row.month_name, row.day_name, row.year_month) == (d.strftime('%B'), d.strftime('%A'), d.strftime('%Y-%m'))
+        assert row.day_of_week == d.weekday() and row.is_weekend == int(d.weekday() >= 5)
+        assert (row.iso_year, row.iso_week) == tuple(d.isocalendar())[:2]
+
+def test_fiscal_calendar_and_holidays():
+    dim = build_date_dim('2024-03-30', '2024-04-02', fiscal_year_start_month=4,
+                         holidays=['04-01', '2024-03-31']).set_index('date')
+    assert list(dim['fiscal_year']) == [2024, 2024, 2025, 2025]
+    assert list(dim['fiscal_month']) == [12, 12, 1, 1]
+    assert list(dim['fiscal_quarter']) == [4, 4, 1, 1]
+    assert list(dim['is_holiday']) == [0, 1, 1, 0]
+
+    calendar = build_date_dim('2024-01-01', '2024-12-31')
+    assert (calendar['fiscal_year'] == calendar['year']).all()
+    assert (calendar['fiscal_month'] == calendar['month']).all()
+
+def test_century_calendar():
+    dim = build_date_dim('2000-01-01', '2099-12-31')
+    assert len(dim) == len(pd.date_range('2000-01-01', '2099-12-31'))
+    assert dim['date_key'].is_monotonic_increasing
+    assert dim['year_month'].nunique() == 1200
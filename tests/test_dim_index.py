@@ -0,0 +1,55 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.utils.dim_index import DimensionIndex
+from src.etl.etl_orders import transform_orders
+
+def sample_dims():
+    products = pd.DataFrame({
+        'product_id': ['P3', 'P1', 'P2', 'P1'],
+        'unit_price': [30.0, 9.0, 20.0, 10.0],
+        'unit_cost': [18.0, 5.0, 12.0, 6.0],
+    })
+    customers = pd.DataFrame({'customer_id': ['C1', 'C2'], 'region_id': pd.array([1, 2], dtype='int8')})
+    return products, customers
+
+def sample_orders():
+    return pd.DataFrame({
+        'order_id': [1, 2, 3, 4, 5],
+        'order_date': pd.to_datetime(['2024-01-01', '2024-01-02', '2024-01-02', '2024-01-03', '2024-01-04']),
+        'customer_id': ['C1', 'C2', 'C9', 'C1', 'C2'],
+        'product_id': ['P1', 'P2', 'P3', 'P9', 'P1'],
+        'units': [1, 2, 3, 4, 5],
+        'discount_pct': [0.0, 0.1, None, 0.0, 0.2],
+        'order_status': ['Delivered'] * 5,
+        'delivery_date': pd.to_datetime(['2024-01-03'] * 5),
+        'channel': ['Web'] * 5,
+    })
+
+def test_enrich_matches_left_merge_including_missing_keys():
+    products, customers = sample_dims()
+    orders = sample_orders()
+    latest = products.drop_duplicates('product_id', keep='last')
+
+    expected = orders.merge(latest, on='product_id', how='left').merge(customers, on='customer_id', how='left')
+    enriched = DimensionIndex(customers, 'customer_id').enrich(DimensionIndex(products, 'product_id').enrich(orders))
+    pd.testing.assert_frame_equal(enriched, expected)
+
+    # Categorical fact keys resolve through their categories
+    categorical = orders.astype({'product_id': 'category'})
+    codes = DimensionIndex(products, 'product_id').codes(categorical['product_id'])
+    assert list(codes) == list(DimensionIndex(products, 'product_id').codes(orders['product_id']))
+    assert codes[3] == -1
+
+def test_transform_orders_accepts_frames_or_prebuilt_indexes():
+    products, customers = sample_dims()
+    from_frames = transform_orders(sample_orders(), products, customers)
+    from_index = transform_orders(sample_orders(),
+                                  DimensionIndex(products, 'product_id', ['unit_price', 'unit_cost']),
+                                  DimensionIndex(customers, 'customer_id', ['region_id']))
+    pd.testing.assert_frame_equal(from_frames, from_index)
+    assert from_frames.loc[0, 'unit_price'] == 10.0
+    assert pd.isna(from_frames.loc[3, 'net_sales'])
@@ -0,0 +1,106 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.utils.inventory_store import InventoryPositionStore, DAILY_COLUMNS
+
+def daily_snapshot():
+    """Two SKUs over ten days; P2 is first tracked on day 4 and sells out"""
+    rows = []
+    stock = {'P1': 20, 'P2': 5}
+    for day, date in enumerate(pd.date_range('2024-01-30', periods=10)):
+        for sku in ('P1', 'P2'):
+            if sku == 'P2' and day < 3:
+                continue
+            restock = 10 if day % 4 == 0 else 0
+            sold = min(stock[sku] + restock, 3 if day % 3 else 0)
+            opening = stock[sku]
+            stock[sku] = opening + restock - sold
+            rows.append([date, sku, opening, restock, sold, stock[sku], int(stock[sku] == 0)])
+    return pd.DataFrame(rows, columns=DAILY_COLUMNS)
+
+def test_daily_round_trip():
+    df = daily_snapshot()
+    store = InventoryPositionStore.from_daily(df, checkpoint_days=3)
+    # Days without any movement are not stored
+    assert len(store.events['day']) < len(df)
+    out = store.daily()[DAILY_COLUMNS]
+    pd.testing.assert_frame_equal(out.astype({'product_id': str}), df.astype({'product_id': str}), check_dtype=False)
+
+def test_point_and_all_sku_queries():
+    df = daily_snapshot()
+    store = InventoryPositionStore.from_daily(df, checkpoint_days=3)
+    for row in df.itertuples():
+        assert store.position(row.product_id, row.date) == row.closing_stock
+    assert store.position('P2', '2024-01-31') == 0
+
+    for date, day in df.groupby('date'):
+        positions = store.positions_at(date)
+        expected = day.set_index('product_id')['closing_stock'].reindex(positions.index, fill_value=0)
+        assert np.array_equal(positions.to_numpy(), expected.to_numpy())
+    # After the last day positions stay at the last closing stock
+    assert store.positions_at('2024-03-01').to_dict() == store.positions_at('2024-02-08').to_dict()
+
+def test_save_and_load(tmp_path):
+    df = daily_snapshot()
+    store = InventoryPositionStore.from_daily(df, checkpoint_days=4)
+    store.save(str(tmp_path))
+    loaded = InventoryPositionStore.load(str(tmp_path))
+    assert np.array_equal(loaded.checkpoint_days, store.checkpoint_days)
+    pd.testing.assert_frame_equal(loaded.daily('2024-02-02', '2024-02-05').astype({'product_id': str}),
+                                  store.daily('2024-02-02', '2024-02-05').astype({'product_id': str}))
+    assert InventoryPositionStore.load(str(tmp_path / 'missing')) is None
+
+def random_snapshot(n_skus=30, n_days=90, seed=7):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2023-12-01', periods=n_days)
+    sold = rng.poisson(0.2, (n_days, n_skus))
+    restock = np.where(rng.random((n_days, n_skus)) < 0.05, 20, 0)
+    closing = np.maximum(10 + np.cumsum(restock - sold, axis=0), 0)
+    opening = np.vstack([np.full(n_skus, 10), closing[:-1]])
+    sold = opening + restock - closing
+    df = pd.DataFrame({
+        'date': np.repeat(dates, n_skus),
+        'product_id': np.tile([f'P{i:03d}' for i in range(n_skus)], n_days),
+        'opening_stock': opening.ravel(), 'restock_qty': restock.ravel(), 'sold_qty': sold.ravel(),
+        'closing_stock': closing.ravel(), 'stockout_flag': (closing == 0).ravel().astype(int),
+    })
+    # SKUs that start later
+    return df[(df['product_id'] < 'P025') | (df['date'] >= '2024-01-10')].reset_index(drop=True)
+
+def asof_days_since_last_sale(df):
+    """Reference: per-product merge_asof of each day onto the days with a sale"""
+    days = df.sort_values('date')
+    sales = days.loc[days['sold_qty'] > 0, ['product_id', 'date']].rename(columns={'date': 'last_sale'})
+    first = days.groupby('product_id')['date'].transform('min')
+    out = pd.merge_asof(days.assign(first=first), sales, left_on='date', right_on='last_sale', by='product_id')
+    out['expected'] = (out['date'] - out['last_sale'].fillna(out['first'])).dt.days
+    return out.sort_values(['date', 'product_id'])['expected'].to_numpy()
+
+def test_days_since_last_sale_is_as_of_each_day():
+    df = random_snapshot()
+    out = InventoryPositionStore.from_daily(df, checkpoint_days=10).daily()
+    assert np.array_equal(out['days_since_last_sale'].to_numpy(), asof_days_since_last_sale(df))
+    assert (out['days_since_last_sale'] >= 0).all()
+
+    # A window starts from the last sale before it
+    store = InventoryPositionStore.from_daily(df)
+    window = store.daily('2024-01-20', '2024-02-10')
+    full = out[(out['date'] >= '2024-01-20') & (out['date'] <= '2024-02-10')].reset_index(drop=True)
+    pd.testing.assert_frame_equal(window, full)
+
+def test_extend_matches_full_build():
+    df = random_snapshot()
+    cut = pd.Timestamp('2024-01-05')
+    store = InventoryPositionStore.from_daily(df[df['date'] <= cut], checkpoint_days=10)
+    extended = store.extend(df[df['date'] > cut], checkpoint_days=10)
+    full = InventoryPositionStore.from_daily(df, checkpoint_days=10)
+    pd.testing.assert_frame_equal(extended.daily().astype({'product_id': str}),
+                                  full.daily().astype({'product_id': str}))
+    assert extended.positions_at('2024-02-15').sort_index().equals(full.positions_at('2024-02-15').sort_index())
+    with pytest.raises(ValueError):
+        extended.extend(df[df['date'] == cut])
@@ -0,0 +1,244 @@
+import os
+import sys
+import logging
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.etl.etl_orders import process_orders, set_repeat_flags
+from src.etl.etl_cohorts import process_cohorts
+from src.utils.storage import read_table, NULL_PARTITION
+from src.etl.customer_state import load_customer_state, build_customer_state, update_customer_state, empty_customer_state
+
+LOGGER = logging.getLogger('test_orders')
+
+def make_config(tmp_path):
+    raw, processed = tmp_path / 'raw', tmp_path / 'processed'
+    raw.mkdir()
+    processed.mkdir()
+    pd.DataFrame({'product_id': ['P1', 'P2'], 'unit_price': [10.0, 20.0], 'unit_cost': [4.0, 8.0]}).to_csv(raw / 'products.csv', index=False)
+    pd.DataFrame({'customer_id': ['C1', 'C2'], 'region_id': ['R1', 'R2']}).to_csv(raw / 'customers.csv', index=False)
+    return {'paths': {'raw_data': str(raw), 'processed_data': str(processed)}, 'etl': {}}
+
+def write_batch(config, name, rows):
+    df = pd.DataFrame(rows, columns=['order_id', 'order_date', 'customer_id', 'product_id', 'units', 'discount_pct', 'status', 'delivery_date', 'channel'])
+    df.to_csv(os.path.join(config['paths']['raw_data'], name), index=False)
+
+def test_incremental_append_upsert_and_backfill(tmp_path):
+    config = make_config(tmp_path)
+    write_batch(config, 'orders_202402.csv', [
+        (3, '2024-02-03', 'C1', 'P1', 1, 0.0, 'Delivered', '2024-02-05', 'Web'),
+        (4, '2024-02-10', 'C1', 'P2', 2, 0.1, 'Delivered', '2024-02-12', 'Web'),
+    ])
+    process_orders(config, LOGGER)
+
+    # Backfilled January batch: earlier first order for C1 and a restated order 4
+    write_batch(config, 'orders_202401.csv', [
+        (1, '2024-01-15', 'C1', 'P1', 1, 0.0, 'Delivered', '2024-01-17', 'Web'),
+        (2, '2024-01-20', 'C2', 'P2', 1, 0.0, 'Cancelled', '', 'App'),
+        (4, '2024-02-10', 'C1', 'P2', 5, 0.1, 'Delivered', '2024-02-12', 'Web'),
+    ])
+    process_orders(config, LOGGER)
+
+    processed = config['paths']['processed_data']
+    assert sorted(os.listdir(os.path.join(processed, 'fact_orders'))) == ['order_month=2024-01', 'order_month=2024-02']
+
+    orders = read_table(processed, 'fact_orders').set_index('order_id').sort_index()
+    assert list(orders.index) == [1, 2, 3, 4]
+    assert orders.loc[4, 'units'] == 5
+    assert orders['is_repeat_customer'].to_dict() == {1: 0, 2: 0, 3: 1, 4: 1}
+
+    sales = read_table(processed, 'fact_sales').set_index('order_id').sort_index()
+    assert list(sales.index) == [1, 2, 3, 4]
+    assert sales.loc[4, 'quantity'] == 5
+
+    # The order index tracks where every stored order lives
+    index = pd.read_parquet(os.path.join(processed, 'order_index.parquet')).sort_values('order_id')
+    assert index['order_month'].tolist() == ['2024-01', '2024-01', '2024-02', '2024-02']
+
+def test_partitions_with_many_batches_are_compacted(tmp_path):
+    config = make_config(tmp_path)
+    config['etl']['compact_min_files'] = 2
+    processed = config['paths']['processed_data']
+    for day in (3, 10, 17):
+        write_batch(config, f'orders_202401{day:02d}.csv', [
+            (day, f'2024-01-{day:02d}', 'C1', 'P1', 1, 0.0, 'Delivered', '', 'Web'),
+        ])
+        process_orders(config, LOGGER)
+
+    for table in ('fact_orders', 'fact_sales'):
+        assert len(os.listdir(os.path.join(processed, table, 'order_month=2024-01'))) == 1
+        rows = read_table(processed, table)
+        assert rows['order_id'].tolist() == [3, 10, 17]
+    orders = read_table(processed, 'fact_orders').set_index('order_id')
+    assert orders['is_repeat_customer'].to_dict() == {3: 0, 10: 1, 17: 1}
+
+def test_restated_order_moving_month_replaces_old_row(tmp_path):
+    config = make_config(tmp_path)
+    write_batch(config, 'orders_202401.csv', [
+        (1, '2024-01-31', 'C1', 'P1', 1, 0.0, 'Delivered', '2024-02-02', 'Web'),
+    ])
+    process_orders(config, LOGGER)
+    # Restated into February: the January row must go
+    write_batch(config, 'orders_202402.csv', [
+        (1, '2024-02-01', 'C1', 'P1', 1, 0.0, 'Delivered', '2024-02-03', 'Web'),
+    ])
+    process_orders(config, LOGGER)
+
+    processed = config['paths']['processed_data']
+    for table in ('fact_orders', 'fact_sales'):
+        rows = read_table(processed, table)
+        assert list(rows['order_id']) == [1]
+        assert rows['order_date'].iloc[0] == pd.Timestamp('2024-02-01')
+    state = load_customer_state(processed).set_index('customer_id')
+    assert state.loc['C1', 'order_count'] == 1
+
+def test_order_without_date_is_kept_in_default_partition(tmp_path):
+    config = make_config(tmp_path)
+    write_batch(config, 'orders_202401.csv', [
+        (1, '2024-01-15', 'C1', 'P1', 1, 0.0, 'Delivered', '2024-01-17', 'Web'),
+        (2, '', 'C2', 'P2', 1, 0.0, 'Delivered', '', 'App'),
+    ])
+    process_orders(config, LOGGER)
+
+    processed = config['paths']['processed_data']
+    assert sorted(os.listdir(os.path.join(processed, 'fact_orders'))) == [
+        'order_month=2024-01', f'order_month={NULL_PARTITION}']
+    for table in ('fact_orders', 'fact_sales'):
+        rows = read_table(processed, table).set_index('order_id').sort_index()
+        assert list(rows.index) == [1, 2]
+        assert pd.isna(rows.loc[2, 'order_date'])
+
+    # Restating it with a date moves it out of the default partition
+    write_batch(config, 'orders_202401b.csv', [
+        (2, '2024-01-20', 'C2', 'P2', 1, 0.0, 'Delivered', '2024-01-22', 'App'),
+    ])
+    process_orders(config, LOGGER)
+    orders = read_table(processed, 'fact_orders').set_index('order_id').sort_index()
+    assert list(orders.index) == [1, 2] and orders.loc[2, 'order_date'] == pd.Timestamp('2024-01-20')
+
+def test_legacy_file_without_repeat_flags_is_migrated_then_backfilled(tmp_path):
+    config = make_config(tmp_path)
+    processed = config['paths']['processed_data']
+    # Monolithic fact_orders.csv from before repeat flags
+    legacy_path = os.path.join(processed, 'fact_orders.csv')
+    pd.DataFrame({
+        'order_id': ['ORD-3', 'ORD-4', 'ORD-5'],
+        'order_date': ['2024-02-03', '2024-02-10', '2024-02-11'],
+        'customer_id': ['C1', 'C1', 'C2'],
+        'product_id': ['P1', 'P2', 'P1'],
+        'region_id': [1, 1, 2],
+        'units': [1, 2, 1],
+        'unit_price': [10.0, 20.0, 10.0],
+        'discount_pct': [0.0, 0.0, 0.0],
+        'gross_sales': [10.0, 40.0, 10.0],
+        'net_sales': [10.0, 40.0, 10.0],
+        'total_cost': [4.0, 16.0, 4.0],
+        'profit': [6.0, 24.0, 6.0],
+        'order_status': ['Delivered'] * 3,
+        'delivery_date': ['2024-02-05', '2024-02-12', '2024-02-13'],
+        'delivery_days': [2.0, 2.0, 2.0],
+    }).to_csv(legacy_path, index=False)
+
+    # Backfill: earlier first order for C1, restated ORD-5
+    write_batch(config, 'orders_202401.csv', [
+        ('ORD-1', '2024-01-15', 'C1', 'P1', 1, 0.0, 'Delivered', '2024-01-17', 'Web'),
+        ('ORD-5', '2024-02-11', 'C2', 'P1', 3, 0.0, 'Delivered', '2024-02-13', 'Web'),
+    ])
+    process_orders(config, LOGGER)
+
+    orders = read_table(processed, 'fact_orders').set_index('order_id').sort_index()
+    assert list(orders.index) == ['ORD-1', 'ORD-3', 'ORD-4', 'ORD-5']
+    assert orders['is_repeat_customer'].to_dict() == {'ORD-1': 0, 'ORD-3': 1, 'ORD-4': 1, 'ORD-5': 0}
+    assert orders.loc['ORD-5', 'units'] == 3
+    # The legacy file is left where it was
+    assert os.path.exists(legacy_path)
+
+    state = load_customer_state(processed).set_index('customer_id').sort_index()
+    rebuilt = build_customer_state(read_table(processed, 'fact_orders')).set_index('customer_id').sort_index()
+    pd.testing.assert_frame_equal(state, rebuilt, check_dtype=False)
+
+def test_set_repeat_flags_on_file_without_the_column():
+    df = pd.DataFrame({'order_id': ['ORD-1', 'ORD-2']})
+    out = set_repeat_flags(df, {'ORD-1': 0})
+    assert out.loc[0, 'is_repeat_customer'] == 0 and pd.isna(out.loc[1, 'is_repeat_customer'])
+    assert set_repeat_flags(df, {'ORD-9': 1}) is df
+
+def test_same_day_first_order_goes_to_lower_order_number():
+    orders = pd.DataFrame({'order_id': ['ORD-10', 'ORD-9'], 'order_date': pd.to_datetime(['2024-01-05'] * 2),
+                           'customer_id': ['C1', 'C1'], 'net_sales': [1.0, 2.0]})
+    assert build_customer_state(orders)['first_order_id'].tolist() == ['ORD-9']
+
+    state, _ = update_customer_state(build_customer_state(orders[:1]), orders[1:])
+    assert state['first_order_id'].tolist() == ['ORD-9']
+    state, _ = update_customer_state(empty_customer_state(), orders)
+    assert state['first_order_id'].tolist() == ['ORD-9']
+    assert empty_customer_state()['first_order_id'].dtype == object
+
+def test_customer_state_matches_full_rebuild(tmp_path):
+    config = make_config(tmp_path)
+    write_batch(config, 'orders_202401.csv', [
+        (1, '2024-01-15', 'C1', 'P1', 1, 0.0, 'Delivered', '2024-01-17', 'Web'),
+        (2, '2024-01-20', 'C2', 'P2', 1, 0.0, 'Delivered', '2024-01-22', 'App'),
+        (3, '2024-01-25', 'C1', 'P2', 2, 0.0, 'Delivered', '2024-01-27', 'Web'),
+    ])
+    process_orders(config, LOGGER)
+
+    # Order 1 restated to a later date: C1's first order moves to order 3
+    write_batch(config, 'orders_202401b.csv', [
+        (1, '2024-01-28', 'C1', 'P1', 1, 0.0, 'Delivered', '2024-01-30', 'Web'),
+        (4, '2024-01-29', 'C2', 'P1', 3, 0.0, 'Delivered', '2024-01-31', 'App'),
+    ])
+    process_orders(config, LOGGER)
+
+    processed = config['paths']['processed_data']
+    orders = read_table(processed, 'fact_orders')
+    state = load_customer_state(processed).sort_values('customer_id').reset_index(drop=True)
+    expected = build_customer_state(orders).sort_values('customer_id').reset_index(drop=True)
+    pd.testing.assert_frame_equal(state, expected, check_dtype=False)
+
+    flags = orders.set_index('order_id')['is_repeat_customer'].sort_index().to_dict()
+    assert flags == {1: 1, 2: 0, 3: 0, 4: 1}
+
+def test_incremental_cohorts_match_full_rebuild(tmp_path):
+    config = make_config(tmp_path)
+    processed = config['paths']['processed_data']
+    write_batch(config, 'orders_202401.csv', [
+        (1, '2024-01-15', 'C1', 'P1', 1, 0.0, 'Delivered', '2024-01-17', 'Web'),
+        (2, '2024-02-20', 'C2', 'P2', 1, 0.0, 'Delivered', '2024-02-22', 'App'),
+        (3, '2024-03-25', 'C1', 'P2', 2, 0.0, 'Delivered', '2024-03-27', 'Web'),
+    ])
+    process_orders(config, LOGGER)
+    process_cohorts(config, LOGGER, verify=True)
+
+    # Backfill moves C2 into the December cohort; order 3 is restated
+    write_batch(config, 'orders_202312.csv', [
+        (5, '2023-12-05', 'C2', 'P1', 2, 0.0, 'Delivered', '2023-12-07', 'Web'),
+        (3, '2024-03-25', 'C1', 'P2', 4, 0.1, 'Delivered', '2024-03-27', 'Web'),
+        (6, '2024-03-28', 'C2', 'P1', 1, 0.0, 'Delivered', '2024-03-30', 'Web'),
+    ])
+    process_orders(config, LOGGER)
+    process_cohorts(config, LOGGER, verify=True)
+
+    cohorts = read_table(processed, 'fact_cohort_monthly')
+    assert sorted(cohorts['cohort_month'].unique()) == ['2023-12', '2024-01']
+    assert os.listdir(os.path.join(processed, 'order_changes')) == []
+
+def test_chunked_ingestion_matches_single_batch(tmp_path):
+    rows = [(i, f'2024-0{1 + i % 3}-{1 + i % 28:02d}', f'C{1 + i % 2}', f'P{1 + i % 2}', 1 + i % 4, 0.0,
+             'Delivered', '', 'Web') for i in range(1, 401)]
+    results = {}
+    for name, chunk_mb in [('whole', 64), ('chunked', 0.001)]:
+        (tmp_path / name).mkdir()
+        config = make_config(tmp_path / name)
+        config['etl']['orders_chunk_mb'] = chunk_mb
+        write_batch(config, 'orders_2024.csv', rows)
+        process_orders(config, LOGGER)
+        processed = config['paths']['processed_data']
+        results[name] = (read_table(processed, 'fact_orders').sort_values('order_id').reset_index(drop=True),
+                         load_customer_state(processed).sort_values('customer_id').reset_index(drop=True))
+
+    # Many small chunks were written as separate batches
+    assert len(os.listdir(tmp_path / 'chunked' / 'processed' / 'order_changes')) > 1
+    for whole, chunked in zip(results['whole'], results['chunked']):
+        pd.testing.assert_frame_equal(whole, chunked, check_categorical=False)
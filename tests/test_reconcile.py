@@ -0,0 +1,47 @@
+import logging
+import os
+import sys
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.etl.etl_reconcile import process_reconciliation
+from src.utils.storage import read_table, write_table
+
+def write_facts(processed_path):
+    write_table(pd.DataFrame({
+        'order_id': ['O1', 'O2', 'O3', 'O4', 'O5', 'O6'],
+        'order_date': pd.to_datetime(['2024-01-10', '2024-01-31', '2024-02-03', '2024-02-20', '2024-03-01', '2024-03-05']),
+        'customer_id': ['C1', 'C2', 'C1', 'C3', 'C2', 'C3'],
+        'order_status': ['Completed', 'Completed', 'Cancelled', 'Returned', 'Completed', 'Returned'],
+        'delivery_date': pd.to_datetime(['2024-01-14', '2024-02-04', None, '2024-02-25', '2024-03-06', '2024-03-09']),
+        'units': 1,
+    }), processed_path, 'fact_orders')
+    write_table(pd.DataFrame({
+        # O2 ships in the next month, O5 has no delivery, X9 has no order, O6 is dispatched twice
+        'order_id': ['O1', 'O2', 'O4', 'O6', 'X9', 'O6'],
+        'dispatch_date': pd.to_datetime(['2024-01-11', '2024-02-01', '2024-02-21', '2024-03-06', '2024-02-10', '2024-03-07']),
+        'delivery_date': pd.to_datetime(['2024-01-14', '2024-02-04', '2024-02-26', '2024-03-09', '2024-02-12', '2024-03-10']),
+        'carrier': ['UPS', 'DHL', 'UPS', 'FedEx', 'DHL', 'FedEx'],
+        'return_flag': [0, 0, 1, 0, 0, 0],
+    }), processed_path, 'fact_delivery')
+
+def test_reconciliation_flags_lags_and_orphans(tmp_path):
+    processed_path = str(tmp_path)
+    write_facts(processed_path)
+    process_reconciliation({'paths': {'processed_data': processed_path}}, logging.getLogger('test_reconcile'))
+
+    recon = read_table(processed_path, 'fact_order_delivery').set_index('order_id').sort_index()
+    assert list(recon['has_delivery']) == [1, 1, 0, 1, 0, 1]
+    assert recon.loc['O2', 'dispatch_lag_days'] == 1 and recon.loc['O2', 'carrier'] == 'DHL'
+    assert recon.loc['O4', 'delivery_lag_days'] == 6
+    assert list(recon['status_mismatch']) == [0, 0, 0, 0, 1, 0]
+    assert list(recon['return_mismatch']) == [0, 0, 0, 0, 0, 1]
+    assert list(recon['delivery_date_mismatch']) == [0, 0, 0, 1, 0, 0]
+    # The first dispatch of a duplicated delivery is the one joined
+    assert recon.loc['O6', 'dispatch_date'] == pd.Timestamp('2024-03-06')
+
+    orphans = read_table(processed_path, 'recon_orphans')
+    found = set(zip(orphans['order_id'], orphans['orphan_type'].astype(str)))
+    assert found == {('O5', 'order_without_delivery'), ('X9', 'delivery_without_order'),
+                     ('O6', 'duplicate_delivery')}
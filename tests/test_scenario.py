@@ -0,0 +1,93 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.simulate.run_scenario import ScenarioEngine
+
+KPIS = ['revenue', 'gross_margin', 'orders', 'aov', 'marketing_spend', 'conversions', 'cac', 'return_rate']
+
+def legacy_run_scenario(baseline_kpis, scenario_params, scenario_name):
+    """Reference: the per-date / per-row implementation the kernel replaced"""
+    results = []
+    for date in baseline_kpis['date'].unique():
+        daily_baseline = baseline_kpis[baseline_kpis['date'] == date]
+        for _, row in daily_baseline.iterrows():
+            kpi_name, baseline_value = row['kpi_name'], row['kpi_value']
+            scenario_value = baseline_value
+            if kpi_name == 'revenue' and 'revenue_growth' in scenario_params:
+                scenario_value = baseline_value * (1 + scenario_params['revenue_growth'])
+            elif kpi_name == 'gross_margin':
+                revenue_factor = 1 + scenario_params.get('revenue_growth', 0)
+                cost_factor = 1 + scenario_params.get('cost_reduction', 0)
+                scenario_value = baseline_value * revenue_factor * (2 - cost_factor)
+            elif kpi_name == 'conversions' and 'conversion_improvement' in scenario_params:
+                scenario_value = baseline_value * (1 + scenario_params['conversion_improvement'])
+            elif kpi_name == 'return_rate' and 'churn_reduction' in scenario_params:
+                scenario_value = baseline_value * (1 + scenario_params['churn_reduction'])
+            elif kpi_name == 'cac' and 'conversion_improvement' in scenario_params:
+                scenario_value = baseline_value / (1 + scenario_params['conversion_improvement'])
+            elif kpi_name == 'marketing_spend' and 'marketing_efficiency' in scenario_params:
+                scenario_value = baseline_value * (1 + scenario_params['marketing_efficiency'])
+            delta = scenario_value - baseline_value
+            delta_pct = (delta / baseline_value * 100) if baseline_value != 0 else 0
+            results.append({'date': date, 'kpi_name': kpi_name, 'baseline_value': baseline_value,
+                            'scenario_value': scenario_value, 'delta': delta, 'delta_pct': delta_pct})
+    df_results = pd.DataFrame(results)
+    df_results['scenario_name'] = scenario_name
+    df_results['date'] = pd.to_datetime(df_results['date']).dt.strftime('%Y-%m-%d')
+    return df_results
+
+def make_engine(path):
+    rng = np.random.default_rng(1)
+    dates = pd.date_range('2024-01-01', periods=15).strftime('%Y-%m-%d')
+    # Two blocks like the BI export (orders KPIs, then marketing KPIs), one with a gap
+    block_a = pd.DataFrame({'date': np.repeat(dates, 4), 'kpi_name': np.tile(KPIS[:4], 15)})
+    block_b = pd.DataFrame({'date': np.repeat(dates[2:], 4), 'kpi_name': np.tile(KPIS[4:], 13)})
+    baseline = pd.concat([block_a, block_b], ignore_index=True)
+    baseline['kpi_value'] = rng.uniform(0, 1000, len(baseline)).round(2)
+    baseline.loc[[3, 20], 'kpi_value'] = 0.0
+    baseline.to_csv(os.path.join(path, 'fact_kpis_daily.csv'), index=False)
+    return ScenarioEngine(bi_data_path=path)
+
+def test_run_scenario_matches_legacy_exactly(tmp_path):
+    engine = make_engine(str(tmp_path))
+    for params in [
+        {'revenue_growth': 0.2, 'conversion_improvement': 0.15, 'marketing_efficiency': 0.1, 'cost_reduction': 0.0, 'churn_reduction': 0.0},
+        {'revenue_growth': 0.1, 'conversion_improvement': 0.1, 'marketing_efficiency': 0.05, 'cost_reduction': -0.05, 'churn_reduction': -0.1},
+        {'cost_reduction': -0.1},
+        {}
+    ]:
+        expected = legacy_run_scenario(engine.baseline_kpis, params, 'S')
+        assert_frame_equal(engine.run_scenario(params, 'S'), expected, check_exact=True)
+
+def test_run_grid_matches_single_scenarios(tmp_path):
+    engine = make_engine(str(tmp_path))
+    space = {'revenue_growth': [0.0, 0.1, 0.2], 'conversion_improvement': [0.0, 0.05], 'cost_reduction': [-0.1]}
+    grid = engine.run_grid(space, return_rows=True)
+    
+    scenarios = grid['scenarios']
+    assert len(scenarios) == 6
+    for idx, params in scenarios[list(space)].iterrows():
+        single = engine.run_scenario(params.to_dict(), 'S')
+        totals = single.groupby('kpi_name', sort=False)['scenario_value'].sum()
+        for kpi, total in totals.items():
+            assert np.isclose(scenarios.loc[idx, f'{kpi}_total'], total)
+        rows = grid['rows'][grid['rows']['scenario_idx'] == idx]
+        assert np.allclose(rows['scenario_value'].values, single['scenario_value'].values)
+    
+    summary = grid['summary'].set_index('kpi_name')
+    assert (summary['p5'] <= summary['p50']).all() and (summary['p50'] <= summary['p95']).all()
+    assert np.isclose(summary.loc['orders', 'p50'], summary.loc['orders', 'baseline_total'])
+
+def test_run_grid_monte_carlo_batches_in_process_pool(tmp_path):
+    engine = make_engine(str(tmp_path))
+    space = {'revenue_growth': ('uniform', -0.1, 0.2), 'churn_reduction': ('normal', -0.1, 0.05), 'cost_reduction': [-0.05, 0.0]}
+    in_memory = engine.run_grid(space, n_draws=500, seed=3)
+    pooled = engine.run_grid(space, n_draws=500, seed=3, memory_budget_mb=0.05, workers=2)
+    assert in_memory['rows'] is None
+    assert len(pooled['scenarios']) == 500
+    assert_frame_equal(in_memory['summary'], pooled['summary'])
@@ -0,0 +1,120 @@
+import os
+import sys
+import logging
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.etl.scheduler import Task, build_graph, critical_path, run_graph
+from src.etl.main_etl import ETL_TASKS
+from src.etl.stage_cache import StageCache, module_sources
+
+LOGGER = logging.getLogger('test_scheduler')
+
+def write_marker(config, logger):
+    path = config['paths']['processed_data']
+    with open(os.path.join(path, f'step_{len(os.listdir(path))}.txt'), 'w') as f:
+        f.write('ok')
+
+def fail_step(config, logger):
+    raise RuntimeError('boom')
+
+def test_etl_graph_dependencies():
+    deps = build_graph(ETL_TASKS)
+    assert deps['orders'] == {'customers', 'products'}
+    assert deps['marketing'] == set()
+    assert deps['production'] == {'date_dim'}
+    for name in ['finance', 'delivery', 'cohorts']:
+        assert 'orders' in deps[name]
+    # days_since_last_sale comes from the inventory's own sales
+    assert deps['inventory'] == {'products'}
+
+def test_graph_rejects_cycles_and_duplicate_producers():
+    with pytest.raises(ValueError):
+        build_graph([Task('a', 'm:f', ['y'], ['x']), Task('b', 'm:f', ['x'], ['y'])])
+    with pytest.raises(ValueError):
+        build_graph([Task('a', 'm:f', [], ['x']), Task('b', 'm:f', [], ['x'])])
+
+def test_critical_path():
+    deps = {'a': set(), 'b': {'a'}, 'c': {'a'}, 'd': {'b', 'c'}}
+    path, total = critical_path(deps, {'a': 1.0, 'b': 5.0, 'c': 2.0, 'd': 1.0})
+    assert path == ['a', 'b', 'd']
+    assert total == 7.0
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_run_graph_reports_timings_and_failures(tmp_path, workers):
+    config = {'paths': {'processed_data': str(tmp_path)}}
+    tasks = [
+        Task('a', f'{__name__}:write_marker', [], ['x']),
+        Task('b', f'{__name__}:write_marker', ['x'], ['y']),
+        Task('c', f'{__name__}:write_marker', [], ['z']),
+    ]
+    report = run_graph(tasks, config, str(tmp_path / 'etl.log'), LOGGER, workers=workers)
+    assert report['status'] == 'success'
+    assert set(report['tasks']) == {'a', 'b', 'c'}
+    assert all('duration_seconds' in t for t in report['tasks'].values())
+    assert report['critical_path'] in (['a', 'b'], ['a'], ['c'])
+
+    tasks[0] = Task('a', f'{__name__}:fail_step', [], ['x'])
+    report = run_graph(tasks, config, str(tmp_path / 'etl.log'), LOGGER, workers=workers)
+    assert report['status'] == 'failed' and report['failed_task'] == 'a'
+    assert report['tasks']['b']['status'] == 'skipped'
+
+def copy_source(config, logger):
+    path = config['paths']['processed_data']
+    with open(os.path.join(config['paths']['raw_data'], 'source.csv')) as f:
+        data = f.read()
+    with open(os.path.join(path, 'stage_a.csv'), 'w') as f:
+        f.write(data)
+
+def copy_stage_a(config, logger):
+    path = config['paths']['processed_data']
+    with open(os.path.join(path, 'stage_a.csv')) as f:
+        data = f.read()
+    with open(os.path.join(path, 'stage_b.csv'), 'w') as f:
+        f.write(data.upper())
+
+def write_other(config, logger):
+    with open(os.path.join(config['paths']['processed_data'], 'other_copy.csv'), 'w') as f:
+        f.write('ok')
+
+def test_stage_cache_skips_unchanged_steps(tmp_path):
+    raw, processed = tmp_path / 'raw', tmp_path / 'processed'
+    raw.mkdir()
+    processed.mkdir()
+    (raw / 'source.csv').write_text('a,b\n1,2\n')
+    (raw / 'other.csv').write_text('x\n1\n')
+    config = {'paths': {'raw_data': str(raw), 'processed_data': str(processed)}}
+    tasks = [
+        Task('a', f'{__name__}:copy_source', ['raw.source'], ['stage_a']),
+        Task('b', f'{__name__}:copy_stage_a', ['stage_a'], ['stage_b']),
+        Task('c', f'{__name__}:write_other', ['raw.other'], ['other_copy']),
+    ]
+
+    def run(**kwargs):
+        return run_graph(tasks, config, str(tmp_path / 'etl.log'), LOGGER, workers=1, cache=StageCache(config), **kwargs)
+
+    first = run()
+    assert first['cache']['hits'] == []
+    assert run()['cache']['hits'] == ['a', 'b', 'c']
+
+    # Only the changed input and its dependents rerun
+    (raw / 'source.csv').write_text('a,b\n3,4\n')
+    report = run()
+    assert report['cache']['hits'] == ['c']
+    assert report['cache']['misses'] == {'a': 'inputs changed: raw.source', 'b': 'inputs changed: stage_a'}
+    assert (processed / 'stage_b.csv').read_text() == 'A,B\n3,4\n'
+
+    # Same content rewritten (new mtime) is still a hit
+    (raw / 'source.csv').write_text('a,b\n3,4\n')
+    assert run()['cache']['hits'] == ['a', 'b', 'c']
+
+    report = run(force=['b'])
+    assert report['cache']['misses'] == {'b': 'forced'}
+    assert run(force=[])['cache']['hits'] == []
+
+def test_code_version_covers_imported_project_modules():
+    # A task's code version changes with the helpers it uses, not only its own module
+    sources = module_sources('src.etl.etl_delivery')
+    assert {'src.etl.etl_delivery', 'src.utils.sla_rules', 'src.utils.storage', 'src.utils.schemas'} <= set(sources)
+    assert not any(name.startswith('pandas') for name in sources)
@@ -0,0 +1,67 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.utils.schemas import apply_schema
+from src.utils.storage import write_partitioned, write_table, read_table, export_csv
+
+def sample_orders(rows=2000):
+    return pd.DataFrame({
+        'order_id': range(1, rows + 1),
+        'order_date': pd.date_range('2024-01-01', periods=rows, freq='h').strftime('%Y-%m-%d'),
+        'customer_id': [f'CUST-{i % 150:05d}' for i in range(rows)],
+        'product_id': [f'PROD-{i % 40:04d}' for i in range(rows)],
+        'units': [1 + i % 5 for i in range(rows)],
+        'channel': ['Web', 'App', 'Store', 'Phone'] * (rows // 4),
+        'is_repeat_customer': [i % 2 for i in range(rows)],
+        'net_sales': [round(i * 1.37, 2) for i in range(rows)],
+    })
+
+def test_schema_types_shrink_memory_and_keep_values():
+    df = sample_orders().astype({'customer_id': object, 'product_id': object, 'channel': object})
+    typed = apply_schema(df, 'fact_orders')
+
+    assert isinstance(typed['customer_id'].dtype, pd.CategoricalDtype)
+    assert typed['order_date'].dtype.kind == 'M'
+    assert typed['units'].dtype == 'int16' and typed['is_repeat_customer'].dtype == 'int8'
+    assert typed['order_id'].dtype == 'int32' and typed['net_sales'].dtype == 'float64'
+    assert typed.memory_usage(deep=True).sum() < df.memory_usage(deep=True).sum() / 2
+
+    assert typed['net_sales'].sum() == df['net_sales'].sum()
+    assert (typed['customer_id'].astype(str) == df['customer_id']).all()
+
+def test_values_that_do_not_fit_are_left_unchanged():
+    df = pd.DataFrame({'units': [1, 40000], 'region_id': [1.5, 2.0], 'order_id': ['ORD-1', 'ORD-2']})
+    typed = apply_schema(df, 'fact_orders')
+    assert typed['units'].dtype == 'int64'
+    assert typed['region_id'].dtype == 'float64'
+    assert list(typed['order_id']) == ['ORD-1', 'ORD-2']
+    assert apply_schema(df, 'unregistered') is df
+
+def test_read_table_applies_schema(tmp_path):
+    df = sample_orders()
+    df['order_month'] = df['order_date'].str[:7]
+    write_partitioned(df, os.path.join(tmp_path, 'fact_orders'), 'order_month')
+
+    loaded = read_table(str(tmp_path), 'fact_orders').sort_values('order_id').reset_index(drop=True)
+    assert isinstance(loaded['channel'].dtype, pd.CategoricalDtype)
+    assert loaded['order_date'].dtype.kind == 'M'
+    assert loaded['net_sales'].sum() == df['net_sales'].sum()
+    assert (loaded['order_date'].dt.strftime('%Y-%m-%d') == df['order_date']).all()
+
+def test_tables_are_stored_binary_and_exported_lazily(tmp_path):
+    processed, exports = str(tmp_path / 'processed'), str(tmp_path / 'exports')
+    os.makedirs(processed)
+    sample_orders(8).to_csv(os.path.join(processed, 'fact_orders.csv'), index=False)
+
+    written = write_table(sample_orders(8), processed, 'fact_orders')
+    assert sorted(os.listdir(processed)) == ['fact_orders']
+    pd.testing.assert_frame_equal(read_table(processed, 'fact_orders'), written)
+
+    path = export_csv(processed, 'fact_orders', exports)
+    assert pd.read_csv(path)['order_date'].tolist() == sample_orders(8)['order_date'].tolist()
+    mtime = os.path.getmtime(path)
+    assert export_csv(processed, 'fact_orders', exports) == path and os.path.getmtime(path) == mtime
+    assert export_csv(processed, 'missing_table', exports) is None
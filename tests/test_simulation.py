@@ -0,0 +1,134 @@
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.generate_data import simulate_transactions, simulate_demand, fill_orders
+
+CUSTOMERS = pd.DataFrame({'customer_id': [f'C{i:05d}' for i in range(1, 101)]})
+PRODUCTS = pd.DataFrame({'product_id': [f'P{i:05d}' for i in range(1, 11)]})
+
+def run(seed=7, **kwargs):
+    return simulate_transactions(datetime(2023, 9, 1), datetime(2024, 1, 1), CUSTOMERS, PRODUCTS, seed=seed, **kwargs)
+
+def test_seeded_mode_is_reproducible():
+    orders_a, inv_a, dlv_a, _ = run()
+    orders_b, inv_b, dlv_b, _ = run()
+    assert orders_a.equals(orders_b)
+    assert inv_a.equals(inv_b)
+    assert dlv_a.equals(dlv_b)
+
+def test_inventory_ledger_balances():
+    orders, inventory, _, closing = run()
+    assert ((inventory['opening_stock'] + inventory['restock_qty'] - inventory['sold_qty']) == inventory['closing_stock']).all()
+    assert (inventory['closing_stock'] >= 0).all()
+    # Restock only when opening stock is below the reorder point
+    assert (inventory.loc[inventory['restock_qty'] > 0, 'opening_stock'] < 15).all()
+    # Sold units reconcile with fulfilled orders
+    sold = orders.groupby(['order_date', 'product_id'])['units'].sum()
+    logged = inventory.set_index(['date', 'product_id'])['sold_qty']
+    assert (logged.loc[sold.index] == sold).all()
+    assert logged.sum() == sold.sum()
+    last_day = inventory[inventory['date'] == inventory['date'].max()]
+    assert (last_day['closing_stock'].values == closing).all()
+
+def loop_fill(prod_idx, qty, available):
+    """Reference: the loop engine's one-order-at-a-time stock check"""
+    left = available.copy()
+    filled = []
+    for p, q in zip(prod_idx, qty):
+        filled.append(bool(left[p] >= q))
+        if filled[-1]:
+            left[p] -= q
+    return np.array(filled)
+
+def test_stock_check_matches_loop_on_stock_out_day():
+    # A 3-unit order that does not fit must not block a later 1-unit order
+    prod_idx = np.array([0, 1, 0, 0, 1, 0])
+    qty = np.array([2, 1, 3, 1, 3, 1])
+    available = np.array([4, 2])
+    assert list(fill_orders(prod_idx, qty, available)) == [True, True, False, True, False, True]
+
+    rng = np.random.default_rng(5)
+    for _ in range(200):
+        prod_idx = rng.integers(0, 4, 40)
+        qty = rng.integers(1, 4, 40)
+        available = rng.integers(0, 20, 4)
+        assert np.array_equal(fill_orders(prod_idx, qty, available), loop_fill(prod_idx, qty, available))
+
+def test_stock_out_day_sells_down_to_what_is_left():
+    dates = pd.date_range('2023-10-01', periods=3)
+    # Opening stock at the reorder point: no restock, and day one demand exceeds it
+    accepted, ledger, _ = simulate_demand(dates, 2, np.random.default_rng(1), opening_stock=[15, 15])
+    day_one = slice(0, 2)
+    assert (ledger['sold_qty'][day_one] >= 13).all()
+    assert (ledger['closing_stock'][day_one] <= 2).all()
+    sold = np.bincount(accepted['prod_idx'][accepted['day_idx'] == 0], weights=accepted['qty'][accepted['day_idx'] == 0], minlength=2)
+    assert np.array_equal(sold, ledger['sold_qty'][day_one])
+
+def test_delivery_matches_orders():
+    orders, _, delivery, _ = run()
+    assert orders['order_id'].is_unique
+    shipped = orders[orders['status'] != 'Cancelled']
+    assert list(delivery['order_id']) == list(shipped['order_id'])
+    assert (delivery['return_flag'] == (shipped['status'] == 'Returned').astype(int).values).all()
+    assert orders.loc[orders['status'] == 'Cancelled', 'delivery_date'].isna().all()
+
+def test_streaming_writes_continuous_monthly_partitions(tmp_path):
+    from src.generate_data import generate_streaming
+    from src.utils.common import raw_table_files, read_raw_table
+    
+    total = generate_streaming(datetime(2023, 11, 15), datetime(2024, 2, 1), CUSTOMERS, PRODUCTS, seed=3, output_path=str(tmp_path))
+    
+    files = [os.path.basename(f) for f in raw_table_files(str(tmp_path), 'orders')]
+    assert files == ['orders_202311.csv', 'orders_202312.csv', 'orders_202401.csv']
+    
+    orders = read_raw_table(str(tmp_path), 'orders')
+    assert len(orders) == total
+    assert list(orders['order_id']) == [f'ORD-{i}' for i in range(10001, 10001 + total)]
+    
+    # Closing stock carries over across partition boundaries
+    inventory = read_raw_table(str(tmp_path), 'inventory_daily').sort_values(['product_id', 'date'])
+    prev_closing = inventory.groupby('product_id')['closing_stock'].shift(1)
+    carried = prev_closing.notna()
+    assert (inventory.loc[carried, 'opening_stock'] == prev_closing[carried]).all()
+    assert len(read_raw_table(str(tmp_path), 'operating_costs')) == 78
+
+def test_sharded_generation_is_independent_of_worker_count(tmp_path):
+    from src.generate_data import generate_sharded
+    from src.utils.common import read_raw_table
+    
+    outputs = {}
+    for workers in (1, 3):
+        out = tmp_path / f'w{workers}'
+        generate_sharded(datetime(2023, 10, 1), datetime(2024, 3, 1), CUSTOMERS, PRODUCTS, seed=11, workers=workers, output_path=str(out))
+        outputs[workers] = {name: read_raw_table(str(out), name) for name in ['orders', 'inventory_daily', 'delivery_log', 'marketing_spend']}
+    
+    for name in outputs[1]:
+        assert outputs[1][name].equals(outputs[3][name])
+    
+    orders = outputs[3]['orders']
+    assert list(orders['order_id']) == [f'ORD-{i}' for i in range(10001, 10001 + len(orders))]
+    inventory = outputs[3]['inventory_daily'].sort_values(['product_id', 'date'])
+    prev_closing = inventory.groupby('product_id')['closing_stock'].shift(1)
+    carried = prev_closing.notna()
+    assert (inventory.loc[carried, 'opening_stock'] == prev_closing[carried]).all()
+
+def test_pooled_dimension_generators():
+    from src.generate_data import customers_frame, products_frame
+    
+    customers = customers_frame(5000, [1, 2, 3, 4], datetime(2023, 1, 1), datetime(2025, 1, 1))
+    assert customers['customer_id'].is_unique
+    assert customers['customer_id'].iloc[0] == 'C00001'
+    assert customers['signup_date'].between('2023-01-01', '2024-12-31').all()
+    assert set(customers['region_id']) == {1, 2, 3, 4}
+    assert customers['customer_name'].nunique() > 100
+    
+    products = products_frame(200)
+    assert (products['unit_price'] > products['unit_cost']).all()
+    assert (products['product_name'].str.split(' ').str[-1] == products['subcategory']).all()
+    electronics = products['category'] == 'Electronics'
+    assert (products.loc[electronics, 'unit_cost'] >= 400).all()
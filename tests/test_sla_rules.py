@@ -0,0 +1,50 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.utils.sla_rules import SlaRules, sla_metrics
+
+RULES = [
+    {'carrier': 'UPS', 'promise_days': 4},
+    {'carrier': 'DHL', 'region_id': 4, 'promise_days': 6},
+    {'channel': 'Store', 'promise_days': 3},
+]
+
+def sample_deliveries():
+    return pd.DataFrame({
+        'dispatch_date': pd.to_datetime(['2024-01-05'] * 4 + ['2024-02-01'] * 2),
+        'carrier': ['UPS', 'DHL', 'DHL', 'FedEx', 'UPS', 'FedEx'],
+        'region_id': [1, 4, 2, np.nan, 4, 3],
+        'channel': ['Online', 'Store', 'Online', 'Online', 'Store', 'Store'],
+        'delivery_time_days': [5, 6, 5, np.nan, 2, 4],
+    })
+
+def test_promise_resolution_by_specificity():
+    out = SlaRules(RULES, default_promise_days=5).apply(sample_deliveries())
+    # UPS, DHL+region 4 (beats Store), default, default (missing region), UPS (ties with Store: later wins), Store
+    assert list(out['promise_days']) == [4, 6, 5, 5, 3, 3]
+    assert list(out['sla_rule']) == ['carrier=UPS', 'carrier=DHL,region_id=4', 'default', 'default',
+                                     'channel=Store', 'channel=Store']
+    assert list(out['sla_met']) == [0, 1, 1, 0, 1, 0]
+    assert out['sla_breach_days'].tolist()[:3] == [1, 0, 0] and pd.isna(out['sla_breach_days'].iloc[3])
+
+    # No rules: the fixed 5-day promise
+    plain = SlaRules().apply(sample_deliveries())
+    assert (plain['promise_days'] == 5).all()
+    assert list(plain['sla_met']) == [1, 0, 1, 0, 1, 1]
+
+def test_invalid_rule_is_rejected():
+    with pytest.raises(ValueError):
+        SlaRules([{'warehouse': 'W1', 'promise_days': 2}])
+
+def test_sla_metrics_percentiles():
+    out = SlaRules(RULES).apply(sample_deliveries())
+    metrics = sla_metrics(out, percentiles=[50, 90])
+    store = metrics[(metrics['month'] == '2024-02') & (metrics['sla_rule'] == 'channel=Store')].iloc[0]
+    assert store['deliveries'] == 2 and store['sla_met_rate'] == 0.5
+    assert store['p50_delivery_days'] == 3.0 and store['p90_breach_days'] == pytest.approx(0.9)
+    assert {'p90_delivery_days', 'p50_breach_days', 'avg_breach_days'} <= set(metrics.columns)
@@ -0,0 +1,68 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.utils.storage import (write_table, read_table, scan_table, open_dataset, date_filter, write_partitioned,
+                               delete_keys, key_index, compact_partitions, partition_files, read_dataset)
+
+def sample_inventory(days=120):
+    dates = pd.date_range('2024-01-01', periods=days, freq='D')
+    return pd.DataFrame({
+        'date': dates.repeat(2),
+        'product_id': ['P1', 'P2'] * days,
+        'sold_qty': range(2 * days),
+        'closing_stock': 100,
+    })
+
+def test_facts_are_written_as_month_partitions(tmp_path):
+    df = sample_inventory()
+    write_table(df, str(tmp_path), 'fact_inventory')
+
+    assert sorted(os.listdir(tmp_path / 'fact_inventory')) == \
+        ['month=2024-01', 'month=2024-02', 'month=2024-03', 'month=2024-04']
+    loaded = read_table(str(tmp_path), 'fact_inventory')
+    assert len(loaded) == len(df) and 'month' not in loaded.columns
+    assert loaded['date'].is_monotonic_increasing
+
+def test_scan_pushes_down_columns_and_date_window(tmp_path):
+    df = sample_inventory()
+    write_table(df, str(tmp_path), 'fact_inventory')
+
+    # A single month touches a single partition
+    dataset = open_dataset(str(tmp_path), 'fact_inventory')
+    fragments = list(dataset.get_fragments(filter=date_filter(dataset, 'fact_inventory', '2024-02-01', '2024-03-01')))
+    assert [os.path.basename(os.path.dirname(f.path)) for f in fragments] == ['month=2024-02']
+
+    window = scan_table(str(tmp_path), 'fact_inventory', columns=['date', 'sold_qty'],
+                        start='2024-02-10', end='2024-03-05')
+    expected = df[(df['date'] >= '2024-02-10') & (df['date'] < '2024-03-05')]
+    assert list(window.columns) == ['date', 'sold_qty']
+    assert window['sold_qty'].tolist() == expected['sold_qty'].tolist()
+
+    everything = scan_table(str(tmp_path), 'fact_inventory')
+    assert len(everything) == len(df) and 'month' not in everything.columns
+    assert scan_table(str(tmp_path), 'fact_marketing') is None
+
+def test_key_index_limits_deletes_and_compaction_merges_batches(tmp_path):
+    dataset_dir = str(tmp_path / 'fact_orders')
+    for batch, ids in enumerate([[1, 2], [3, 4], [5]]):
+        df = pd.DataFrame({'order_id': ids, 'order_date': pd.to_datetime(['2024-01-10', '2024-02-10'][:len(ids)])})
+        df['order_month'] = df['order_date'].dt.strftime('%Y-%m')
+        write_partitioned(df, dataset_dir, 'order_month', batch_id=f'batch-{batch}')
+
+    index = key_index(dataset_dir, 'order_month', 'order_id').sort_values('order_id')
+    assert index['order_month'].tolist() == ['2024-01', '2024-02', '2024-01', '2024-02', '2024-01']
+
+    # Only the candidate partitions are checked
+    batch = pd.DataFrame({'order_id': [2, 3]})
+    assert delete_keys(batch, dataset_dir, 'order_month', 'order_id', partitions=['2024-02'])['order_id'].tolist() == [2]
+    assert delete_keys(batch, dataset_dir, 'order_month', 'order_id')['order_id'].tolist() == [3]
+
+    # Files emptied by the deletes are gone: 2024-01 keeps two batches, 2024-02 one
+    assert len(partition_files(dataset_dir, 'order_month', '2024-01')) == 2
+    assert compact_partitions(dataset_dir, 'order_month', ['2024-01', '2024-02'], min_files=2, sort_by='order_date') == ['2024-01']
+    assert len(partition_files(dataset_dir, 'order_month', '2024-01')) == 1
+    assert sorted(read_dataset(dataset_dir)['order_id']) == [1, 4, 5]
+    assert not [f for f in os.listdir(os.path.join(dataset_dir, 'order_month=2024-01')) if f.endswith('.tmp')]
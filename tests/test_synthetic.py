@@ -0,0 +1,37 @@
+import logging
+import os
+import sys
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.etl.etl_synthetic import generate_production, generate_procurement
+from src.utils.storage import read_table, write_table
+
+def write_dims(processed_path):
+    write_table(pd.DataFrame({'date': pd.date_range('2024-01-01', periods=10)}), processed_path, 'dim_date')
+    write_table(pd.DataFrame({'product_id': ['P1', 'P2', 'P3'], 'unit_cost': [5.0, 7.5, 11.0]}),
+                processed_path, 'dim_product')
+
+def test_generators_build_cross_product_and_configured_volume(tmp_path):
+    processed_path = str(tmp_path)
+    write_dims(processed_path)
+    config = {'paths': {'processed_data': processed_path}, 'etl': {'procurement_orders': 1200}}
+    logger = logging.getLogger('test_synthetic')
+
+    generate_production(config, logger)
+    production = read_table(processed_path, 'fact_production')
+    assert len(production) == 10 * 3 * 3
+    assert not production.duplicated(['date', 'line', 'shift']).any()
+    assert production['lead_time_days'].between(1, 7).all()
+
+    generate_procurement(config, logger)
+    procurement = read_table(processed_path, 'fact_procurement')
+    assert len(procurement) == 1200 and procurement['po_id'].is_unique
+    costs = {'P1': 5.0, 'P2': 7.5, 'P3': 11.0}
+    assert (procurement['unit_cost'] == procurement['product_id'].astype(str).map(costs)).all()
+    assert (procurement['total_cost'] == procurement['quantity'] * procurement['unit_cost']).all()
+
+    # Same seed, same rows
+    generate_procurement(config, logger)
+    pd.testing.assert_frame_equal(read_table(processed_path, 'fact_procurement'), procurement)
@@ -0,0 +1,64 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.utils.table_cache import TableCache, load_table, frame_bytes
+
+def write_table(path, name, rows=1000):
+    df = pd.DataFrame({
+        'order_id': range(rows),
+        'order_date': pd.date_range('2024-01-01', periods=rows, freq='h').strftime('%Y-%m-%d'),
+        'channel': ['Web', 'App'] * (rows // 2),
+        'net_sales': [float(i) for i in range(rows)]
+    })
+    df.to_csv(os.path.join(path, f'{name}.csv'), index=False)
+    return df
+
+def test_tables_are_read_once_and_shared(tmp_path):
+    expected = write_table(tmp_path, 'sample_orders')
+    tables = TableCache(str(tmp_path))
+
+    first = tables.get('sample_orders', columns=['order_id', 'net_sales'])
+    second = tables.get('sample_orders')
+    assert tables.stats['disk_reads'] == 1 and tables.stats['hits'] == 1
+    assert list(first.columns) == ['order_id', 'net_sales']
+
+    # Low-cardinality strings are dictionary-encoded, date strings are left alone
+    assert isinstance(second['channel'].dtype, pd.CategoricalDtype)
+    assert not isinstance(second['order_date'].dtype, pd.CategoricalDtype)
+    pd.testing.assert_frame_equal(second.astype({'channel': object}), expected.astype({'channel': object}),
+                                  check_dtype=False)
+
+    # Callers can modify their copy without touching the cached table
+    second['order_date'] = pd.to_datetime(second['order_date'])
+    second['net_sales'] = 0.0
+    again = tables.get('sample_orders')
+    assert again['order_date'].dtype == expected['order_date'].dtype
+    assert again['net_sales'].sum() == expected['net_sales'].sum()
+
+    assert tables.get('missing_table') is None
+    assert load_table(None, str(tmp_path), 'sample_orders', columns=['order_id']).shape == (1000, 1)
+
+def test_lru_eviction_and_invalidation(tmp_path):
+    for name in ['a', 'b', 'c']:
+        write_table(tmp_path, name)
+    probe = TableCache(str(tmp_path))
+    size = frame_bytes(probe.get('a'))
+
+    tables = TableCache(str(tmp_path), memory_budget_mb=2.5 * size / (1024 * 1024))
+    tables.get('a')
+    tables.get('b')
+    tables.get('a')          # a is now most recently used
+    tables.get('c')          # evicts b
+    assert list(tables.tables) == ['a', 'c']
+    assert tables.stats['evictions'] == 1
+    assert tables.used_bytes <= tables.budget
+
+    # Evicted tables fall back to disk
+    assert len(tables.get('b')) == 1000
+    assert tables.stats['disk_reads'] == 4
+
+    tables.invalidate('c')
+    assert 'c' not in tables.tables